@@ -3,7 +3,9 @@ const express = require("express");
 const router = express.Router();
 const mongoUtil = require("../mongoUtil");
 const fs = require("fs");
-const { exec, execFile } = require("child_process");
+const readline = require("readline");
+const http = require("http");
+const { execFile, spawn } = require("child_process");
 
 // Global variables
 const dbColl_Inventory = "componentInventory";
@@ -11,6 +13,11 @@ const dbColl_Servers = "servers";
 const file_idracs = "IPrangeScan-iDRACs.txt";
 const iDracLogin = "root";
 const iDracPassword = "calvin";
+// Max number of iDRACs the Python fleet mode queries at the same time
+const inventoryWorkers = 32;
+// Address of a running inventory service (get_iDRAC_Inventory.py -srv), a Unix
+// socket path or host:port; when unset every inventory spawns the Python script
+const inventoryDaemon = process.env.INVENTORY_DAEMON;
 
 // Read text file, remove spaces and empty lines, and return an array of text lines
 function readLDfile(fName) {
@@ -32,25 +39,6 @@ function getServersDataByTag(db, stArr) {
   return result;
 }
 
-function getServerInventory(node_ip) {
-  return new Promise((resolve, reject) => {
-    console.log(`${node_ip} -> getServerInventory function called..`);
-    // Execute the Python script to get iDRAC HW inventory
-    exec(
-      `python get_iDRAC_Inventory.py -ip ${node_ip} -u ${iDracLogin} -p ${iDracPassword} -a y`,
-      (err, stdout, stderr) => {
-        if (err || stderr) {
-          reject({ success: false, message: stderr });
-        } else {
-          // console.log("Here's the query result: "); //debugging
-          // console.log(stdout); //debugging
-          resolve({ success: true, message: stdout });
-        }
-      }
-    );
-  });
-}
-
 function writeToInventoryColl(dbObject, jsonObject) {
   return new Promise((resolve, reject) => {
     dbObject
@@ -127,69 +115,157 @@ function getComponentDataArray(dbObject) {
   });
 }
 
+// Sends an inventory job to the resident inventory service, which keeps the
+// iDRAC sessions warm between jobs, and calls onResult with each host's result
+// record as it arrives
+function getDaemonInventory(hosts, onResult) {
+  return new Promise((resolve, reject) => {
+    const body = JSON.stringify({
+      hosts: hosts,
+      username: iDracLogin,
+      password: iDracPassword,
+      flags: ["a"],
+    });
+    const options = {
+      path: "/inventory",
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "Content-Length": Buffer.byteLength(body),
+      },
+    };
+    if (inventoryDaemon.includes("/")) {
+      options.socketPath = inventoryDaemon;
+    } else {
+      const [host, port] = inventoryDaemon.split(":");
+      options.host = port ? host : "127.0.0.1";
+      options.port = port || host;
+    }
+    const req = http.request(options, (res) => {
+      if (res.statusCode !== 200) {
+        let message = "";
+        res.on("data", (data) => {
+          message += data;
+        });
+        res.on("end", () => reject({ success: false, message: message }));
+        return;
+      }
+      readline
+        .createInterface({ input: res })
+        .on("line", (line) => {
+          try {
+            onResult(JSON.parse(line));
+          } catch (error) {
+            console.log(`Could not parse fleet inventory output: ${error}`);
+          }
+        })
+        .on("close", () => resolve({ success: true, message: "" }));
+    });
+    req.on("error", (err) => {
+      reject({ success: false, message: err.message });
+    });
+    req.end(body);
+  });
+}
+
+// Runs the Python script in fleet mode over every iDRAC in the given file and
+// calls onResult with each host's parsed result as soon as it is printed
+function getFleetInventory(fName, onResult) {
+  if (inventoryDaemon) {
+    return getDaemonInventory(readLDfile(fName), onResult);
+  }
+  return new Promise((resolve, reject) => {
+    const child = spawn("python", [
+      "get_iDRAC_Inventory.py",
+      "-fl",
+      fName,
+      "-w",
+      String(inventoryWorkers),
+      "-u",
+      iDracLogin,
+      "-p",
+      iDracPassword,
+      "-a",
+      "y",
+    ]);
+    let stderr = "";
+    child.stderr.on("data", (data) => {
+      stderr += data;
+    });
+    readline
+      .createInterface({ input: child.stdout })
+      .on("line", (line) => {
+        try {
+          onResult(JSON.parse(line));
+        } catch (error) {
+          console.log(`Could not parse fleet inventory output: ${error}`);
+        }
+      });
+    child.on("error", (err) => {
+      reject({ success: false, message: err.message });
+    });
+    child.on("close", (code) => {
+      if (code !== 0) {
+        reject({ success: false, message: stderr });
+      } else {
+        resolve({ success: true, message: stderr });
+      }
+    });
+  });
+}
+
 // **Component Inventory API Endpoint START**
 router.post("/hardwareInventoryToDb", (req, res) => {
-  let msg = "";
   let countPass = 0;
   let countFail = 0;
-  let allQueries = [];
+  let allWrites = [];
   let queryPass = [];
   let queryFail = [];
 
   let _db = mongoUtil.getDb();
 
-  //Load the iDRAC IP list from a text file
+  //Count the iDRACs in the list for the summary message
   let idracIps = readLDfile(file_idracs);
 
-  //Loop through each iDRAC and get its inventory, then save it to db
-  idracIps.forEach((node_ip) => {
-    allQueries.push(
-      getServerInventory(node_ip)
-        .then((response) => {
-          if (response.success) {
-            countPass += 1;
-            //Collect IPs of those iDRACs that returned data
-            queryPass.push(node_ip);
-            msg = `${node_ip} -> Inventory call completed successfully. `;
-            //Get the string and parse it into JSON
-            let jsonData = JSON.parse(response.message);
-
-            //Call function to write query results to db
-            writeToInventoryColl(_db, jsonData)
-              .then((response) => {
-                if (response.success) {
-                  msg += `Write to db was successful.`;
-                  console.log(msg);
-                } else {
-                  msg += `Write to db failed.`;
-                  console.log(msg);
-                }
-              })
-              .catch((error) => {
-                console.log(
-                  `${node_ip} -> CATCH on writeToInventoryColl: ${error.statusText}`
-                );
-              });
-          } else {
-            countFail += 1;
-            //Collect IPs of those iDRACs that did not return data
-            queryFail.push(node_ip);
-            msg += `Inventory call on ${node_ip} failed.`;
-            console.log(msg);
-            throw new Error();
-          }
-        })
-        .catch((error) => {
-          //Collect IPs of those iDRACs that failed query
-          queryFail.push(node_ip);
-          console.log(
-            `${node_ip} -> CATCH on getServerInventory: ${error.statusText}`
-          );
-          // res.json({ success: false, message: error.statusText, results: error.message });
-        })
-    );
-  });
-  Promise.all(allQueries)
+  //Get inventory of every iDRAC in one Python process, and save each one to db
+  //as soon as it arrives
+  getFleetInventory(file_idracs, (result) => {
+    let node_ip = result.host;
+    if (result.success) {
+      countPass += 1;
+      //Collect IPs of those iDRACs that returned data
+      queryPass.push(node_ip);
+      let msg = `${node_ip} -> Inventory call completed successfully. `;
+
+      //Call function to write query results to db
+      allWrites.push(
+        writeToInventoryColl(_db, result.inventory)
+          .then((response) => {
+            if (response.success) {
+              msg += `Write to db was successful.`;
+              console.log(msg);
+            } else {
+              msg += `Write to db failed.`;
+              console.log(msg);
+            }
+          })
+          .catch((error) => {
+            console.log(
+              `${node_ip} -> CATCH on writeToInventoryColl: ${error.message}`
+            );
+          })
+      );
+    } else {
+      countFail += 1;
+      //Collect IPs of those iDRACs that did not return data
+      queryFail.push(node_ip);
+      console.log(`Inventory call on ${node_ip} failed: ${result.error}`);
+    }
+  })
+    .catch((error) => {
+      console.log(`CATCH on getFleetInventory: ${error.message}`);
+    })
+    .then(() => Promise.all(allWrites))
     .then(() => {
       console.log("All queries have been executed!");
       res.json({
@@ -0,0 +1,1110 @@
+#
+# Mock Redfish service modelled on a Dell iDRAC9 (PowerEdge XC740xd), used to
+# benchmark and regression-test the inventory tool without touching lab
+# iDRACs. It serves the resources the collectors read - System.Embedded.1,
+# Memory, Processors, Storage and Drives, Chassis and Enclosures, Power,
+# Thermal, NetworkInterfaces/NetworkAdapters/NetworkPorts, FirmwareInventory,
+# the TelemetryService metric reports (unless -nt) and the Managers - with
+# the payload shapes of a real iDRAC9, and supports
+# $expand=.($levels=n), ETag/If-None-Match and SessionService logins.
+#
+# It also stands in for the EventService Server-Sent Events stream
+# (/redfish/v1/SSE): events POSTed to /mock/events on a port, e.g.
+#
+#   {"MessageId": "PSU0003", "OriginOfCondition": "/redfish/v1/Chassis/..."}
+#
+# (or {"Events": [...]}) are sent to every client following that iDRAC's
+# stream.
+#
+# Each simulated iDRAC listens on its own localhost port over HTTPS, with
+# configurable per-request latency and jitter, a random 500 error rate, and
+# 503 + Retry-After throttling above a number of concurrent requests, so
+# hundreds of hosts can run from one process:
+#
+#   python benchmarks/mock_redfish.py -n 300 -port 28443 -l 0.05 -hf hosts.txt
+#
+# GET /mock/stats on any of the ports returns the request, byte and status
+# counters of the whole process (and is not counted itself), as are the event
+# requests.
+#
+
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_PORT = 28443
+STATS_URI = "/mock/stats"
+EVENTS_URI = "/mock/events"
+SSE_URI = "/redfish/v1/SSE"
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_KEEPALIVE = 15
+
+
+SYSTEM = "/redfish/v1/Systems/System.Embedded.1"
+CHASSIS = "/redfish/v1/Chassis/System.Embedded.1"
+MANAGER = "/redfish/v1/Managers/iDRAC.Embedded.1"
+
+
+def collection(uri, name, members):
+    return {
+        "@odata.context": "/redfish/v1/$metadata#%sCollection" % name,
+        "@odata.id": uri,
+        "@odata.type": "#%sCollection.%sCollection" % (name, name),
+        "Name": "%s Collection" % name,
+        "Members": [{"@odata.id": m} for m in members],
+        "Members@odata.count": len(members),
+    }
+
+
+def build_payloads(
+    index=0,
+    dimms=16,
+    cpus=2,
+    controllers=1,
+    drives=8,
+    nics=2,
+    ports=2,
+    psus=2,
+    fans=6,
+    telemetry=True,
+    chassis_tag=None,
+):
+    """Return a {uri: body} tree of a Dell PowerEdge server.
+
+    Without telemetry there is no TelemetryService, as on firmware older
+    than iDRAC9 4.00 or without a Datacenter license. With a chassis_tag it
+    is a sled of that modular chassis.
+    """
+    tag = "XC%05d" % index
+    p = {}
+    p["/redfish/v1"] = {
+        "@odata.id": "/redfish/v1",
+        "@odata.type": "#ServiceRoot.v1_6_0.ServiceRoot",
+        "Id": "RootService",
+        "Name": "Root Service",
+        "Product": "Integrated Dell Remote Access Controller",
+        "RedfishVersion": "1.11.0",
+        "Vendor": "Dell",
+        "Oem": {
+            "Dell": {
+                "ManagerMACAddress": "d0:94:66:00:%02x:%02x"
+                % divmod(index % 65536, 256),
+                "ServiceTag": tag,
+            }
+        },
+        "ProtocolFeaturesSupported": {
+            "ExpandQuery": {
+                "ExpandAll": True,
+                "Levels": True,
+                "Links": True,
+                "MaxLevels": 1,
+                "NoLinks": True,
+            },
+            "FilterQuery": True,
+            "SelectQuery": True,
+        },
+        "Systems": {"@odata.id": "/redfish/v1/Systems"},
+        "Chassis": {"@odata.id": "/redfish/v1/Chassis"},
+        "Managers": {"@odata.id": "/redfish/v1/Managers"},
+        "UpdateService": {"@odata.id": "/redfish/v1/UpdateService"},
+        "SessionService": {"@odata.id": "/redfish/v1/SessionService"},
+        "EventService": {"@odata.id": "/redfish/v1/EventService"},
+    }
+    fan_ids = [
+        "0x17||Fan.Embedded.%d%s" % (n // 2 + 1, "AB"[n % 2]) for n in range(fans)
+    ]
+    psu_ids = ["PSU.Slot.%d" % (n + 1) for n in range(psus)]
+    p[SYSTEM] = {
+        "@odata.context": "/redfish/v1/$metadata#ComputerSystem.ComputerSystem",
+        "@odata.id": SYSTEM,
+        "@odata.type": "#ComputerSystem.v1_12_0.ComputerSystem",
+        "Actions": {
+            "#ComputerSystem.Reset": {
+                "target": SYSTEM + "/Actions/ComputerSystem.Reset"
+            }
+        },
+        "AssetTag": "",
+        "Bios": {"@odata.id": SYSTEM + "/Bios"},
+        "BiosVersion": "2.10.2",
+        "Boot": {"BootSourceOverrideMode": "UEFI", "BootSourceOverrideTarget": "None"},
+        "Description": "Computer System which represents a machine (physical or virtual) and the local resources such as memory, cpu and other devices that can be accessed from that machine.",
+        "EthernetInterfaces": {"@odata.id": SYSTEM + "/EthernetInterfaces"},
+        "HostName": "xc-node-%d" % index,
+        "Id": "System.Embedded.1",
+        "IndicatorLED": "Lit",
+        "Links": {
+            "Chassis": [{"@odata.id": CHASSIS}],
+            "Chassis@odata.count": 1,
+            "CooledBy": [
+                {"@odata.id": CHASSIS + "/Sensors/Fans/" + f} for f in fan_ids
+            ],
+            "CooledBy@odata.count": fans,
+            "ManagedBy": [{"@odata.id": MANAGER}],
+            "ManagedBy@odata.count": 1,
+            "PoweredBy": [
+                {"@odata.id": CHASSIS + "/Power/PowerSupplies/" + s} for s in psu_ids
+            ],
+            "PoweredBy@odata.count": psus,
+        },
+        "Manufacturer": "Dell Inc.",
+        "Memory": {"@odata.id": SYSTEM + "/Memory"},
+        "MemorySummary": {
+            "MemoryMirroring": "System",
+            "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+            "TotalSystemMemoryGiB": 32 * dimms,
+        },
+        "Model": "XC740xd-24",
+        "Name": "System",
+        "NetworkInterfaces": {"@odata.id": SYSTEM + "/NetworkInterfaces"},
+        "Oem": {
+            "Dell": {
+                "DellSystem": {
+                    "@odata.context": "/redfish/v1/$metadata#DellSystem.DellSystem",
+                    "@odata.id": "/redfish/v1/Dell/Systems/System.Embedded.1/DellSystem/System.Embedded.1",
+                    "@odata.type": "#DellSystem.v1_2_0.DellSystem",
+                    "BIOSReleaseDate": "03/15/2021",
+                    "ChassisServiceTag": chassis_tag or tag,
+                    "LastSystemInventoryTime": "2021-05-04T10:11:12+00:00",
+                    "LastUpdateTime": "2021-05-04T10:15:00+00:00",
+                    "NodeID": tag,
+                }
+            }
+        },
+        "PCIeDevices": [],
+        "PCIeFunctions": [],
+        "PartNumber": "0W23H8A01",
+        "PowerState": "On",
+        "ProcessorSummary": {
+            "Count": cpus,
+            "LogicalProcessorCount": 40 * cpus,
+            "Model": "Intel(R) Xeon(R) Gold 6230 CPU @ 2.10GHz",
+            "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+        },
+        "Processors": {"@odata.id": SYSTEM + "/Processors"},
+        "SKU": tag,
+        "SecureBoot": {"@odata.id": SYSTEM + "/SecureBoot"},
+        "SerialNumber": "CNIVC00%05d" % index,
+        "SimpleStorage": {"@odata.id": SYSTEM + "/SimpleStorage"},
+        "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+        "Storage": {"@odata.id": SYSTEM + "/Storage"},
+        "SystemType": "Physical",
+        "UUID": "4c4c4544-0000-1000-8000-%012x" % index,
+    }
+    p[MANAGER] = {
+        "@odata.id": MANAGER,
+        "@odata.type": "#Manager.v1_9_0.Manager",
+        "FirmwareVersion": "4.40.10.00",
+        "Id": "iDRAC.Embedded.1",
+        "Model": "14G Monolithic",
+        "Name": "Manager",
+    }
+    fw = [
+        (
+            "Installed-25227-4.40.10.00",
+            "Integrated Dell Remote Access Controller",
+            "4.40.10.00",
+        ),
+        ("Installed-159-2.10.2", "BIOS", "2.10.2"),
+        ("Installed-27763-1.0.6", "System CPLD", "1.0.6"),
+        ("Installed-25806-51.14.0-3900", "PERC H740P Mini", "51.14.0-3900"),
+    ]
+    fw_uris = []
+    for fw_id, name, version in fw:
+        uri = "/redfish/v1/UpdateService/FirmwareInventory/" + fw_id
+        fw_uris.append(uri)
+        p[uri] = {
+            "@odata.id": uri,
+            "@odata.type": "#SoftwareInventory.v1_5_0.SoftwareInventory",
+            "Id": fw_id,
+            "Name": name,
+            "Status": {"Health": "OK", "State": "Enabled"},
+            "Updateable": True,
+            "Version": version,
+        }
+    p["/redfish/v1/UpdateService/FirmwareInventory"] = collection(
+        "/redfish/v1/UpdateService/FirmwareInventory", "SoftwareInventory", fw_uris
+    )
+
+    dimm_uris = []
+    for n in range(dimms):
+        slot = "DIMM.Socket.%s%d" % ("AB"[n % 2], n // 2 + 1)
+        uri = SYSTEM + "/Memory/" + slot
+        dimm_uris.append(uri)
+        p[uri] = {
+            "@odata.context": "/redfish/v1/$metadata#Memory.Memory",
+            "@odata.id": uri,
+            "@odata.type": "#Memory.v1_10_0.Memory",
+            "Assembly": {"@odata.id": "/redfish/v1/Chassis/System.Embedded.1/Assembly"},
+            "BusWidthBits": 72,
+            "CapacityMiB": 32768,
+            "DataWidthBits": 64,
+            "Description": "DIMM A%d" % (n + 1),
+            "DeviceLocator": "DIMM %s%d" % ("AB"[n % 2], n // 2 + 1),
+            "ErrorCorrection": "MultiBitECC",
+            "Id": slot,
+            "Links": {"Chassis": {"@odata.id": CHASSIS}},
+            "Manufacturer": "Hynix Semiconductor",
+            "MemoryDeviceType": "DDR4",
+            "Metrics": {"@odata.id": uri + "/MemoryMetrics"},
+            "Name": "DIMM A%d" % (n + 1),
+            "OperatingSpeedMhz": 2933,
+            "PartNumber": "HMA84GR7CJR4N-XN",
+            "RankCount": 2,
+            "SerialNumber": "%08X" % (index * 1000 + n),
+            "Status": {"Health": "OK", "State": "Enabled"},
+        }
+    p[SYSTEM + "/Memory"] = collection(SYSTEM + "/Memory", "Memory", dimm_uris)
+
+    cpu_uris = []
+    for n in range(cpus):
+        uri = SYSTEM + "/Processors/CPU.Socket.%d" % (n + 1)
+        cpu_uris.append(uri)
+        p[uri] = {
+            "@odata.context": "/redfish/v1/$metadata#Processor.Processor",
+            "@odata.id": uri,
+            "@odata.type": "#Processor.v1_10_0.Processor",
+            "Assembly": {"@odata.id": CHASSIS + "/Assembly"},
+            "Description": "Represents the properties of a Processor attached to this System",
+            "Id": "CPU.Socket.%d" % (n + 1),
+            "InstructionSet": "x86-64",
+            "Links": {"Chassis": {"@odata.id": CHASSIS}},
+            "Manufacturer": "Intel",
+            "MaxSpeedMHz": 4000,
+            "Metrics": {"@odata.id": uri + "/ProcessorMetrics"},
+            "Model": "Intel(R) Xeon(R) Gold 6230 CPU @ 2.10GHz",
+            "Name": "CPU %d" % (n + 1),
+            "Oem": {
+                "Dell": {
+                    "DellProcessor": {
+                        "@odata.context": "/redfish/v1/$metadata#DellProcessor.DellProcessor",
+                        "@odata.id": "/redfish/v1/Dell/Systems/System.Embedded.1/Processors/DellProcessor/CPU.Socket.%d"
+                        % (n + 1),
+                        "@odata.type": "#DellProcessor.v1_1_0.DellProcessor",
+                        "CPUFamily": "IntelXeon",
+                        "Cache1Size": 1280,
+                        "Cache2Size": 20480,
+                        "Cache3Size": 28160,
+                        "HyperThreadingEnabled": "Yes",
+                        "TurboModeEnabled": "Yes",
+                    }
+                }
+            },
+            "ProcessorType": "CPU",
+            "Socket": "CPU.Socket.%d" % (n + 1),
+            "Status": {"Health": "OK", "State": "Enabled"},
+            "TotalCores": 20,
+            "TotalThreads": 40,
+        }
+    p[SYSTEM + "/Processors"] = collection(
+        SYSTEM + "/Processors", "Processor", cpu_uris
+    )
+
+    storage_uris = []
+    enclosures = []
+    for c in range(controllers):
+        ctrl = "RAID.Integrated.1-1" if c == 0 else "RAID.Slot.%d-1" % (c + 1)
+        enclosure = "Enclosure.Internal.0-1:" + ctrl
+        enclosures.append(enclosure)
+        uri = SYSTEM + "/Storage/" + ctrl
+        storage_uris.append(uri)
+        drive_uris = []
+        for d in range(drives):
+            disk = "Disk.Bay.%d:%s" % (d, enclosure)
+            duri = uri + "/Drives/" + disk
+            drive_uris.append(duri)
+            p[duri] = {
+                "@odata.context": "/redfish/v1/$metadata#Drive.Drive",
+                "@odata.id": duri,
+                "@odata.type": "#Drive.v1_9_0.Drive",
+                "BlockSizeBytes": 512,
+                "CapableSpeedGbs": 12,
+                "CapacityBytes": 1919850381312,
+                "Description": "Disk %d in Backplane 1 of Storage Controller in Slot %d"
+                % (d, c + 1),
+                "Id": disk,
+                "Links": {
+                    "Chassis": {"@odata.id": "/redfish/v1/Chassis/" + enclosure},
+                    "Volumes": [],
+                },
+                "MediaType": "SSD",
+                "Model": "MZ7KH1T9HAJR0D3",
+                "Name": "Solid State Disk 0:1:%d" % d,
+                "PartNumber": "CN0WJDHCSSX00%04d" % d,
+                "PredictedMediaLifeLeftPercent": 100,
+                "Protocol": "SATA",
+                "Revision": "HE5A",
+                "SerialNumber": "S47PNA0N%06d" % (index * 100 + d),
+                "Status": {"Health": "OK", "State": "Enabled"},
+            }
+        p[uri] = {
+            "@odata.context": "/redfish/v1/$metadata#Storage.Storage",
+            "@odata.id": uri,
+            "@odata.type": "#Storage.v1_8_0.Storage",
+            "Description": "PERC H740P Mini",
+            "Drives": [{"@odata.id": d} for d in drive_uris],
+            "Drives@odata.count": len(drive_uris),
+            "Id": ctrl,
+            "Links": {
+                "Enclosures": [{"@odata.id": "/redfish/v1/Chassis/" + enclosure}]
+            },
+            "Name": "PERC H740P Mini",
+            "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+            "StorageControllers": [
+                {
+                    "@odata.id": uri + "#/StorageControllers/0",
+                    "FirmwareVersion": "51.14.0-3900",
+                    "Manufacturer": "DELL",
+                    "MemberId": ctrl,
+                    "Model": "PERC H740P Mini",
+                    "Name": "PERC H740P Mini",
+                    "SpeedGbps": 12,
+                    "Status": {
+                        "Health": "OK",
+                        "HealthRollup": "OK",
+                        "State": "Enabled",
+                    },
+                    "SupportedControllerProtocols": ["PCIe"],
+                    "SupportedDeviceProtocols": ["SAS", "SATA"],
+                }
+            ],
+            "Volumes": {"@odata.id": uri + "/Volumes"},
+        }
+    p[SYSTEM + "/Storage"] = collection(SYSTEM + "/Storage", "Storage", storage_uris)
+
+    chassis_uris = [CHASSIS] + ["/redfish/v1/Chassis/" + e for e in enclosures]
+    p["/redfish/v1/Chassis"] = collection(
+        "/redfish/v1/Chassis", "Chassis", chassis_uris
+    )
+    p[CHASSIS] = {
+        "@odata.id": CHASSIS,
+        "@odata.type": "#Chassis.v1_11_0.Chassis",
+        "ChassisType": "RackMount",
+        "Id": "System.Embedded.1",
+        "Links": {"ComputerSystems": [{"@odata.id": SYSTEM}]},
+        "Manufacturer": "Dell Inc.",
+        "Model": "XC740xd-24",
+        "Name": "Computer System Chassis",
+        "Power": {"@odata.id": CHASSIS + "/Power"},
+        "SKU": tag,
+        "SerialNumber": "CNIVC00%05d" % index,
+        "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+        "Thermal": {"@odata.id": CHASSIS + "/Thermal"},
+    }
+    for e in enclosures:
+        uri = "/redfish/v1/Chassis/" + e
+        p[uri] = {
+            "@odata.context": "/redfish/v1/$metadata#Chassis.Chassis",
+            "@odata.id": uri,
+            "@odata.type": "#Chassis.v1_11_0.Chassis",
+            "Actions": {},
+            "ChassisType": "Enclosure",
+            "Description": "It is a logical representation of the backplane enclosure",
+            "Id": e,
+            "Links": {"ContainedBy": {"@odata.id": CHASSIS}},
+            "Manufacturer": "DELL",
+            "Model": "BP14G+EXP 0:1",
+            "Name": "BP14G+EXP 0:1",
+            "PCIeDevices": [],
+            "Status": {"Health": "OK", "HealthRollup": "OK", "State": "Enabled"},
+        }
+
+    psu_bodies = []
+    for n, s in enumerate(psu_ids):
+        uri = CHASSIS + "/Power/PowerSupplies/" + s
+        body = {
+            "@odata.context": "/redfish/v1/$metadata#Power.Power",
+            "@odata.id": uri,
+            "@odata.type": "#Power.v1_5_0.PowerSupply",
+            "FirmwareVersion": "00.1B.53",
+            "LastPowerOutputWatts": 1100,
+            "LineInputVoltage": 230,
+            "Manufacturer": "DELL",
+            "MemberId": s,
+            "Model": "PWR SPLY,1100W,RDNT,DELTA",
+            "Name": "PS%d Status" % (n + 1),
+            "PartNumber": "01CW9GA04",
+            "PowerCapacityWatts": 1100,
+            "PowerInputWatts": 204 + n,
+            "PowerSupplyType": "AC",
+            "SerialNumber": "CNDED00%05d%d" % (index, n),
+            "SparePartNumber": "01CW9GA04",
+            "Status": {"Health": "OK", "State": "Enabled"},
+        }
+        p[uri] = body
+        psu_bodies.append(body)
+    p[CHASSIS + "/Power"] = {
+        "@odata.context": "/redfish/v1/$metadata#Power.Power",
+        "@odata.id": CHASSIS + "/Power",
+        "@odata.type": "#Power.v1_5_0.Power",
+        "Id": "Power",
+        "Name": "Power",
+        "PowerControl": [
+            {
+                "@odata.id": CHASSIS + "/Power/PowerControl",
+                "MemberId": "PowerControl",
+                "Name": "System Power Control",
+                "PowerCapacityWatts": 2254,
+                "PowerConsumedWatts": 408,
+                "PowerMetrics": {
+                    "AverageConsumedWatts": 401,
+                    "IntervalInMin": 1,
+                    "MaxConsumedWatts": 440,
+                    "MinConsumedWatts": 390,
+                },
+            }
+        ],
+        "PowerSupplies": psu_bodies,
+        "PowerSupplies@odata.count": len(psu_bodies),
+        "Redundancy": [],
+        "Voltages": [],
+    }
+    fan_bodies = []
+    for n, f in enumerate(fan_ids):
+        uri = CHASSIS + "/Sensors/Fans/" + f
+        body = {
+            "@odata.context": "/redfish/v1/$metadata#Thermal.Thermal",
+            "@odata.id": uri,
+            "@odata.type": "#Thermal.v1_6_0.Fan",
+            "FanName": "System Board Fan%d%s" % (n // 2 + 1, "AB"[n % 2]),
+            "MaxReadingRange": 197,
+            "MemberId": f,
+            "MinReadingRange": 720,
+            "Name": "System Board Fan%d%s" % (n // 2 + 1, "AB"[n % 2]),
+            "PhysicalContext": "SystemBoard",
+            "Reading": 6840 + 60 * n,
+            "ReadingUnits": "RPM",
+            "Status": {"Health": "OK", "State": "Enabled"},
+        }
+        p[uri] = body
+        fan_bodies.append(body)
+    p[CHASSIS + "/Thermal"] = {
+        "@odata.context": "/redfish/v1/$metadata#Thermal.Thermal",
+        "@odata.id": CHASSIS + "/Thermal",
+        "@odata.type": "#Thermal.v1_6_0.Thermal",
+        "Fans": fan_bodies,
+        "Fans@odata.count": len(fan_bodies),
+        "Id": "Thermal",
+        "Name": "Thermal",
+        "Redundancy": [],
+        "Temperatures": [
+            {
+                "@odata.id": CHASSIS
+                + "/Sensors/Temperatures/iDRAC.Embedded.1SystemBoardInletTemp",
+                "MemberId": "iDRAC.Embedded.1SystemBoardInletTemp",
+                "Name": "System Board Inlet Temp",
+                "PhysicalContext": "SystemBoard",
+                "ReadingCelsius": 23,
+                "Status": {"Health": "OK", "State": "Enabled"},
+            },
+            {
+                "@odata.id": CHASSIS
+                + "/Sensors/Temperatures/iDRAC.Embedded.1SystemBoardExhaustTemp",
+                "MemberId": "iDRAC.Embedded.1SystemBoardExhaustTemp",
+                "Name": "System Board Exhaust Temp",
+                "PhysicalContext": "SystemBoard",
+                "ReadingCelsius": 38,
+                "Status": {"Health": "OK", "State": "Enabled"},
+            },
+        ],
+        "Temperatures@odata.count": 2,
+    }
+
+    nic_uris = []
+    for n in range(nics):
+        nic = "NIC.Integrated.1" if n == 0 else "NIC.Slot.%d" % (n + 1)
+        iface = SYSTEM + "/NetworkInterfaces/" + nic
+        adapter = SYSTEM + "/NetworkAdapters/" + nic
+        nic_uris.append(iface)
+        p[iface] = {
+            "@odata.id": iface,
+            "@odata.type": "#NetworkInterface.v1_1_3.NetworkInterface",
+            "Id": nic,
+            "Links": {"NetworkAdapter": {"@odata.id": adapter}},
+            "Name": "NetworkInterface",
+        }
+        port_uris = []
+        for q in range(ports):
+            port = "%s-%d" % (nic, q + 1)
+            puri = adapter + "/NetworkPorts/" + port
+            port_uris.append(puri)
+            p[puri] = {
+                "@odata.context": "/redfish/v1/$metadata#NetworkPort.NetworkPort",
+                "@odata.id": puri,
+                "@odata.type": "#NetworkPort.v1_2_4.NetworkPort",
+                "ActiveLinkTechnology": "Ethernet",
+                "AssociatedNetworkAddresses": [
+                    "24:6E:96:%02X:%02X:%02X" % (index % 256, n, q)
+                ],
+                "CurrentLinkSpeedMbps": 25000,
+                "Description": "Network Port View",
+                "FlowControlConfiguration": "None",
+                "Id": port,
+                "LinkStatus": "Up",
+                "Name": "Network Port View",
+                "PhysicalPortNumber": str(q + 1),
+                "Status": {"Health": "OK", "State": "Enabled"},
+            }
+        p[adapter + "/NetworkPorts"] = collection(
+            adapter + "/NetworkPorts", "NetworkPort", port_uris
+        )
+        p[adapter] = {
+            "@odata.context": "/redfish/v1/$metadata#NetworkAdapter.NetworkAdapter",
+            "@odata.id": adapter,
+            "@odata.type": "#NetworkAdapter.v1_5_0.NetworkAdapter",
+            "Assembly": {"@odata.id": adapter + "/Assembly"},
+            "Controllers": [
+                {
+                    "ControllerCapabilities": {
+                        "DataCenterBridging": {"Capable": True},
+                        "NetworkPortCount": ports,
+                    },
+                    "FirmwarePackageVersion": "21.80.9",
+                    "Links": {"NetworkPorts": [{"@odata.id": u} for u in port_uris]},
+                }
+            ],
+            "Description": "Network Adapter View",
+            "Id": nic,
+            "Manufacturer": "Mellanox Technologies",
+            "Model": "ConnectX-4 LX",
+            "Name": "Network Adapter View",
+            "NetworkDeviceFunctions": {
+                "@odata.id": adapter + "/NetworkDeviceFunctions"
+            },
+            "NetworkPorts": {"@odata.id": adapter + "/NetworkPorts"},
+            "PartNumber": "0XR0K3",
+            "SerialNumber": "IL7510%05d%d" % (index, n),
+            "Status": {"Health": "OK", "State": "Enabled"},
+        }
+    if telemetry:
+        add_metric_reports(p, index)
+    p["/redfish/v1/EventService"] = {
+        "@odata.id": "/redfish/v1/EventService",
+        "@odata.type": "#EventService.v1_7_0.EventService",
+        "EventFormatTypes": ["Event", "MetricReport"],
+        "Id": "EventService",
+        "Name": "Event Service",
+        "ServerSentEventUri": SSE_URI,
+        "ServiceEnabled": True,
+        "Status": {"Health": "OK", "State": "Enabled"},
+        "Subscriptions": {"@odata.id": "/redfish/v1/EventService/Subscriptions"},
+    }
+    p[SYSTEM + "/NetworkInterfaces"] = collection(
+        SYSTEM + "/NetworkInterfaces", "NetworkInterface", nic_uris
+    )
+    p[SYSTEM + "/NetworkAdapters"] = collection(
+        SYSTEM + "/NetworkAdapters",
+        "NetworkAdapter",
+        [u.replace("Interfaces", "Adapters") for u in nic_uris],
+    )
+    return p
+
+
+def metric_value(metric_id, fqdd, value, source, timestamp):
+    return {
+        "MetricId": metric_id,
+        "MetricValue": str(value),
+        "Oem": {
+            "Dell": {
+                "ContextID": fqdd,
+                "FQDD": fqdd,
+                "Label": "%s %s" % (fqdd, metric_id),
+                "Source": source,
+            }
+        },
+        "Timestamp": timestamp,
+    }
+
+
+def add_metric_reports(p, index):
+    """TelemetryService with the PowerMetrics, ThermalSensor and FanSensor
+    reports of iDRAC9, built from the Power and Thermal resources."""
+    service = "/redfish/v1/TelemetryService"
+    reports = service + "/MetricReports"
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    p["/redfish/v1"]["TelemetryService"] = {"@odata.id": service}
+    p[service] = {
+        "@odata.id": service,
+        "@odata.type": "#TelemetryService.v1_2_0.TelemetryService",
+        "Id": "TelemetryService",
+        "MetricReports": {"@odata.id": reports},
+        "Name": "Telemetry Service",
+        "Status": {"Health": "OK", "State": "Enabled"},
+    }
+    power = p[CHASSIS + "/Power"]
+    thermal = p[CHASSIS + "/Thermal"]
+    values = {
+        "PowerMetrics": [
+            metric_value(
+                "SystemInputPower",
+                "System.Embedded.1",
+                power["PowerControl"][0]["PowerConsumedWatts"] + index % 7,
+                "PowerMetrics",
+                timestamp,
+            )
+        ]
+        + [
+            metric_value(
+                "InputPower", psu["MemberId"], psu["PowerInputWatts"], "PSU", timestamp
+            )
+            for psu in power["PowerSupplies"]
+        ],
+        "ThermalSensor": [
+            metric_value(
+                "TemperatureReading",
+                temperature["MemberId"],
+                temperature["ReadingCelsius"],
+                "TemperatureSensor",
+                timestamp,
+            )
+            for temperature in thermal["Temperatures"]
+        ],
+        "FanSensor": [
+            metric_value(
+                "RPMReading",
+                fan["MemberId"].split("||")[-1],
+                fan["Reading"],
+                "FanSensor",
+                timestamp,
+            )
+            for fan in thermal["Fans"]
+        ],
+    }
+    for name, metric_values in values.items():
+        p[reports + "/" + name] = {
+            "@odata.id": reports + "/" + name,
+            "@odata.type": "#MetricReport.v1_4_1.MetricReport",
+            "Id": name,
+            "MetricValues": metric_values,
+            "MetricValues@odata.count": len(metric_values),
+            "Name": "%s Metric Report" % name,
+            "Timestamp": timestamp,
+        }
+    p[reports] = collection(
+        reports, "MetricReport", [reports + "/" + n for n in values]
+    )
+
+
+EXPAND_PATTERN = re.compile(r"^([.*~])(?:\(\$levels=(\d+)\))?$")
+
+
+def resource_etag(body):
+    return (
+        'W/"%s"'
+        % hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+    )
+
+
+def expand_body(payloads, body, levels):
+    """Inline subordinate resources referenced by Members and navigation links."""
+    if levels <= 0 or not isinstance(body, dict):
+        return body
+    out = dict(body)
+    for key, value in body.items():
+        if key in ("Links", "@odata.id") or key.startswith("@"):
+            continue
+        if isinstance(value, list):
+            items = []
+            for v in value:
+                if (
+                    isinstance(v, dict)
+                    and list(v) == ["@odata.id"]
+                    and v["@odata.id"] in payloads
+                ):
+                    items.append(
+                        expand_body(payloads, payloads[v["@odata.id"]], levels - 1)
+                    )
+                else:
+                    items.append(v)
+            out[key] = items
+        elif (
+            isinstance(value, dict)
+            and list(value) == ["@odata.id"]
+            and value["@odata.id"] in payloads
+        ):
+            out[key] = expand_body(payloads, payloads[value["@odata.id"]], levels - 1)
+    return out
+
+
+class MockIdrac(object):
+    """State and fault settings of one simulated iDRAC."""
+
+    def __init__(
+        self,
+        payloads,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        max_in_flight=0,
+        username="root",
+        password="calvin",
+        hang_uris=(),
+    ):
+        self.payloads = payloads
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Above this many concurrent requests answer 503 (0 = never throttle)
+        self.max_in_flight = max_in_flight
+        # Requests for these paths never get an answer, to exercise timeouts
+        self.hang_uris = set(hang_uris)
+        self.auth = "Basic %s" % basic_credentials(username, password)
+        self.tokens = set()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.status_counts = {}
+        # One queue per client following the SSE stream
+        self.subscribers = []
+
+    def publish(self, events):
+        """Send Redfish events to every client following the SSE stream."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(events)
+        return len(subscribers)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes": self.bytes_sent,
+                "status": dict(self.status_counts),
+            }
+
+
+def basic_credentials(username, password):
+    return base64.b64encode(("%s:%s" % (username, password)).encode()).decode()
+
+
+def total_stats(idracs):
+    """Sum the counters of several MockIdracs."""
+    total = {"hosts": len(idracs), "requests": 0, "bytes": 0, "status": {}}
+    for idrac in idracs:
+        stats = idrac.stats()
+        total["requests"] += stats["requests"]
+        total["bytes"] += stats["bytes"]
+        for status, count in stats["status"].items():
+            total["status"][status] = total["status"].get(status, 0) + count
+    return total
+
+
+def make_handler(idrac, fleet=None):
+    """Request handler class serving one MockIdrac.
+
+    fleet is the list of every MockIdrac in the process, reported by
+    STATS_URI.
+    """
+    fleet = fleet if fleet is not None else [idrac]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body=None, headers=None, counted=True):
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header(
+                "Content-Type", "application/json;odata.metadata=minimal;charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+            if counted:
+                with idrac.lock:
+                    idrac.requests += 1
+                    idrac.bytes_sent += len(data)
+                    idrac.status_counts[status] = idrac.status_counts.get(status, 0) + 1
+
+        def error(self, status, code, headers=None):
+            self.send(status, {"error": {"code": "Base.1.8.%s" % code}}, headers)
+
+        def authorized(self):
+            return (
+                self.headers.get("Authorization") == idrac.auth
+                or self.headers.get("X-Auth-Token") in idrac.tokens
+            )
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            uri = unquote(parts.path).rstrip("/") or "/"
+            if uri == STATS_URI:
+                return self.send(200, total_stats(fleet), counted=False)
+            if uri == SSE_URI:
+                return self.stream_events()
+            with idrac.lock:
+                idrac.in_flight += 1
+                throttled = (
+                    idrac.max_in_flight and idrac.in_flight > idrac.max_in_flight
+                )
+            try:
+                delay = idrac.latency + random.uniform(0, idrac.jitter)
+                if delay:
+                    time.sleep(delay)
+                if uri in idrac.hang_uris:
+                    time.sleep(3600)
+                if throttled:
+                    return self.error(
+                        503, "ServiceTemporarilyUnavailable", {"Retry-After": "1"}
+                    )
+                if idrac.error_rate and random.random() < idrac.error_rate:
+                    return self.error(500, "InternalError")
+                # The service root is readable without credentials
+                if uri != "/redfish/v1" and not self.authorized():
+                    return self.error(401, "AccessDenied")
+                body = idrac.payloads.get(uri)
+                if body is None:
+                    return self.error(404, "ResourceMissingAtURI")
+                query = unquote(parts.query)
+                if query.startswith("$expand="):
+                    match = EXPAND_PATTERN.match(query[len("$expand=") :])
+                    if not match:
+                        return self.error(400, "QueryParameterValueFormatError")
+                    body = expand_body(idrac.payloads, body, int(match.group(2) or 1))
+                etag = resource_etag(body)
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, None, {"ETag": etag})
+                self.send(200, body, {"ETag": etag})
+            finally:
+                with idrac.lock:
+                    idrac.in_flight -= 1
+
+        def stream_events(self):
+            if not self.authorized():
+                return self.error(401, "AccessDenied")
+            subscriber = queue.Queue()
+            with idrac.lock:
+                idrac.subscribers.append(subscriber)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.close_connection = True
+            sequence = 0
+            try:
+                while True:
+                    try:
+                        events = subscriber.get(timeout=SSE_KEEPALIVE)
+                    except queue.Empty:
+                        self.wfile.write(b": keep-alive\n\n")
+                    else:
+                        sequence += 1
+                        body = {
+                            "@odata.type": "#Event.v1_4_0.Event",
+                            "Id": str(sequence),
+                            "Name": "Event Array",
+                            "Events": events,
+                        }
+                        self.wfile.write(
+                            b"id: %d\ndata: %s\n\n"
+                            % (sequence, json.dumps(body).encode())
+                        )
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError, ssl.SSLError):
+                pass
+            finally:
+                with idrac.lock:
+                    idrac.subscribers.remove(subscriber)
+
+        def post_events(self, data):
+            events = data.get("Events") or [data]
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+            for n, event in enumerate(events):
+                event.setdefault("EventId", str(n + 1))
+                event.setdefault("EventTimestamp", timestamp)
+                event.setdefault("EventType", "Alert")
+                event.setdefault("Severity", "Warning")
+                if isinstance(event.get("OriginOfCondition"), str):
+                    event["OriginOfCondition"] = {
+                        "@odata.id": event["OriginOfCondition"]
+                    }
+            subscribers = idrac.publish(events)
+            self.send(200, {"subscribers": subscribers}, counted=False)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            data = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/") == EVENTS_URI:
+                return self.post_events(data)
+            if self.path.rstrip("/") != "/redfish/v1/SessionService/Sessions":
+                return self.error(405, "OperationNotAllowed")
+            credentials = basic_credentials(data.get("UserName"), data.get("Password"))
+            if "Basic %s" % credentials != idrac.auth:
+                return self.error(401, "AccessDenied")
+            token = hashlib.sha1(os.urandom(16)).hexdigest()
+            with idrac.lock:
+                idrac.tokens.add(token)
+            self.send(
+                201,
+                {"Id": token[:8]},
+                {
+                    "X-Auth-Token": token,
+                    "Location": "/redfish/v1/SessionService/Sessions/%s" % token[:8],
+                },
+            )
+
+        def do_DELETE(self):
+            self.send(204)
+
+    return Handler
+
+
+def make_certificate(directory):
+    """Create a throwaway self-signed certificate with openssl; returns (cert, key)."""
+    certfile = os.path.join(directory, "mock_redfish.pem")
+    keyfile = os.path.join(directory, "mock_redfish.key")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "7",
+            "-subj",
+            "/CN=localhost",
+            "-keyout",
+            keyfile,
+            "-out",
+            certfile,
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return certfile, keyfile
+
+
+def serve(port, idrac, certfile, keyfile, host="127.0.0.1", fleet=None):
+    """Serve a MockIdrac over HTTPS on a background thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(idrac, fleet))
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_fleet(count, port, certfile, keyfile, telemetry=True, sleds=0, **options):
+    """Serve `count` MockIdracs on consecutive ports; returns the MockIdracs.
+
+    With sleds, every `sleds` consecutive iDRACs are the sleds of one chassis.
+    """
+    fleet = []
+    for index in range(count):
+        chassis_tag = "CH%05d" % (index // sleds) if sleds else None
+        idrac = MockIdrac(
+            build_payloads(index, telemetry=telemetry, chassis_tag=chassis_tag),
+            **options
+        )
+        fleet.append(idrac)
+        serve(port + index, idrac, certfile, keyfile, fleet=fleet)
+    return fleet
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mock Dell iDRAC Redfish service for benchmarking get_iDRAC_Inventory.py"
+    )
+    parser.add_argument("-n", help="Number of iDRACs to simulate", type=int, default=1)
+    parser.add_argument(
+        "-port",
+        help="Port of the first iDRAC, the rest follow, default %d" % DEFAULT_PORT,
+        type=int,
+        default=DEFAULT_PORT,
+    )
+    parser.add_argument(
+        "-l", help="Latency of every request in seconds", type=float, default=0.0
+    )
+    parser.add_argument(
+        "-j",
+        help="Extra random latency of up to this many seconds",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "-e",
+        help="Fraction of requests answered with a 500 error",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "-t",
+        help="Answer 503 with Retry-After above this many concurrent requests per iDRAC",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-hang",
+        help="Never answer requests for this URI (repeatable), to exercise timeouts",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "-nt",
+        help="No TelemetryService metric reports (older firmware)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-sl",
+        help="Simulate modular chassis with this many sleds each, sharing PSUs, fans and backplanes",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-hf", help="Write the IP:port of every simulated iDRAC to this file"
+    )
+    parser.add_argument("-cert", help="TLS certificate (self-signed one if not given)")
+    parser.add_argument("-key", help="TLS private key for -cert")
+    args = vars(parser.parse_args())
+
+    if args["cert"]:
+        certfile, keyfile = args["cert"], args["key"] or args["cert"]
+    else:
+        certfile, keyfile = make_certificate(tempfile.mkdtemp(prefix="mock_redfish"))
+    serve_fleet(
+        args["n"],
+        args["port"],
+        certfile,
+        keyfile,
+        latency=args["l"],
+        jitter=args["j"],
+        error_rate=args["e"],
+        max_in_flight=args["t"],
+        hang_uris=args["hang"],
+        telemetry=not args["nt"],
+        sleds=args["sl"],
+    )
+    if args["hf"]:
+        with open(args["hf"], "w") as hosts_file:
+            for index in range(args["n"]):
+                hosts_file.write("127.0.0.1:%d\n" % (args["port"] + index))
+    print("ready", flush=True)
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        sys.exit()
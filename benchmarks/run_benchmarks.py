@@ -0,0 +1,232 @@
+#
+# Inventory benchmark suite. Starts the mock Redfish service (mock_redfish.py)
+# in its own process, runs get_iDRAC_Inventory.py against it for a set of
+# scenarios - single host with and without $expand, token auth, a whole
+# fleet, and a sensor metrics poll - and reports for each the wall time, the
+# number of Redfish requests and bytes the mock served, and the peak RSS of
+# the inventory process:
+#
+#   python benchmarks/run_benchmarks.py -n 300 -l 0.05
+#
+# Everything runs on localhost, so numbers can be compared between commits
+# without touching lab iDRACs.
+#
+
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import requests
+
+warnings.filterwarnings("ignore")
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+INVENTORY_SCRIPT = os.path.join(
+    os.path.dirname(BENCHMARKS_DIR), "get_iDRAC_Inventory.py"
+)
+MOCK_SCRIPT = os.path.join(BENCHMARKS_DIR, "mock_redfish.py")
+
+DEFAULT_PORT = 28443
+DEFAULT_FLEET_SIZE = 300
+
+# name -> (fleet mode, extra inventory arguments)
+SCENARIOS = {
+    "single": (False, []),
+    "single-nx": (False, ["-nx", "y"]),
+    "single-ta": (False, ["-ta", "y"]),
+    "fleet": (True, []),
+    "metrics": (False, ["-mt", "y"]),
+}
+
+
+def start_mock(args, hosts_file):
+    command = [
+        sys.executable,
+        MOCK_SCRIPT,
+        "-n",
+        str(args["n"]),
+        "-port",
+        str(args["port"]),
+        "-l",
+        str(args["l"]),
+        "-j",
+        str(args["j"]),
+        "-e",
+        str(args["e"]),
+        "-t",
+        str(args["t"]),
+        "-hf",
+        hosts_file,
+    ]
+    mock = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    if mock.stdout.readline().strip() != "ready":
+        mock.kill()
+        sys.exit("- FAIL, mock Redfish service did not start")
+    return mock
+
+
+def mock_stats(port):
+    response = requests.get(
+        "https://127.0.0.1:%d/mock/stats" % port, verify=False, timeout=30
+    )
+    return response.json()
+
+
+def count_failures(output, fleet):
+    """Hosts that failed outright or came back with section errors."""
+    failed = 0
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if fleet:
+            failed += not record["success"] or "Errors" in record.get("inventory", {})
+        else:
+            failed += "Errors" in record
+    return failed
+
+
+def run_inventory(command, fleet):
+    """Run one inventory and return its wall time, peak RSS and failed hosts."""
+    with tempfile.TemporaryFile(mode="w+") as output:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command, stdout=output, stderr=subprocess.DEVNULL, text=True
+        )
+        # wait4 gives the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        failed = count_failures(output.read(), fleet)
+    if process.returncode:
+        failed = max(failed, 1)
+    # ru_maxrss is in KB on Linux
+    return elapsed, usage.ru_maxrss / 1024.0, failed
+
+
+def run_scenario(name, args, hosts_file):
+    fleet, extra = SCENARIOS[name]
+    command = [sys.executable, INVENTORY_SCRIPT, "-u", "root", "-p", "calvin"]
+    command += ["-a", "y"] + extra + shlex.split(args["x"] or "")
+    if fleet:
+        command += ["-fl", hosts_file]
+        if args["w"]:
+            command += ["-w", str(args["w"])]
+    else:
+        command += ["-ip", "127.0.0.1:%d" % args["port"]]
+    times, peak_rss, failed = [], 0.0, 0
+    before = mock_stats(args["port"])
+    for _ in range(args["rp"]):
+        elapsed, rss, run_failed = run_inventory(command, fleet)
+        times.append(elapsed)
+        peak_rss = max(peak_rss, rss)
+        failed = max(failed, run_failed)
+    after = mock_stats(args["port"])
+    return {
+        "scenario": name,
+        "hosts": args["n"] if fleet else 1,
+        "wall_s": round(statistics.median(times), 3),
+        "requests": (after["requests"] - before["requests"]) // args["rp"],
+        "bytes": (after["bytes"] - before["bytes"]) // args["rp"],
+        "peak_rss_mb": round(peak_rss, 1),
+        "failed_hosts": failed,
+    }
+
+
+def print_results(results):
+    print(
+        "%-12s %6s %9s %9s %11s %12s %7s"
+        % ("Scenario", "Hosts", "Wall s", "Requests", "KB", "Peak RSS MB", "Failed")
+    )
+    for result in results:
+        print(
+            "%-12s %6d %9.2f %9d %11.1f %12.1f %7d"
+            % (
+                result["scenario"],
+                result["hosts"],
+                result["wall_s"],
+                result["requests"],
+                result["bytes"] / 1024.0,
+                result["peak_rss_mb"],
+                result["failed_hosts"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark get_iDRAC_Inventory.py against a local mock Redfish fleet"
+    )
+    parser.add_argument(
+        "-s",
+        help="Scenario to run (repeatable), one of %s; default all"
+        % ", ".join(SCENARIOS),
+        action="append",
+        choices=list(SCENARIOS),
+    )
+    parser.add_argument(
+        "-n",
+        help="Number of simulated iDRACs for the fleet scenario, default %d"
+        % DEFAULT_FLEET_SIZE,
+        type=int,
+        default=DEFAULT_FLEET_SIZE,
+    )
+    parser.add_argument(
+        "-w", help="Fleet workers (-w of get_iDRAC_Inventory.py)", type=int
+    )
+    parser.add_argument(
+        "-l", help="Mock latency per request in seconds", type=float, default=0.05
+    )
+    parser.add_argument(
+        "-j", help="Mock extra random latency in seconds", type=float, default=0.0
+    )
+    parser.add_argument(
+        "-e", help="Mock fraction of 500 errors", type=float, default=0.0
+    )
+    parser.add_argument(
+        "-t",
+        help="Mock throttling: concurrent requests per iDRAC before 503",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-rp", help="Runs per scenario (median wall time)", type=int, default=1
+    )
+    parser.add_argument(
+        "-x", help='Extra get_iDRAC_Inventory.py arguments, e.g. "-r 4 -ta y"'
+    )
+    parser.add_argument(
+        "-port",
+        help="First mock port, default %d" % DEFAULT_PORT,
+        type=int,
+        default=DEFAULT_PORT,
+    )
+    parser.add_argument("-o", help="Also write the results as JSON to this file")
+    args = vars(parser.parse_args())
+    args["rp"] = max(1, args["rp"])
+
+    hosts_file = os.path.join(tempfile.mkdtemp(prefix="inventory_bench"), "hosts.txt")
+    mock = start_mock(args, hosts_file)
+    try:
+        results = [
+            run_scenario(name, args, hosts_file) for name in args["s"] or SCENARIOS
+        ]
+    finally:
+        mock.terminate()
+        mock.wait()
+    print_results(results)
+    if args["o"]:
+        with open(args["o"], "w") as results_file:
+            json.dump(results, results_file, indent=2)
@@ -18,25 +18,45 @@
 #
 
 
-import requests
 import json
 import sys
-import re
-import time
-import warnings
 import argparse
 import os
+import queue
+import threading
 
-from datetime import datetime
+import requests
 
-warnings.filterwarnings("ignore")
+from idrac_inventory import IdracInventoryClient, read_hosts, run_fleet
+from idrac_inventory.archive import archived_hosts
+from idrac_inventory.chassis import SharedChassis
+from idrac_inventory.collectors import FLAG_SECTIONS, SECTION_FLAGS
+from idrac_inventory.component_store import QUERY_COLUMNS, ComponentStore
+from idrac_inventory.daemon import DEFAULT_IDLE_TIMEOUT, serve
+from idrac_inventory.diff import InventoryDiffer, collected_sections
+from idrac_inventory.discovery import Discovery, target_addresses
+from idrac_inventory.events import EVENT_TTLS, EventListener
+from idrac_inventory.fleet import DEFAULT_WORKERS, inventory_host
+from idrac_inventory.mongo import DEFAULT_DB_NAME, InventoryStore
+from idrac_inventory.ndjson import NdjsonWriter
+from idrac_inventory.ratelimit import FleetLimiter, parse_size, parse_subnet_caps
+from idrac_inventory.scheduler import DEFAULT_TTLS, RefreshScheduler, parse_ttls
+from idrac_inventory.session import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_IN_FLIGHT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRIES,
+    RedfishError,
+)
+from idrac_inventory.telemetry import DEFAULT_REPORTS, metrics_host
+from idrac_inventory.trace import Tracer
 
 parser = argparse.ArgumentParser(
     description="Python script using Redfish API to get system hardware inventory(output will be printed to the screen and also can be exported to a json file by passing argument). This includes information for storage controllers, memory, network devices, general system details, power supplies, hard drives, fans, backplanes, processors"
 )
-parser.add_argument("-ip", help="iDRAC IP address", required=True)
-parser.add_argument("-u", help="iDRAC username", required=True)
-parser.add_argument("-p", help="iDRAC password", required=True)
+parser.add_argument("-ip", help="iDRAC IP address", required=False)
+parser.add_argument("-u", help="iDRAC username", required=False)
+parser.add_argument("-p", help="iDRAC password", required=False)
 parser.add_argument(
     "script_examples",
     action="store_true",
@@ -81,951 +101,622 @@ parser.add_argument(
     required=False,
 )
 
-
-args = vars(parser.parse_args())
-
-idrac_ip = args["ip"]
-idrac_username = args["u"]
-idrac_password = args["p"]
-
-file_name = "hw_inventory_%s.json" % idrac_ip
-
-idrac_inventory = {
-    "SystemInformation": {},
-    "MemoryInformation": {},
-    "ProcessorInformation": {},
-    "StorageControllerInformation": {},
-    "StorageDisksInformation": {},
-    "NetworkDeviceInformation": {},
-    "PowerSupplyInformation": {},
-    "BackplaneInformation": {},
-    "FanInformation": {},
-}
-
-try:
-    os.remove(file_name)
-except:
-    pass
-
-
-def check_supported_idrac_version():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
-    )
-    data = response.json()
-    if response.status_code != 200:
-        print(
-            "\n- WARNING, iDRAC version installed does not support this feature using Redfish API"
-        )
-        sys.exit()
-    else:
-        pass
+parser.add_argument(
+    "-fl",
+    help='Fleet mode: inventory every iDRAC listed in a file (one IP per line, pass in "-" to read stdin) and print one JSON result per host per line',
+    required=False,
+)
+parser.add_argument(
+    "-dsc",
+    help="Discover the iDRACs among these addresses, comma-separated networks, ranges or IPs (e.g. 10.10.0.0/16 or 192.168.0.100-199): concurrent TCP probes of port 443 with timeouts adapted to the network, then a check of the Redfish service root (and, with -u and -p, of the server model). With section flags every iDRAC found is inventoried right away as in -fl mode, while the scan goes on; without, one JSON record is printed per iDRAC",
+    required=False,
+)
+parser.add_argument(
+    "-dsp",
+    help="TCP port -dsc probes, default 443",
+    type=int,
+    default=443,
+    required=False,
+)
+parser.add_argument(
+    "-dsf",
+    help="Also write the IPs -dsc finds to this file, one per line (e.g. IPrangeScan-iDRACs.txt)",
+    required=False,
+)
+parser.add_argument(
+    "-w",
+    help="Max number of iDRACs inventoried at the same time in fleet mode, default %d"
+    % DEFAULT_WORKERS,
+    type=int,
+    default=DEFAULT_WORKERS,
+    required=False,
+)
+parser.add_argument(
+    "-r",
+    help="Max number of concurrent Redfish requests against one iDRAC, default %d"
+    % DEFAULT_IN_FLIGHT,
+    type=int,
+    default=DEFAULT_IN_FLIGHT,
+    required=False,
+)
+parser.add_argument(
+    "-nx",
+    help='Do not use Redfish $expand even if the iDRAC supports it (walk every collection member with its own request), pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-ta",
+    help='Log in once through the Redfish SessionService and use its X-Auth-Token instead of basic auth on every request, pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-tp",
+    help='Read all fans and power supplies from the chassis Thermal and Power resources (or ThermalSubsystem/PowerSubsystem) in two requests instead of one request per fan and PSU link, pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-sq",
+    help='By default the collectors of each iDRAC run side by side and only the drives wait for their storage controllers; -sq runs them one after another instead, pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-cs",
+    help='Modular chassis (C6400, FX2, MX7000...): collect the power supplies, fans and backplanes shared by the sleds of a chassis from one sled only and copy them to the others, which record it under "SharedChassis", pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-mt",
+    help='Metrics mode: instead of the inventory, poll the fan, temperature and power sensor readings from the TelemetryService metric reports, one request per report (falling back to the chassis Thermal and Power resources on older firmware), and print one JSON record of samples per host. Pass in "y" for the %s reports or a comma-separated list of report names'
+    % ", ".join(DEFAULT_REPORTS),
+    required=False,
+)
+parser.add_argument(
+    "-al",
+    help='Adaptive concurrency: instead of always -r concurrent requests per iDRAC, raise the number one at a time while the iDRAC keeps up and halve it on 503s, connection errors or latency spikes, between 1 and -r. Pass in "y", or a directory to remember each iDRAC\'s limit in between runs',
+    required=False,
+)
+parser.add_argument(
+    "-rps",
+    help="Max Redfish requests per second across all iDRACs of the run, to protect the management network",
+    type=float,
+    required=False,
+)
+parser.add_argument(
+    "-bps",
+    help="Max response bytes per second across all iDRACs of the run, with an optional K, M or G suffix (e.g. 20M)",
+    required=False,
+)
+parser.add_argument(
+    "-mc",
+    help="Max concurrent Redfish requests across all iDRACs of the run",
+    type=int,
+    required=False,
+)
+parser.add_argument(
+    "-sc",
+    help='Max concurrent Redfish requests per subnet, comma-separated network=requests (e.g. "10.1.0.0/16=8,10.2.3.0/24=4"); the most specific network applies',
+    required=False,
+)
+parser.add_argument(
+    "-ec",
+    help="Keep the Redfish responses of each iDRAC with their ETags in this directory and send conditional GETs on later runs, so unchanged resources are not downloaded again",
+    required=False,
+)
+parser.add_argument(
+    "-ct",
+    help="Seconds to wait for a connection to an iDRAC, default %d"
+    % DEFAULT_CONNECT_TIMEOUT,
+    type=float,
+    default=DEFAULT_CONNECT_TIMEOUT,
+    required=False,
+)
+parser.add_argument(
+    "-rt",
+    help="Seconds to wait for an iDRAC to answer a request, default %d"
+    % DEFAULT_READ_TIMEOUT,
+    type=float,
+    default=DEFAULT_READ_TIMEOUT,
+    required=False,
+)
+parser.add_argument(
+    "-rn",
+    help="Times a request is retried (with backoff) after a connection error or a 5xx/503 throttling response, default %d"
+    % DEFAULT_RETRIES,
+    type=int,
+    default=DEFAULT_RETRIES,
+    required=False,
+)
+parser.add_argument(
+    "-tr",
+    help="Record the URI, status, bytes, connect time and latency of every Redfish request and the run time of every collector, and write the trace to this file (CSV if it ends in .csv, JSON otherwise)",
+    required=False,
+)
+parser.add_argument(
+    "-ts",
+    help='Print a summary table of the slowest Redfish endpoints and collectors to stderr at the end of the run, pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-rc",
+    help="Record every raw Redfish response into a compressed archive per iDRAC in this directory, for replaying later with -rpl",
+    required=False,
+)
+parser.add_argument(
+    "-rpl",
+    help="Replay: run the collectors against the archives recorded with -rc in this directory instead of querying the iDRACs (no network I/O). Without -ip or -fl every archived iDRAC is replayed",
+    required=False,
+)
+parser.add_argument(
+    "-nd",
+    help='Stream NDJSON: print one JSON record per component (host, section, key, payload) as soon as its collector finishes, one record per host when it is done and a summary record at the end, pass in "y"',
+    required=False,
+)
+parser.add_argument(
+    "-db",
+    help="Write the inventory of every iDRAC straight to the componentInventory collection of the MongoDB at this URI (e.g. mongodb://localhost:27017) with batched upserts keyed on the SKU; in fleet mode the per-host records then leave the inventory out. Needs pymongo",
+    required=False,
+)
+parser.add_argument(
+    "-dbn",
+    help="MongoDB database name used with -db, default %s" % DEFAULT_DB_NAME,
+    default=DEFAULT_DB_NAME,
+    required=False,
+)
+parser.add_argument(
+    "-ldb",
+    help="Also keep the DIMMs, CPUs, drives and network adapters/ports of every iDRAC in this local SQLite file, one row per component indexed on model, part number, serial, firmware version and health, for -q queries",
+    required=False,
+)
+parser.add_argument(
+    "-q",
+    help='Query the -ldb components instead of inventorying: comma-separated column=value filters, "*" matching anything (e.g. "part_number=HMA84GR7CJR4N-XN" or "section=StorageDisksInformation,firmware_version=HE5*"), printing one JSON record per component. Columns: %s'
+    % ", ".join(QUERY_COLUMNS),
+    required=False,
+)
+parser.add_argument(
+    "-qg",
+    help="With -ldb, count the components matching -q (or all) by the values of this column instead, e.g. firmware_version",
+    required=False,
+)
+parser.add_argument(
+    "-df",
+    help="Change-only output: compare each inventory with the snapshot kept for its iDRAC in this directory (updated on every run) and print only the added, removed and changed components with a content hash per section instead of the inventory; with -db only the changed sections are written",
+    required=False,
+)
+parser.add_argument(
+    "-bl",
+    help="Compare the -ip inventory with this baseline inventory JSON file (e.g. one written by -d) instead of a -df snapshot, printing only the changes",
+    required=False,
+)
+parser.add_argument(
+    "-srv",
+    help="Run as a resident inventory service for the Node backend on this address, a Unix socket path or [host:]port (e.g. 127.0.0.1:8765); iDRAC sessions are kept warm between jobs. See idrac_inventory/daemon.py",
+    required=False,
+)
+parser.add_argument(
+    "-sch",
+    help='Background refresh: keep the iDRACs of -fl inventoried, each section flag refreshed on its own TTL in seconds (f and ps every 300, s, S and n every 3600, i, fw, m and c every 86400) and spread out over time, printing one JSON record per refresh (or writing to -db). Pass in "y" for the default TTLs or override some, e.g. "f=120,m=43200". Without section flags every section including fans is refreshed. With -srv, POST /refresh refreshes a host on demand',
+    required=False,
+)
+parser.add_argument(
+    "-ev",
+    help='Event-driven updates: follow the EventService Server-Sent Events stream of every -fl iDRAC and refresh just the sections an event is about (a PSU alert refreshes the power supplies, a drive removal the storage) right away. Runs the -sch refresh, whose TTLs then default to a slow safety net of at least %d seconds, pass in "y"'
+    % EVENT_TTLS["f"],
+    required=False,
+)
+parser.add_argument(
+    "-it",
+    help="Seconds an iDRAC session of the -srv service may stay unused before it is closed, default %d"
+    % DEFAULT_IDLE_TIMEOUT,
+    type=float,
+    default=DEFAULT_IDLE_TIMEOUT,
+    required=False,
+)
 
 
-def get_system_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def save_to_json(ip, inventory, stream=sys.stdout):
+    file_name = "hw_inventory_%s.json" % ip
+    with open(file_name, "w") as write_file:
+        json.dump(inventory, write_file, indent=2)
+        # json.dump(inventory["MemoryInformation"], write_file, indent=2)
+    print(
+        '\n- WARNING, output captured in "%s\\%s" file' % (os.getcwd(), file_name),
+        file=stream,
     )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    else:
-        # message = "\n---- systemInformation ----"
-        # print(message)
-        for i in data.items():
-            if (
-                i[0] == "@odata.id"
-                or i[0] == "@odata.context"
-                # "@odata" in i[0]
-                or i[0] == "Links"
-                or i[0] == "Actions"
-                or i[0] == "@odata.type"
-                or i[0] == "Description"
-                or i[0] == "EthernetInterfaces"
-                or i[0] == "Storage"
-                or i[0] == "Processors"
-                or i[0] == "Memory"
-                or i[0] == "SecureBoot"
-                or i[0] == "NetworkInterfaces"
-                or i[0] == "Bios"
-                or i[0] == "SimpleStorage"
-                or i[0] == "PCIeDevices"
-                or i[0] == "PCIeFunctions"
-            ):
-                pass
-            # elif i[0] == "Oem":
-            #     idrac_inventory["SystemInformation"]["Oem"] = {}
-            #     idrac_inventory["SystemInformation"]["Oem"]["Dell"] = {}
-            #     idrac_inventory["SystemInformation"]["Oem"]["Dell"]["DellSystem"] = {
-            #     }
-            #     for ii in i[1]["Dell"]["DellSystem"].items():
-            #         if (
-            #             # "@odata"
-            #             # in ii[0]
-            #             ii[0] == "@odata.context"
-            #             or ii[0] == "@odata.type"
-            #             or ii[0] == "@odata.id"
-            #         ):
-            #             pass
-            #         else:
-            #             idrac_inventory["SystemInformation"]["Oem"]["Dell"][
-            #                 "DellSystem"
-            #             ][ii[0]] = ii[1]
 
-            # elif i[0] == "Boot":
-            #     try:
-            #         idrac_inventory["SystemInformation"]["Boot"] = {}
-            #         idrac_inventory["SystemInformation"]["Boot"]["BiosBootMode"] = {}
-            #         idrac_inventory["SystemInformation"]["Boot"]["BiosBootMode"] = [
-            #             i[1]
-            #         ]["BootSourceOverrideMode"]
-            #     except:
-            #         pass
 
-            else:
-                idrac_inventory["SystemInformation"][i[0]] = i[1]
-
-def get_idrac_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Managers/iDRAC.Embedded.1" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def fleet_limiter(args):
+    if not (args["rps"] or args["bps"] or args["mc"] or args["sc"]):
+        return None
+    return FleetLimiter(
+        args["rps"],
+        parse_size(args["bps"]) if args["bps"] else None,
+        args["mc"],
+        parse_subnet_caps(args["sc"]),
     )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    else:        
-        idrac_inventory["SystemInformation"]["IdracFirmware"] = data["FirmwareVersion"]
 
-def get_firmware_information():
-    response = requests.get(
-        "https://%s/redfish/v1/UpdateService/FirmwareInventory?$expand=.($levels=1)" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
-    )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    else:
-        for i in data["Members"]:
-            if i["Name"] == "System CPLD":
-                idrac_inventory["SystemInformation"]["SystemCPLDversion"] = i["Version"]
 
-def get_memory_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1/Memory" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def session_options(args):
+    return {
+        "max_in_flight": args["r"],
+        "token_auth": bool(args["ta"]),
+        "use_expand": not args["nx"],
+        "etag_dir": args["ec"],
+        "connect_timeout": args["ct"],
+        "read_timeout": args["rt"],
+        "retries": args["rn"],
+        "tracer": args["tracer"],
+        "record_dir": args["rc"],
+        "replay_dir": args["rpl"],
+        "adaptive": bool(args["al"]),
+        "limit_dir": args["al"] if args["al"] not in (None, "y") else None,
+        "fleet_limiter": args["limiter"],
+    }
+
+
+def inventory_options(args):
+    return dict(
+        session_options(args),
+        thermal_power=bool(args["tp"]),
+        shared_chassis=args["shared_chassis"],
+        sequential=bool(args["sq"]),
     )
-    data = response.json()
-    # print(data)
-
-    idrac_inventory["MemoryInformation"]["DimmCount"] = data["Members@odata.count"]
-    for i in data["Members"]:
-        dimm = i["@odata.id"].split("/")[-1]
-        # print(dimm)
-        dimm_slot = re.search("DIMM.+", dimm).group()
-        # print(dimm_slot)
-        response = requests.get(
-            "https://%s%s" % (idrac_ip, i["@odata.id"]),
-            verify=False,
-            auth=(idrac_username, idrac_password),
-        )
-        sub_data = response.json()
-        # print(sub_data)
-        idrac_inventory["MemoryInformation"][dimm_slot] = {}
-        # message = "\n- Memory details for %s -\n" % dimm_slot
-        # print(message)
-        for ii in sub_data.items():
-            # print(ii)
-            if (
-                "@odata" in ii[0]
-                # ii[0] == "@odata.id"
-                # or ii[0] == "@odata.context"
-                or ii[0] == "Assembly"
-                or ii[0] == "Metrics"
-                or ii[0] == "Links"
-            ):
-                pass
-            else:
-                # idrac_inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
-                idrac_inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
-
 
-# def get_memory_information():
-#     response = requests.get(
-#         "https://%s/redfish/v1/Systems/System.Embedded.1/Memory" % idrac_ip,
-#         verify=False,
-#         auth=(idrac_username, idrac_password),
-#     )
-#     data = response.json()
-#     if response.status_code != 200:
-#         # print("\n- FAIL, get command failed, error is: %s" % data)
-#         # sys.exit()
-#         pass
-#     # else:
-#     #     message = "\n---- Memory Information ----"
-#     #     print(message)
-#     for i in data["Members"]:
-#         dimm = i["@odata.id"].split("/")[-1]
-#         try:
-#             dimm_slot = re.search("DIMM.+", dimm).group()
-#         except:
-#             # print("\n- FAIL, unable to get dimm slot info")
-#             # sys.exit()
-#             pass
-#         response = requests.get(
-#             "https://%s%s" % (idrac_ip, i["@odata.id"]),
-#             verify=False,
-#             auth=(idrac_username, idrac_password),
-#         )
-#         sub_data = response.json()
-#         if response.status_code != 200:
-#             # print("\n- FAIL, get command failed, error is: %s" % sub_data)
-#             # sys.exit()
-#             pass
-#         else:
-#             idrac_inventory["MemoryInformation"][dimm_slot] = {}
-#             # message = "\n- Memory details for %s -\n" % dimm_slot
-#             # print(message)
-#             for ii in sub_data.items():
-#                 if (
-#                     "@odata" in ii[0]
-#                     # ii[0] == "@odata.id"
-#                     # or ii[0] == "@odata.context"
-#                     or ii[0] == "Assembly"
-#                     or ii[0] == "Metrics"
-#                     or ii[0] == "Links"
-#                 ):
-#                     pass
-#                 # elif ii[0] == "Oem":
-#                 #     idrac_inventory["MemoryInformation"][dimm_slot]["Oem"] = {}
-#                 #     idrac_inventory["MemoryInformation"][dimm_slot]["Oem"]["Dell"] = {
-#                 #     }
-#                 #     idrac_inventory["MemoryInformation"][dimm_slot]["Oem"]["Dell"][
-#                 #         "DellMemory"
-#                 #     ] = {}
-#                 #     for iii in ii[1]["Dell"]["DellMemory"].items():
-#                 #         if iii[0] == "@odata.context" or iii[0] == "@odata.type":
-#                 #             # if "@odata" in iii[0]:
-#                 #             pass
-#                 #         else:
-#                 #             idrac_inventory["MemoryInformation"][dimm_slot]["Oem"][
-#                 #                 "Dell"
-#                 #             ]["DellMemory"][iii[0]] = iii[1]
-#                 else:
-#                     idrac_inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
 
-
-def get_cpu_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1/Processors" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
-    )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-
-    for i in data["Members"]:
-        cpu = i["@odata.id"].split("/")[-1]
-        response = requests.get(
-            "https://%s%s" % (idrac_ip, i["@odata.id"]),
-            verify=False,
-            auth=(idrac_username, idrac_password),
+def store_inventory(stores, ip, inventory, sections=None):
+    stored = all([store.add(inventory, sections) for store in stores])
+    if not stored:
+        print(
+            "\n- WARNING, no SystemInformation SKU for %s, not stored" % ip,
+            file=sys.stderr,
         )
-        sub_data = response.json()
-        if response.status_code != 200:
-            print("\n- FAIL, get command failed, error is: %s" % sub_data)
-            sys.exit()
-        else:
-            idrac_inventory["ProcessorInformation"][cpu] = {}
-            for ii in sub_data.items():
-                if (
-                    # "@odata" in ii[0]
-                    ii[0] == "@odata.id"
-                    or ii[0] == "@odata.context"
-                    or ii[0] == "Metrics"
-                    or ii[0] == "Links"
-                    or ii[0] == "Description"
-                    or ii[0] == "Assembly"
-                    or ii[0] == "@odata.type"
-                ):
-                    pass
-                elif ii[0] == "Oem":
-                    idrac_inventory["ProcessorInformation"][cpu]["Oem"] = {}
-                    idrac_inventory["ProcessorInformation"][cpu]["Oem"]["Dell"] = {}
-                    idrac_inventory["ProcessorInformation"][cpu]["Oem"]["Dell"][
-                        "DellProcessor"
-                    ] = {}
-                    for iii in ii[1]["Dell"]["DellProcessor"].items():
-                        # if "@odata" in iii[0]:
-                        if iii[0] == "@odata.context" or iii[0] == "@odata.type":
-                            pass
-                        else:
-                            idrac_inventory["ProcessorInformation"][cpu]["Oem"]["Dell"][
-                                "DellProcessor"
-                            ][iii[0]] = iii[1]
-                else:
-                    idrac_inventory["ProcessorInformation"][cpu][ii[0]] = ii[1]
+    return stored
 
 
-def get_fan_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def run_single(args, flags, stores=None):
+    client = IdracInventoryClient(
+        args["ip"], args["u"], args["p"], **inventory_options(args)
     )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-        # else:
-        # message = "\n---- Fan Information ----\n"
-        # print(message)
-    fan_list = []
-    if data["Links"]["CooledBy"] == []:
-        print("\n- WARNING, no fans detected for system")
+    try:
+        os.remove("hw_inventory_%s.json" % client.host)
+    except:
+        pass
+    try:
+        inventory = client.collect(flags)
+    except (RedfishError, requests.RequestException, OSError) as e:
+        print("\n- FAIL, %s" % e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        client.close()
+    if args["d"]:
+        save_to_json(client.host, inventory)
+    # Only what this run collected replaces what is stored
+    sections = collected_sections(inventory, flags)
+    if args["differ"]:
+        changes = args["differ"].diff(client.host, inventory, flags)
+        sections = changes["changed"]
+        inventory = dict(host=client.host, **changes)
+    if stores:
+        store_inventory(stores, client.host, client.inventory, sections)
+    if args["pj"]:
+        print(json.dumps(inventory, indent=2, ensure_ascii=False))
     else:
-        for i in data["Links"]["CooledBy"]:
-            for ii in i.items():
-                fan_list.append(ii[1])
-        fan_list_final = []
-        for i in fan_list:
-            response = requests.get(
-                "https://%s%s" % (idrac_ip, i),
-                verify=False,
-                auth=(idrac_username, idrac_password),
-            )
-            if response.status_code != 200:
-                print("\n- FAIL, get command failed, error is: %s" % data)
-            else:
-                data_get = response.json()
-                try:
-                    fan_name = data_get["FanName"].replace(" ", "")
-                    idrac_inventory["FanInformation"][fan_name] = {}
-                    # message = "\n- Details for %s -\n" % data_get["FanName"]
-                    # print(message)
-                except:
-                    pass
-                if "Fans" not in data_get.keys():
-                    for ii in data_get.items():
-                        idrac_inventory["FanInformation"][fan_name][ii[0]] = ii[1]
-                    #     message = "%s: %s" % (ii[0], ii[1])
-                    #     print(message)
-                    #     message = "\n"
-                    # message = "\n"
-                    # print(message)
-                else:
-                    count = 0
-                    while True:
-                        if count == len(fan_list):
-                            return
-                        for i in data_get["Fans"]:
-                            # message = "\n- Details for %s -\n" % i["FanName"]
-                            count += 1
-                            # print(message)
-                            for ii in i.items():
-                                idrac_inventory["FanInformation"][fan_name][ii[0]] = ii[
-                                    1
-                                ]
-                                # message = "%s: %s" % (ii[0], ii[1])
-                                # print(message)
+        print(json.dumps(inventory, ensure_ascii=False))  # default
 
 
-def get_ps_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def handle_result(result, args, stores, flags):
+    # The inventory is only kept in fleet records when nothing else consumes it
+    if not result["success"]:
+        return
+    if args["d"]:
+        save_to_json(result["host"], result["inventory"], stream=sys.stderr)
+    # Only what this run collected replaces what is stored
+    sections = collected_sections(result["inventory"], flags)
+    if args["differ"]:
+        result.update(args["differ"].diff(result["host"], result["inventory"], flags))
+        sections = result["changed"]
+    if stores:
+        inventory = result.pop("inventory")
+        result["stored"] = store_inventory(stores, result["host"], inventory, sections)
+    elif args["differ"]:
+        del result["inventory"]
+
+
+def stream_results(results, args, writer, flags, stores=None):
+    for result in results:
+        handle_result(result, args, stores, flags)
+        result.pop("inventory", None)
+        writer.host_done(result)
+    writer.summary()
+
+
+def run_single_stream(args, flags, stores=None):
+    # Components are only kept in memory when they also have to be dumped or stored
+    writer = NdjsonWriter()
+    result = inventory_host(
+        args["ip"],
+        args["u"],
+        args["p"],
+        flags,
+        writer=writer,
+        release=not (args["d"] or stores),
+        **inventory_options(args)
     )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    # else:
-    #     message = "\n---- Power Supply Information ----\n"
-    #     print(message)
-    if data["Links"]["PoweredBy"] == []:
-        print("- WARNING, no power supplies detected for system")
+    stream_results([result], args, writer, flags, stores)
 
-    else:
-        for i in data["Links"]["PoweredBy"]:
-            for ii in i.items():
-                response = requests.get(
-                    "https://%s%s" % (idrac_ip, ii[1]),
-                    verify=False,
-                    auth=(idrac_username, idrac_password),
-                )
-                if response.status_code != 200:
-                    print("\n- FAIL, get command failed, error is: %s" % data)
-                    sys.exit()
-                else:
-                    data_get = response.json()
-                    if "PowerSupplies" not in data_get.keys():
-                        ps_name = data_get["Name"].replace(" ", "")
-                        idrac_inventory["PowerSupplyInformation"][ps_name] = {}
-                        # message = "\n- Details for %s -\n" % data_get["Name"]
-                        # print(message)
-                        for i in data_get.items():
-                            # if i[0] == "Oem":
-                            #     try:
-                            #         idrac_inventory["PowerSupplyInformation"][ps_name][
-                            #             "Oem"
-                            #         ] = {}
-                            #         idrac_inventory["PowerSupplyInformation"][ps_name][
-                            #             "Oem"
-                            #         ]["Dell"] = {}
-                            #         idrac_inventory["PowerSupplyInformation"][ps_name][
-                            #             "Oem"
-                            #         ]["Dell"]["DellPowerSupply"] = {}
-                            #         for ii in i[1]["Dell"]["DellPowerSupply"].items():
-                            #             idrac_inventory["PowerSupplyInformation"][
-                            #                 ps_name
-                            #             ]["Oem"]["Dell"]["DellPowerSupply"][ii[0]] = ii[
-                            #                 1
-                            #             ]
-                            #     except:
-                            #         print(
-                            #             "- FAIL, unable to find Dell PowerSupply OEM information"
-                            #         )
-                            #         sys.exit()
-                            # else:
-                                idrac_inventory["PowerSupplyInformation"][ps_name][
-                                    i[0]
-                                ] = i[1]
-                    else:
-                        if len(data["Links"]["PoweredBy"]) == 1:
-                            ps_name = data_get["PowerSupplies"][0]["Name"].replace(
-                                " ", ""
-                            )
-                            idrac_inventory["PowerSupplyInformation"][ps_name] = {}
-                            # message = (
-                            #     "\n- Details for %s -\n"
-                            #     % data_get["PowerSupplies"][0]["Name"]
-                            # )
-                            # print(message)
-                            for i in data_get.items():
-                                if i[0] == "PowerSupplies":
-                                    idrac_inventory["PowerSupplyInformation"][ps_name][
-                                        "PowerSupplies"
-                                    ] = {}
-                                    for ii in i[1]:
-                                        for iii in ii.items():
-                                            # if iii[0] == "Oem":
-                                            #     idrac_inventory[
-                                            #         "PowerSupplyInformation"
-                                            #     ][ps_name]["PowerSupplies"]["Oem"] = {}
-                                            #     idrac_inventory[
-                                            #         "PowerSupplyInformation"
-                                            #     ][ps_name]["PowerSupplies"]["Oem"][
-                                            #         "Dell"
-                                            #     ] = {}
-                                            #     idrac_inventory[
-                                            #         "PowerSupplyInformation"
-                                            #     ][ps_name]["PowerSupplies"]["Oem"][
-                                            #         "Dell"
-                                            #     ][
-                                            #         "DellPowerSupply"
-                                            #     ] = {}
-                                            #     try:
-                                            #         for iiii in iii[1]["Dell"][
-                                            #             "DellPowerSupply"
-                                            #         ].items():
-                                            #             idrac_inventory[
-                                            #                 "PowerSupplyInformation"
-                                            #             ][ps_name]["PowerSupplies"][
-                                            #                 "Oem"
-                                            #             ][
-                                            #                 "Dell"
-                                            #             ][
-                                            #                 "DellPowerSupply"
-                                            #             ][
-                                            #                 iiii[0]
-                                            #             ] = iiii[
-                                            #                 1
-                                            #             ]
-                                            #     except:
-                                            #         print(
-                                            #             "- FAIL, unable to find Dell PowerSupply OEM information"
-                                            #         )
-                                            #         sys.exit()
-                                            # else:
-                                                idrac_inventory[
-                                                    "PowerSupplyInformation"
-                                                ][ps_name]["PowerSupplies"][
-                                                    iii[0]
-                                                ] = iii[
-                                                    1
-                                                ]
-                                elif i[0] == "Voltages":
-                                    pass
-                                elif i[0] == "PowerControl":
-                                    idrac_inventory["PowerSupplyInformation"][ps_name][
-                                        "PowerSupplies"
-                                    ]["PowerControl"] = {}
-                                    for ii in i[1]:
-                                        for iii in ii.items():
-                                            idrac_inventory["PowerSupplyInformation"][
-                                                ps_name
-                                            ]["PowerSupplies"]["PowerControl"][
-                                                iii[0]
-                                            ] = iii[
-                                                1
-                                            ]
-                                else:
-                                    idrac_inventory["PowerSupplyInformation"][ps_name][
-                                        "PowerSupplies"
-                                    ][i[0]] = i[1]
-                        else:
-                            for i in data_get.items():
-                                if i[0] == "PowerSupplies":
-                                    psu_ids = i[1]
-                            count = 0
-                            while True:
-                                if len(psu_ids) == count:
-                                    return
-                                else:
-                                    for i in psu_ids:
-                                        ps_name = i["Name"].replace(" ", "")
-                                        idrac_inventory["PowerSupplyInformation"][
-                                            ps_name
-                                        ] = {}
-                                        # message = "\n- Details for %s -\n" % i["Name"]
-                                        # print(message)
-                                        for ii in i.items():
-                                            # if ii[0] == "Oem":
-                                            #     try:
-                                            #         idrac_inventory[
-                                            #             "PowerSupplyInformation"
-                                            #         ][ps_name]["Oem"] = {}
-                                            #         idrac_inventory[
-                                            #             "PowerSupplyInformation"
-                                            #         ][ps_name]["Oem"]["Dell"] = {}
-                                            #         idrac_inventory[
-                                            #             "PowerSupplyInformation"
-                                            #         ][ps_name]["Oem"]["Dell"][
-                                            #             "DellPowerSupply"
-                                            #         ] = {}
-                                            #         for iii in ii[1]["Dell"][
-                                            #             "DellPowerSupply"
-                                            #         ].items():
-                                            #             idrac_inventory[
-                                            #                 "PowerSupplyInformation"
-                                            #             ][ps_name]["Oem"]["Dell"][
-                                            #                 "DellPowerSupply"
-                                            #             ][
-                                            #                 iii[0]
-                                            #             ] = iii[
-                                            #                 1
-                                            #             ]
-                                            #     except:
-                                            #         print(
-                                            #             "- FAIL, unable to find Dell PowerSupply OEM information"
-                                            #         )
-                                            #         sys.exit()
-                                            # else:
-                                                idrac_inventory[
-                                                    "PowerSupplyInformation"
-                                                ][ps_name][ii[0]] = ii[1]
-                                        count += 1
 
-
-def get_storage_controller_information():
-    # message = "\n---- Controller Information ----"
-    # print(message)
-    global controller_list
-    controller_list = []
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1/Storage" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
-    )
-    data = response.json()
-    for i in data["Members"]:
-        for ii in i.items():
-            controller_list.append(ii[1])
-    for i in controller_list:
-        response = requests.get(
-            "https://%s%s" % (idrac_ip, i),
-            verify=False,
-            auth=(idrac_username, idrac_password),
-        )
-        data = response.json()
-        storage_controller = i.split("/")[-1]
-        idrac_inventory["StorageControllerInformation"][storage_controller] = {}
-        # message = "\n - Detailed controller information for %s -\n" % i.split("/")[-1]
-        # print(message)
-        for i in data.items():
-            if i[0] == "Status":
-                pass
-            elif "@" in i[0] or "odata" in i[0]:
-                pass
-            elif i[0] == "StorageControllers":
-                idrac_inventory["StorageControllerInformation"][storage_controller][
-                    "StorageControllers"
-                ] = {}
-                for ii in i[1]:
-                    for iii in ii.items():
-                        if iii[0] == "Status":
-                            for iiii in iii[1].items():
-                                idrac_inventory["StorageControllerInformation"][
-                                    storage_controller
-                                ]["StorageControllers"][iiii[0]] = iiii[1]
-                        else:
-                            idrac_inventory["StorageControllerInformation"][
-                                storage_controller
-                            ]["StorageControllers"][iii[0]] = [iii[1]]
-            # elif i[0] == "Oem":
-            #     try:
-            #         idrac_inventory["StorageControllerInformation"][storage_controller][
-            #             "Oem"
-            #         ] = {}
-            #         idrac_inventory["StorageControllerInformation"][storage_controller][
-            #             "Oem"
-            #         ]["Dell"] = {}
-            #         idrac_inventory["StorageControllerInformation"][storage_controller][
-            #             "Oem"
-            #         ]["Dell"]["DellController"] = {}
-            #         for ii in i[1]["Dell"]["DellController"].items():
-            #             idrac_inventory["StorageControllerInformation"][
-            #                 storage_controller
-            #             ]["Oem"]["Dell"]["DellController"][ii[0]] = ii[1]
-            #     except:
-            #         for ii in i[1]["Dell"].items():
-            #             idrac_inventory["StorageControllerInformation"][
-            #                 storage_controller
-            #             ]["Oem"]["Dell"][ii[0]] = ii[1]
-            else:
-                idrac_inventory["StorageControllerInformation"][storage_controller][
-                    i[0]
-                ] = i[1]
+def run_fleet_file(args, flags, stores=None):
+    if args["fl"] == "-":
+        print_fleet_results(read_hosts(sys.stdin), args, flags, stores)
     else:
-        pass
-
-
-def get_storage_disks_information():
-    # message = "\n---- Disk Information ----"
-    # print(message)
-    for i in controller_list:
-        response = requests.get(
-            "https://%s/redfish/v1/Systems/System.Embedded.1/Storage/%s"
-            % (idrac_ip, i.split("/")[-1]),
-            verify=False,
-            auth=(idrac_username, idrac_password),
+        with open(args["fl"]) as ip_file:
+            print_fleet_results(read_hosts(ip_file), args, flags, stores)
+
+
+def print_fleet_results(hosts, args, flags, stores=None):
+    if args["nd"]:
+        writer = NdjsonWriter()
+        results = run_fleet(
+            hosts,
+            args["u"],
+            args["p"],
+            flags,
+            args["w"],
+            writer=writer,
+            release=not (args["d"] or stores),
+            **inventory_options(args)
         )
-        data = response.json()
-        if response.status_code == 200 or response.status_code == 202:
-            pass
+        stream_results(results, args, writer, flags, stores)
+        return
+    # One compact JSON record per line so the caller can parse results as
+    # each host finishes
+    for result in run_fleet(
+        hosts, args["u"], args["p"], flags, args["w"], **inventory_options(args)
+    ):
+        handle_result(result, args, stores, flags)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+
+def run_query(args):
+    filters = {}
+    for item in (args["q"] or "").split(","):
+        if item.strip():
+            column, _, value = item.partition("=")
+            filters[column.strip()] = value.strip()
+    with ComponentStore(args["ldb"]) as store:
+        if args["qg"]:
+            records = store.group(args["qg"], filters)
         else:
-            print("- FAIL, GET command failed, detailed error information: %s" % data)
-            sys.exit()
-        if data["Drives"] == []:
-            pass
-            # message = "\n- WARNING, no drives detected for %s" % i.split(
-            #     "/")[-1]
-            # print(message)
-        else:
-            for i in data["Drives"]:
-                for ii in i.items():
-                    response = requests.get(
-                        "https://%s%s" % (idrac_ip, ii[1]),
-                        verify=False,
-                        auth=(idrac_username, idrac_password),
-                    )
-                    data = response.json()
-                    storage_drive = ii[1].split("/")[-1]
-                    idrac_inventory["StorageDisksInformation"][storage_drive] = {}
-                    # message = (
-                    #     "\n - Detailed drive information for %s -\n"
-                    #     % ii[1].split("/")[-1]
-                    # )
-                    # print(message)
-                    for ii in data.items():
-                        # if ii[0] == "Oem":
-                        #     idrac_inventory["StorageDisksInformation"][storage_drive][
-                        #         "Oem"
-                        #     ] = {}
-                        #     idrac_inventory["StorageDisksInformation"][storage_drive][
-                        #         "Oem"
-                        #     ]["Dell"] = {}
-                        #     idrac_inventory["StorageDisksInformation"][storage_drive][
-                        #         "Oem"
-                        #     ]["Dell"]["DellPhysicalDisk"] = {}
-                        #     for iii in ii[1]["Dell"]["DellPhysicalDisk"].items():
-                        #         idrac_inventory["StorageDisksInformation"][
-                        #             storage_drive
-                        #         ]["Oem"]["Dell"]["DellPhysicalDisk"][iii[0]] = iii[1]
-                        # elif ii[0] == "Status":
-                        #     idrac_inventory["StorageDisksInformation"][storage_drive][
-                        #         "Status"
-                        #     ] = {}
-                        #     for iii in ii[1].items():
-                        #         idrac_inventory["StorageDisksInformation"][
-                        #             storage_drive
-                        #         ]["Status"][iii[0]] = iii[1]
-                        # else:
-                            idrac_inventory["StorageDisksInformation"][storage_drive][
-                                ii[0]
-                            ] = ii[1]
-
-
-def get_backplane_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Chassis" % (idrac_ip),
-        verify=False,
-        auth=(idrac_username, idrac_password),
-    )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    # message = "\n---- Backplane Information ----"
-    # print(message)
-    backplane_URI_list = []
-    for i in data["Members"]:
-        backplane = i["@odata.id"]
-        if "Enclosure" in backplane:
-            backplane_URI_list.append(backplane)
-    if backplane_URI_list == []:
-        message = "- WARNING, no backplane information detected for system\n"
-        print(message)
-        sys.exit()
-    for i in backplane_URI_list:
-        response = requests.get(
-            "https://%s%s" % (idrac_ip, i),
-            verify=False,
-            auth=(idrac_username, idrac_password),
+            records = store.query(filters)
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+
+
+def discovered_hosts(args, print_records=False):
+    # Hosts are handed on as the scan finds them
+    list_file = open(args["dsf"], "w") if args["dsf"] else None
+    try:
+        discovery = Discovery(
+            target_addresses(args["dsc"]),
+            args["dsp"],
+            username=args["u"],
+            password=args["p"],
         )
-        data = response.json()
-        backplane_name = i.split("/")[-1]
-        idrac_inventory["BackplaneInformation"][backplane_name] = {}
-        # message = "\n- Detailed backplane information for %s -\n" % i.split("/")[-1]
-        # print(message)
-        for iii in data.items():
-            if (
-                iii[0] == "@odata.id"
-                or iii[0] == "@odata.context"
-                or iii[0] == "Metrics"
-                or iii[0] == "Links"
-                or iii[0] == "@Redfish.Settings"
-                or iii[0] == "@odata.type"
-                or iii[0] == "RelatedItem"
-                or iii[0] == "Actions"
-                or iii[0] == "PCIeDevices"
-            ):
-                pass
-            # elif iii[0] == "Oem":
-            #     try:
-            #         idrac_inventory["BackplaneInformation"][backplane_name]["Oem"] = {}
-            #         idrac_inventory["BackplaneInformation"][backplane_name]["Oem"][
-            #             "Dell"
-            #         ] = {}
-            #         idrac_inventory["BackplaneInformation"][backplane_name]["Oem"][
-            #             "Dell"
-            #         ]["DellEnclosure"] = {}
-            #         for iiii in iii[1]["Dell"]["DellEnclosure"].items():
-            #             if (
-            #                 iiii[0] == "@odata.context"
-            #                 or iiii[0] == "@odata.type"
-            #                 or iiii[0] == "@odata.id"
-            #             ):
-            #                 pass
-            #             else:
-            #                 idrac_inventory["BackplaneInformation"][backplane_name][
-            #                     "Oem"
-            #                 ]["Dell"]["DellEnclosure"][iiii[0]] = iiii[1]
-            #     except:
-            #         pass
-            else:
-                idrac_inventory["BackplaneInformation"][backplane_name][iii[0]] = iii[1]
+        for record in discovery:
+            if print_records:
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+            if list_file:
+                list_file.write(record["host"] + "\n")
+                list_file.flush()
+            yield record["host"]
+    finally:
+        if list_file:
+            list_file.close()
+
+
+def run_discovery(args, flags, stores=None):
+    if flags:
+        print_fleet_results(discovered_hosts(args), args, flags, stores)
+    else:
+        for _ in discovered_hosts(args, print_records=True):
+            pass
 
 
-def get_network_information():
-    response = requests.get(
-        "https://%s/redfish/v1/Systems/System.Embedded.1/NetworkInterfaces" % idrac_ip,
-        verify=False,
-        auth=(idrac_username, idrac_password),
+def run_metrics(args, hosts):
+    if args["mt"] == "y":
+        reports = DEFAULT_REPORTS
+    else:
+        reports = [report.strip() for report in args["mt"].split(",") if report.strip()]
+    failed = False
+    for result in run_fleet(
+        hosts,
+        args["u"],
+        args["p"],
+        reports,
+        args["w"],
+        task=metrics_host,
+        **session_options(args)
+    ):
+        failed = failed or not result["success"]
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    # A single iDRAC that could not be polled fails the run, as inventories do
+    if failed and args["ip"]:
+        sys.exit(1)
+
+
+def handle_refreshes(refreshes, stores=None):
+    # Refresh records come from the scheduler's threads; store and print
+    # them from this one
+    while True:
+        result, inventory = refreshes.get()
+        if result["success"] and stores:
+            result["stored"] = store_inventory(stores, result["host"], inventory)
+            if refreshes.empty():
+                for store in stores:
+                    store.flush()
+        elif result["success"]:
+            result["inventory"] = dict(
+                (section, inventory[section])
+                for flag in result["flags"]
+                for section in FLAG_SECTIONS[flag]
+            )
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+
+def run_scheduler(args, flags, stores=None):
+    hosts = []
+    if args["fl"] == "-":
+        hosts = list(read_hosts(sys.stdin))
+    elif args["fl"]:
+        with open(args["fl"]) as ip_file:
+            hosts = list(read_hosts(ip_file))
+    refreshes = queue.Queue()
+    scheduler = RefreshScheduler(
+        hosts,
+        args["u"],
+        args["p"],
+        flags or ["a", "f"],
+        parse_ttls(args["sch"], EVENT_TTLS if args["ev"] else DEFAULT_TTLS),
+        args["w"],
+        on_refreshed=lambda result, client: refreshes.put(
+            (result, json.loads(json.dumps(client.inventory)))
+        ),
+        **inventory_options(args)
     )
-    data = response.json()
-    if response.status_code != 200:
-        print("\n- FAIL, get command failed, error is: %s" % data)
-        sys.exit()
-    # message = "\n---- Network Device Information ----"
-    # print(message)
-    network_URI_list = []
-    for i in data["Members"]:
-        network = i["@odata.id"]
-        network_URI_list.append(network)
-    if network_URI_list == []:
-        message = "\n- WARNING, no network information detected for system\n"
-        print(message)
-    for i in network_URI_list:
-        net_dev_name = i.split("/")[-1]
-        idrac_inventory["NetworkDeviceInformation"][net_dev_name] = {}
-        # message = "\n- Network device details for %s -\n" % i.split("/")[-1]
-        # print(message)
-        i = i.replace("Interfaces", "Adapters")
-        response = requests.get(
-            "https://%s%s" % (idrac_ip, i),
-            verify=False,
-            auth=(idrac_username, idrac_password),
+    scheduler.start()
+    listener = None
+    if args["ev"]:
+        listener = EventListener(
+            hosts,
+            args["u"],
+            args["p"],
+            lambda host, flags, event: scheduler.refresh_soon(host, flags),
+            **session_options(args)
         )
-        data = response.json()
-        if response.status_code != 200:
-            print("\n- FAIL, get command failed, error is: %s" % data)
-            sys.exit()
-        for ii in data.items():
-            if ii[0] == "NetworkPorts":
-                network_port_urls = []
-                url_port = ii[1]["@odata.id"]
-                response = requests.get(
-                    "https://%s%s" % (idrac_ip, url_port),
-                    verify=False,
-                    auth=(idrac_username, idrac_password),
-                )
-                data = response.json()
-                if response.status_code != 200:
-                    print("\n- FAIL, get command failed, error is: %s" % data)
-                    sys.exit()
-                else:
-                    port_uri_list = []
-                    for i in data["Members"]:
-                        port_uri_list.append(i["@odata.id"])
-            if (
-                ii[0] == "@odata.id"
-                or ii[0] == "@odata.context"
-                or ii[0] == "Metrics"
-                or ii[0] == "Links"
-                or ii[0] == "@odata.type"
-                or ii[0] == "NetworkDeviceFunctions"
-                or ii[0] == "NetworkPorts"
-                or ii[0] == "Assembly"
-            ):
-                pass
-            elif ii[0] == "Controllers":
-                idrac_inventory["NetworkDeviceInformation"][
-                    "Controller Capabilities"
-                ] = ii[1][0]["ControllerCapabilities"]
-                idrac_inventory["NetworkDeviceInformation"][
-                    "FirmwarePackageVersion"
-                ] = ii[1][0]["FirmwarePackageVersion"]
-            else:
-                idrac_inventory["NetworkDeviceInformation"][ii[0]] = ii[1]
-
-        for z in port_uri_list:
-            response = requests.get(
-                "https://%s%s" % (idrac_ip, z),
-                verify=False,
-                auth=(idrac_username, idrac_password),
+        listener.start()
+    try:
+        if args["srv"]:
+            threading.Thread(
+                target=handle_refreshes, args=(refreshes, stores), daemon=True
+            ).start()
+            serve(
+                args["srv"],
+                args["w"],
+                args["it"],
+                scheduler=scheduler,
+                thermal_power=bool(args["tp"]),
+                **session_options(args)
             )
-            data = response.json()
-            if response.status_code != 200:
-                print("\n- FAIL, get command failed, error is: %s" % data)
-                sys.exit()
-            else:
-                net_dev_port = z.split("/")[-1]
-                idrac_inventory["NetworkDeviceInformation"][net_dev_name][
-                    net_dev_port
-                ] = {}
-                # message = "\n- Network port details for %s -\n" % z.split("/")[-1]
-                # print(message)
-                for ii in data.items():
-                    if (
-                        ii[0] == "@odata.id"
-                        or ii[0] == "@odata.context"
-                        or ii[0] == "Metrics"
-                        or ii[0] == "Links"
-                        or ii[0] == "@odata.type"
-                    ):
-                        pass
-                    # elif ii[0] == "Oem":
-                    #     try:
-                    #         idrac_inventory["NetworkDeviceInformation"][net_dev_name][
-                    #             net_dev_port
-                    #         ]["Oem"] = {}
-                    #         idrac_inventory["NetworkDeviceInformation"][net_dev_name][
-                    #             net_dev_port
-                    #         ]["Oem"]["Dell"] = {}
-                    #         idrac_inventory["NetworkDeviceInformation"][net_dev_name][
-                    #             net_dev_port
-                    #         ]["Oem"]["Dell"]["DellSwitchConnection"] = {}
-                    #         for iii in ii[1]["Dell"]["DellSwitchConnection"].items():
-                    #             if (
-                    #                 iii[0] == "@odata.context"
-                    #                 or iii[0] == "@odata.type"
-                    #             ):
-                    #                 pass
-                    #             else:
-                    #                 idrac_inventory["NetworkDeviceInformation"][
-                    #                     net_dev_name
-                    #                 ][net_dev_port]["Oem"]["Dell"][
-                    #                     "DellSwitchConnection"
-                    #                 ][
-                    #                     iii[0]
-                    #                 ] = iii[
-                    #                     1
-                    #                 ]
-                    #     except:
-                    #         pass
-                    else:
-                        idrac_inventory["NetworkDeviceInformation"][net_dev_name][
-                            net_dev_port
-                        ][ii[0]] = ii[1]
-
-
-def save_to_json():
-    with open(file_name, "w") as write_file:
-        json.dump(idrac_inventory, write_file, indent=2)
-        # json.dump(idrac_inventory["MemoryInformation"], write_file, indent=2)
-    print('\n- WARNING, output captured in "%s\%s" file' % (os.getcwd(), file_name))
+        else:
+            handle_refreshes(refreshes, stores)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener:
+            listener.stop()
+        scheduler.stop()
 
 
 if __name__ == "__main__":
-    check_supported_idrac_version()
-    if args["s"]:
-        get_system_information()
-    if args["i"]:
-        get_idrac_information()
-    if args["fw"]:
-        get_firmware_information()
-    if args["m"]:
-        get_memory_information()
-    if args["c"]:
-        get_cpu_information()
-    if args["f"]:
-        get_fan_information()
-    if args["ps"]:
-        get_ps_information()
-    if args["S"]:
-        get_storage_controller_information()
-        get_storage_disks_information()
-        get_backplane_information()
-    if args["n"]:
-        get_network_information()
-    if args["a"]:
-        get_system_information()
-        get_idrac_information()
-        get_firmware_information()
-        get_memory_information()
-        get_cpu_information()
-        # get_fan_information()
-        get_ps_information()
-        get_storage_controller_information()
-        get_storage_disks_information()
-        get_backplane_information()
-        get_network_information()
-    if args["d"]:
-        save_to_json()
-    if args["pj"]:
-        print(json.dumps(idrac_inventory, indent=2, ensure_ascii=False))
-    else:
-        print(json.dumps(idrac_inventory, ensure_ascii=False))  # default
+    args = vars(parser.parse_args())
+    # One per run, shared by every host
+    args["shared_chassis"] = SharedChassis() if args["cs"] else None
+    try:
+        args["limiter"] = fleet_limiter(args)
+    except ValueError as e:
+        parser.error("-bps/-sc: %s" % e)
+    if args["q"] or args["qg"]:
+        if not args["ldb"]:
+            parser.error("-q and -qg query the component database of -ldb")
+        try:
+            run_query(args)
+        except ValueError as e:
+            parser.error(str(e))
+        sys.exit(0)
+    if args["ev"]:
+        args["sch"] = args["sch"] or "y"
+    if args["srv"] and not args["sch"]:
+        args["tracer"] = None
+        try:
+            serve(
+                args["srv"],
+                args["w"],
+                args["it"],
+                thermal_power=bool(args["tp"]),
+                **session_options(args)
+            )
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    if args["dsc"]:
+        try:
+            for target in args["dsc"].split(","):
+                next(target_addresses(target), None)
+        except ValueError as e:
+            parser.error("-dsc: %s" % e)
+    if not (args["ip"] or args["fl"] or args["rpl"] or args["sch"] or args["dsc"]):
+        parser.error("either -ip, -fl or -dsc is required")
+    # Discovery on its own needs no credentials
+    discovery_only = args["dsc"] and not any(args[flag] for flag in SECTION_FLAGS)
+    if not (args["u"] and args["p"]) and not (args["rpl"] or discovery_only):
+        parser.error("-u and -p are required")
+    if args["sch"]:
+        try:
+            parse_ttls(args["sch"])
+        except ValueError as e:
+            parser.error("-sch: %s" % e)
+    if args["mt"] and not (args["ip"] or args["fl"]):
+        parser.error("-mt polls the iDRACs of -ip or -fl")
+    args["differ"] = None
+    if args["df"] or args["bl"]:
+        if args["nd"] or args["sch"]:
+            parser.error("-df and -bl cannot be combined with -nd or -sch")
+        if args["bl"] and not args["ip"]:
+            parser.error("-bl compares a single iDRAC, it needs -ip")
+        baseline = None
+        if args["bl"]:
+            try:
+                with open(args["bl"]) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as e:
+                parser.error("-bl: %s" % e)
+        args["differ"] = InventoryDiffer(args["df"], baseline)
+    flags = [flag for flag in SECTION_FLAGS if args[flag]]
+    # One tracer for the whole run, shared by every host in fleet mode
+    args["tracer"] = Tracer() if args["tr"] or args["ts"] else None
+    stores = []
+    if args["db"]:
+        try:
+            stores.append(InventoryStore(args["db"], args["dbn"]))
+        except RuntimeError as e:
+            parser.error(str(e))
+    if args["ldb"]:
+        stores.append(ComponentStore(args["ldb"]))
+    try:
+        if args["mt"]:
+            if args["ip"]:
+                run_metrics(args, [args["ip"]])
+            elif args["fl"] == "-":
+                run_metrics(args, read_hosts(sys.stdin))
+            else:
+                with open(args["fl"]) as ip_file:
+                    run_metrics(args, read_hosts(ip_file))
+        elif args["sch"]:
+            run_scheduler(args, flags, stores)
+        elif args["dsc"]:
+            run_discovery(args, flags, stores)
+        elif args["fl"]:
+            run_fleet_file(args, flags, stores)
+        elif not args["ip"]:
+            print_fleet_results(archived_hosts(args["rpl"]), args, flags, stores)
+        elif args["nd"]:
+            run_single_stream(args, flags, stores)
+        else:
+            run_single(args, flags, stores)
+    finally:
+        for store in stores:
+            store.close()
+        if args["tr"]:
+            args["tracer"].write(args["tr"])
+        if args["ts"]:
+            print("\n" + args["tracer"].summary(), file=sys.stderr)
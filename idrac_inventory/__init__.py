@@ -0,0 +1,7 @@
+#
+# Redfish hardware inventory for Dell iDRACs, used by get_iDRAC_Inventory.py
+#
+
+from .client import IdracInventoryClient
+from .collectors import Idrac, collect_inventory, new_inventory
+from .fleet import read_hosts, run_fleet
@@ -0,0 +1,121 @@
+#
+# Record/replay archives. In record mode a RedfishSession keeps the status
+# and body of every Redfish response it returns, and writes them to one
+# gzipped JSON archive per iDRAC when it closes. In replay mode the session
+# answers every GET from such an archive instead, without any network I/O,
+# so changes to the collectors' extraction logic can be re-run over a whole
+# fleet in seconds (and the archives double as fixtures).
+#
+# Replay serves exactly the URIs that were recorded; resources that were
+# recorded inlined in an $expand response can also be fetched on their own.
+#
+
+
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+import time
+
+from .cache import CachedResponse
+
+
+def archive_path(directory, host):
+    """Per-host file name in directory, with characters unsafe in paths replaced."""
+    return os.path.join(directory, "%s.json.gz" % re.sub(r"[^\w.-]", "_", host))
+
+
+def read_archive(path):
+    with gzip.open(path, "rt") as archive_file:
+        return json.load(archive_file)
+
+
+def write_archive(path, data):
+    """Write data as gzipped JSON, replacing path atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with gzip.open(tmp_path, "wt", compresslevel=6) as archive_file:
+        json.dump(data, archive_file, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def archived_hosts(directory):
+    """Yield the host of every archive recorded in directory."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.json.gz"))):
+        try:
+            yield read_archive(path)["host"]
+        except (OSError, ValueError, KeyError):
+            continue
+
+
+def index_resources(body, responses):
+    """Add the resources nested in an expanded body to responses (if missing)."""
+    if isinstance(body, dict):
+        uri = body.get("@odata.id")
+        if uri and len(body) > 1 and uri not in responses:
+            responses[uri] = [200, body]
+        values = body.values()
+    elif isinstance(body, list):
+        values = body
+    else:
+        return
+    for value in values:
+        if isinstance(value, (dict, list)):
+            index_resources(value, responses)
+
+
+class ResponseRecorder(object):
+    """Responses of one iDRAC, collected for writing to its archive."""
+
+    def __init__(self, directory, host):
+        self.path = archive_path(directory, host)
+        self.host = host
+        self.lock = threading.Lock()
+        self.responses = {}
+
+    def record(self, uri, response):
+        """Keep a response; returns it with its body parsed, to be parsed once."""
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        with self.lock:
+            self.responses[uri] = [response.status_code, body]
+        return CachedResponse(response.status_code, body, response.headers)
+
+    def save(self):
+        with self.lock:
+            if not self.responses:
+                return
+            data = {
+                "host": self.host,
+                "recorded": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "responses": self.responses,
+            }
+        write_archive(self.path, data)
+
+
+class ResponseReplay(object):
+    """Answers GETs from a recorded archive (read on the first GET)."""
+
+    def __init__(self, directory, host):
+        self.path = archive_path(directory, host)
+        self.lock = threading.Lock()
+        self.responses = None
+
+    def load(self):
+        with self.lock:
+            if self.responses is None:
+                responses = read_archive(self.path)["responses"]
+                for status, body in list(responses.values()):
+                    index_resources(body, responses)
+                self.responses = responses
+        return self.responses
+
+    def get(self, uri):
+        status, body = self.load().get(
+            uri, [404, {"error": "%s was not recorded" % uri}]
+        )
+        return CachedResponse(status, body)
@@ -0,0 +1,75 @@
+#
+# Per-run response cache. Several collectors read the same resources (every
+# one of check_supported_idrac_version, get_system_information,
+# get_ps_information and get_fan_information needs System.Embedded.1), so an
+# Idrac keeps each successful response for the rest of its run, keyed by URI.
+#
+# Collectors on different threads asking for a URI that is already being
+# fetched wait for that fetch instead of issuing their own, and members that
+# arrived inside an expanded collection are cached under their own URI so a
+# later plain GET of them is free.
+#
+
+
+import concurrent.futures
+import threading
+
+
+class CachedResponse(object):
+    """The parts of a requests.Response the collectors use, with the body parsed once."""
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+
+class ResponseCache(object):
+    """URI-keyed cache of successful responses with in-flight request coalescing."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.responses = {}
+        # uri -> Future of the fetch in progress
+        self.pending = {}
+        self.hits = 0
+
+    def get(self, uri, fetch):
+        """Return the cached response for uri, or fetch(uri) it exactly once."""
+        with self.lock:
+            if uri in self.responses:
+                self.hits += 1
+                return self.responses[uri]
+            future = self.pending.get(uri)
+            owner = future is None
+            if owner:
+                future = self.pending[uri] = concurrent.futures.Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+        try:
+            response = fetch(uri)
+            if response.status_code == 200:
+                response = CachedResponse(200, response.json(), response.headers)
+        except BaseException as e:
+            with self.lock:
+                del self.pending[uri]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.pending[uri]
+            # Failures are handed to the callers already waiting, but not kept
+            if response.status_code == 200:
+                self.responses[uri] = response
+        future.set_result(response)
+        return response
+
+    def seed(self, uri, body):
+        """Cache a resource that arrived expanded inside another response."""
+        with self.lock:
+            if uri not in self.responses:
+                self.responses[uri] = CachedResponse(200, body)
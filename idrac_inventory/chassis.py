@@ -0,0 +1,130 @@
+#
+# Shared chassis resources. The sleds of a modular chassis (PowerEdge C6400,
+# FX2, VRTX, M1000e, MX7000) each report the power supplies, fans and
+# backplane enclosures of the whole chassis through their own iDRAC, so a
+# fleet run used to read the same PSUs and fans once per sled. With a
+# SharedChassis passed to the Idracs of a run, the first sled of a chassis to
+# get to those collectors (CHASSIS_COLLECTORS) runs them and the other sleds
+# take a copy of its result, recording where it came from:
+#
+#   "SharedChassis": {"ChassisServiceTag": "7XJ4Q2C",
+#                     "PowerSupplyInformation": "10.0.1.17"}
+#
+# Chassis membership comes from the Dell ChassisServiceTag of the system,
+# which a standalone server reports as its own service tag, or else from the
+# chassis that Links.ContainedBy of the server's chassis resource points to.
+# Results are reused for max_age seconds, so a long running process does not
+# hand out stale ones.
+#
+
+
+import copy
+import threading
+import time
+
+import requests
+
+from .collectors import CHASSIS_COLLECTORS, CHASSIS_URI, run_collector
+from .session import RedfishError
+
+SYSTEM_URI = "/redfish/v1/Systems/System.Embedded.1"
+DEFAULT_MAX_AGE = 600
+
+
+def chassis_tag(idrac):
+    """Service tag of the modular chassis idrac's server is a sled of, or None."""
+    response = idrac.get(SYSTEM_URI)
+    if response.status_code != 200:
+        return None
+    system = response.json()
+    dell_system = system.get("Oem", {}).get("Dell", {}).get("DellSystem", {})
+    tag = dell_system.get("ChassisServiceTag")
+    if tag:
+        return None if tag == system.get("SKU") else tag
+    response = idrac.get(CHASSIS_URI)
+    if response.status_code != 200:
+        return None
+    contained_by = response.json().get("Links", {}).get("ContainedBy") or {}
+    uri = contained_by.get("@odata.id")
+    if not uri or uri == CHASSIS_URI:
+        return None
+    response = idrac.get(uri)
+    if response.status_code != 200:
+        return None
+    enclosure = response.json()
+    return enclosure.get("SKU") or enclosure.get("SerialNumber")
+
+
+class SharedChassis(object):
+    """Chassis-level sections collected once per chassis and shared by its sleds.
+
+    Can be used from the worker threads of a fleet run; a sled that gets to
+    a collector while another sled of its chassis is running it waits for
+    that result instead of collecting it again.
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        # (chassis tag, collector name) -> entry
+        self.entries = {}
+        self.collected = 0
+        self.shared = 0
+
+    def claim(self, key):
+        """The entry of key, and whether the caller is to collect it."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not (
+                entry["done"].is_set()
+                and time.monotonic() - entry["time"] > self.max_age
+            ):
+                return entry, False
+            entry = {"done": threading.Event(), "time": time.monotonic()}
+            self.entries[key] = entry
+            return entry, True
+
+    def run(self, idrac, collector):
+        """Run collector on idrac, or copy its result from another sled of the chassis."""
+        try:
+            tag = chassis_tag(idrac)
+        except (RedfishError, requests.RequestException, ValueError):
+            # Membership unknown, the sled collects the section itself
+            tag = None
+        if tag is None:
+            run_collector(idrac, collector)
+            return
+        section = CHASSIS_COLLECTORS[collector]
+        key = (tag, collector.__name__)
+        while True:
+            entry, owner = self.claim(key)
+            if owner:
+                break
+            entry["done"].wait()
+            if "section" in entry:
+                idrac.inventory[section] = copy.deepcopy(entry["section"])
+                # Each shared section names the sled it was collected from
+                shared = idrac.inventory.setdefault("SharedChassis", {})
+                shared["ChassisServiceTag"] = tag
+                shared[section] = entry["host"]
+                with self.lock:
+                    self.shared += 1
+                return
+            # The sled that collected it failed; try again from this one
+        try:
+            run_collector(idrac, collector)
+        finally:
+            with self.lock:
+                if collector.__name__ in idrac.inventory.get("Errors", {}):
+                    del self.entries[key]
+                else:
+                    # Sleds may release their components once streamed
+                    entry["section"] = copy.deepcopy(idrac.inventory[section])
+                    entry["host"] = idrac.ip
+                    entry["time"] = time.monotonic()
+                    self.collected += 1
+            entry["done"].set()
+
+    def stats(self):
+        with self.lock:
+            return {"collected": self.collected, "shared": self.shared}
@@ -0,0 +1,164 @@
+#
+# Library API. An IdracInventoryClient wraps one iDRAC - its pooled session,
+# response cache and inventory - and exposes each collector as a method that
+# returns the data it collected, so the inventory can be used from Python
+# without going through get_iDRAC_Inventory.py and its JSON output:
+#
+#   with IdracInventoryClient("192.168.0.120", "root", "calvin") as client:
+#       dimms = client.memory_information()
+#       inventory = client.collect(["a"])
+#
+# Clients share no state, so any number of them can run side by side on
+# threads (this is what fleet mode does). A single client is meant to be
+# used from one thread at a time.
+#
+
+
+import threading
+
+from . import collectors
+from .cache import ResponseCache
+from .collectors import (
+    COLLECTORS,
+    FLAG_SECTIONS,
+    Idrac,
+    collect_inventory,
+    run_collector,
+    run_collectors,
+    section_flags,
+)
+
+
+class IdracInventoryClient(object):
+    """Hardware inventory of one iDRAC, collected on demand.
+
+    Extra keyword options configure its RedfishSession (max_in_flight,
+    token_auth, use_expand, timeouts, tracer...), unless an existing session
+    is passed in.
+    """
+
+    def __init__(self, host, username=None, password=None, session=None, **options):
+        self.idrac = Idrac(host, username, password, session=session, **options)
+        self.lock = threading.Lock()
+        self.checked = False
+
+    @property
+    def host(self):
+        return self.idrac.ip
+
+    @property
+    def inventory(self):
+        """Everything collected so far, keyed by section."""
+        return self.idrac.inventory
+
+    def check(self):
+        """Verify once that the iDRAC's Redfish API is usable (raises RedfishError)."""
+        with self.lock:
+            if not self.checked:
+                run_collector(
+                    self.idrac,
+                    collectors.check_supported_idrac_version,
+                    raise_errors=True,
+                )
+                self.checked = True
+
+    def run(self, collector, section):
+        self.check()
+        run_collector(self.idrac, collector, raise_errors=True)
+        return self.idrac.inventory[section]
+
+    def collect(self, flags, on_collected=None):
+        """Run the collectors selected by section flags, as the CLI does.
+
+        Failed collectors are recorded under inventory["Errors"] instead of
+        raising; returns the inventory.
+        """
+        inventory = collect_inventory(self.idrac, flags, on_collected)
+        self.checked = True
+        return inventory
+
+    def refresh(self, flags):
+        """Collect the sections selected by section flags again, from fresh responses.
+
+        What those collectors found before is replaced (SystemInformation,
+        shared by several flags, is updated in place), as are their errors.
+        Returns the inventory.
+        """
+        flags = section_flags(flags)
+        self.check()
+        self.idrac.cache = ResponseCache()
+        errors = self.idrac.inventory.get("Errors", {})
+        shared = self.idrac.inventory.get("SharedChassis", {})
+        for flag in flags:
+            for section in FLAG_SECTIONS[flag]:
+                if section != "SystemInformation":
+                    self.idrac.inventory[section] = {}
+                    # Refreshed from this iDRAC, not shared any more
+                    shared.pop(section, None)
+            for collector in COLLECTORS[flag]:
+                errors.pop(collector.__name__, None)
+        if not errors:
+            self.idrac.inventory.pop("Errors", None)
+        if list(shared) == ["ChassisServiceTag"]:
+            self.idrac.inventory.pop("SharedChassis", None)
+        run_collectors(
+            self.idrac,
+            [collector for flag in flags for collector in COLLECTORS[flag]],
+            shared_chassis=self.idrac.shared_chassis,
+        )
+        return self.idrac.inventory
+
+    def system_information(self):
+        return self.run(collectors.get_system_information, "SystemInformation")
+
+    def idrac_information(self):
+        """iDRAC firmware version (stored in SystemInformation["IdracFirmware"])."""
+        self.run(collectors.get_idrac_information, "SystemInformation")
+        return self.idrac.inventory["SystemInformation"].get("IdracFirmware")
+
+    def firmware_information(self):
+        """System CPLD version (stored in SystemInformation["SystemCPLDversion"])."""
+        self.run(collectors.get_firmware_information, "SystemInformation")
+        return self.idrac.inventory["SystemInformation"].get("SystemCPLDversion")
+
+    def memory_information(self):
+        return self.run(collectors.get_memory_information, "MemoryInformation")
+
+    def cpu_information(self):
+        return self.run(collectors.get_cpu_information, "ProcessorInformation")
+
+    def fan_information(self):
+        return self.run(collectors.get_fan_information, "FanInformation")
+
+    def ps_information(self):
+        return self.run(collectors.get_ps_information, "PowerSupplyInformation")
+
+    def storage_controller_information(self):
+        return self.run(
+            collectors.get_storage_controller_information,
+            "StorageControllerInformation",
+        )
+
+    def storage_disks_information(self):
+        # Drives are listed per storage controller
+        if not self.idrac.controller_list:
+            self.storage_controller_information()
+        return self.run(
+            collectors.get_storage_disks_information, "StorageDisksInformation"
+        )
+
+    def backplane_information(self):
+        return self.run(collectors.get_backplane_information, "BackplaneInformation")
+
+    def network_information(self):
+        return self.run(collectors.get_network_information, "NetworkDeviceInformation")
+
+    def close(self):
+        """Log out and release the pooled connections (and write caches/archives)."""
+        self.idrac.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
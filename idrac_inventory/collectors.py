@@ -0,0 +1,1075 @@
+#
+# Redfish collectors behind get_iDRAC_Inventory.py. Each collector takes an
+# Idrac object carrying the connection details and the inventory collected so
+# far, so any number of iDRACs can be inventoried from one process.
+#
+# _author_ = Texas Roemer <Texas_Roemer@Dell.com>
+# _modified_ = Azat Salikhov <Azat_Salikhov@Dellteam.com>
+#
+# Copyright (c) 2020, Dell, Inc.
+#
+# This software is licensed to you under the GNU General Public License,
+# version 2 (GPLv2). There is NO WARRANTY for this software, express or
+# implied, including the implied warranties of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. You should have received a copy of GPLv2
+# along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+#
+
+
+import sys
+import re
+import time
+import copy
+import concurrent.futures
+import warnings
+
+from .engine import (
+    get_expanded,
+    get_expanded_many,
+    get_many,
+    get_members,
+    resolve_links,
+)
+from .cache import ResponseCache
+from .session import RedfishError, RedfishSession
+
+warnings.filterwarnings("ignore")
+
+
+def new_inventory():
+    return {
+        "SystemInformation": {},
+        "MemoryInformation": {},
+        "ProcessorInformation": {},
+        "StorageControllerInformation": {},
+        "StorageDisksInformation": {},
+        "NetworkDeviceInformation": {},
+        "PowerSupplyInformation": {},
+        "BackplaneInformation": {},
+        "FanInformation": {},
+    }
+
+
+class Idrac(object):
+    """Connection details and collected inventory of a single iDRAC."""
+
+    def __init__(
+        self,
+        ip,
+        username,
+        password,
+        session=None,
+        thermal_power=False,
+        shared_chassis=None,
+        sequential=False,
+        **session_options
+    ):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        # Every collector running on this iDRAC shares one pooled session;
+        # extra keyword options (max_in_flight, token_auth...) configure it
+        if session is None:
+            session = RedfishSession(ip, username, password, **session_options)
+        self.session = session
+        self.tracer = session.tracer
+        self.cache = ResponseCache()
+        self.inventory = new_inventory()
+        # Storage controller URIs, filled by get_storage_controller_information
+        # and walked by get_storage_disks_information
+        self.controller_list = []
+        # Read fans and PSUs from the chassis Thermal and Power resources
+        # instead of one GET per Links.CooledBy / Links.PoweredBy entry
+        self.thermal_power = thermal_power
+        # chassis.SharedChassis of the run, to collect the sections of
+        # CHASSIS_COLLECTORS once per modular chassis instead of once per sled
+        self.shared_chassis = shared_chassis
+        # Run the collectors one after another instead of side by side
+        self.sequential = sequential
+
+    def get(self, uri):
+        """GET a Redfish URI, served from this run's cache when already fetched."""
+        return self.cache.get(uri, self.session.get)
+
+    def close(self):
+        self.session.close()
+
+
+def check_supported_idrac_version(idrac):
+    response = idrac.get("/redfish/v1/Systems/System.Embedded.1")
+    if response.status_code != 200:
+        raise RedfishError(
+            "iDRAC version installed does not support this feature using Redfish API"
+        )
+
+
+def get_system_information(idrac):
+    response = idrac.get("/redfish/v1/Systems/System.Embedded.1")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    else:
+        # message = "\n---- systemInformation ----"
+        # print(message)
+        for i in data.items():
+            if (
+                i[0] == "@odata.id"
+                or i[0] == "@odata.context"
+                # "@odata" in i[0]
+                or i[0] == "Links"
+                or i[0] == "Actions"
+                or i[0] == "@odata.type"
+                or i[0] == "Description"
+                or i[0] == "EthernetInterfaces"
+                or i[0] == "Storage"
+                or i[0] == "Processors"
+                or i[0] == "Memory"
+                or i[0] == "SecureBoot"
+                or i[0] == "NetworkInterfaces"
+                or i[0] == "Bios"
+                or i[0] == "SimpleStorage"
+                or i[0] == "PCIeDevices"
+                or i[0] == "PCIeFunctions"
+            ):
+                pass
+            # elif i[0] == "Oem":
+            #     idrac.inventory["SystemInformation"]["Oem"] = {}
+            #     idrac.inventory["SystemInformation"]["Oem"]["Dell"] = {}
+            #     idrac.inventory["SystemInformation"]["Oem"]["Dell"]["DellSystem"] = {
+            #     }
+            #     for ii in i[1]["Dell"]["DellSystem"].items():
+            #         if (
+            #             # "@odata"
+            #             # in ii[0]
+            #             ii[0] == "@odata.context"
+            #             or ii[0] == "@odata.type"
+            #             or ii[0] == "@odata.id"
+            #         ):
+            #             pass
+            #         else:
+            #             idrac.inventory["SystemInformation"]["Oem"]["Dell"][
+            #                 "DellSystem"
+            #             ][ii[0]] = ii[1]
+
+            # elif i[0] == "Boot":
+            #     try:
+            #         idrac.inventory["SystemInformation"]["Boot"] = {}
+            #         idrac.inventory["SystemInformation"]["Boot"]["BiosBootMode"] = {}
+            #         idrac.inventory["SystemInformation"]["Boot"]["BiosBootMode"] = [
+            #             i[1]
+            #         ]["BootSourceOverrideMode"]
+            #     except:
+            #         pass
+
+            else:
+                idrac.inventory["SystemInformation"][i[0]] = i[1]
+
+
+def get_idrac_information(idrac):
+    response = idrac.get("/redfish/v1/Managers/iDRAC.Embedded.1")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    else:
+        idrac.inventory["SystemInformation"]["IdracFirmware"] = data["FirmwareVersion"]
+
+
+def get_firmware_information(idrac):
+    response = idrac.get(
+        "/redfish/v1/UpdateService/FirmwareInventory?$expand=.($levels=1)"
+    )
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    else:
+        for i in data["Members"]:
+            if i["Name"] == "System CPLD":
+                idrac.inventory["SystemInformation"]["SystemCPLDversion"] = i["Version"]
+
+
+def get_memory_information(idrac):
+    response, dimms = get_members(idrac, "/redfish/v1/Systems/System.Embedded.1/Memory")
+    data = response.json()
+    # print(data)
+
+    idrac.inventory["MemoryInformation"]["DimmCount"] = data["Members@odata.count"]
+    for i, status_code, sub_data in dimms:
+        dimm = i.split("/")[-1]
+        # print(dimm)
+        dimm_slot = re.search("DIMM.+", dimm).group()
+        # print(dimm_slot)
+        # print(sub_data)
+        idrac.inventory["MemoryInformation"][dimm_slot] = {}
+        # message = "\n- Memory details for %s -\n" % dimm_slot
+        # print(message)
+        for ii in sub_data.items():
+            # print(ii)
+            if (
+                "@odata" in ii[0]
+                # ii[0] == "@odata.id"
+                # or ii[0] == "@odata.context"
+                or ii[0] == "Assembly"
+                or ii[0] == "Metrics"
+                or ii[0] == "Links"
+            ):
+                pass
+            else:
+                # idrac.inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
+                idrac.inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
+
+
+# def get_memory_information():
+#     response = requests.get(
+#         "https://%s/redfish/v1/Systems/System.Embedded.1/Memory" % idrac.ip,
+#         verify=False,
+#         auth=(idrac.username, idrac.password),
+#     )
+#     data = response.json()
+#     if response.status_code != 200:
+#         # print("\n- FAIL, get command failed, error is: %s" % data)
+#         # sys.exit()
+#         pass
+#     # else:
+#     #     message = "\n---- Memory Information ----"
+#     #     print(message)
+#     for i in data["Members"]:
+#         dimm = i["@odata.id"].split("/")[-1]
+#         try:
+#             dimm_slot = re.search("DIMM.+", dimm).group()
+#         except:
+#             # print("\n- FAIL, unable to get dimm slot info")
+#             # sys.exit()
+#             pass
+#         response = requests.get(
+#             "https://%s%s" % (idrac.ip, i["@odata.id"]),
+#             verify=False,
+#             auth=(idrac.username, idrac.password),
+#         )
+#         sub_data = response.json()
+#         if response.status_code != 200:
+#             # print("\n- FAIL, get command failed, error is: %s" % sub_data)
+#             # sys.exit()
+#             pass
+#         else:
+#             idrac.inventory["MemoryInformation"][dimm_slot] = {}
+#             # message = "\n- Memory details for %s -\n" % dimm_slot
+#             # print(message)
+#             for ii in sub_data.items():
+#                 if (
+#                     "@odata" in ii[0]
+#                     # ii[0] == "@odata.id"
+#                     # or ii[0] == "@odata.context"
+#                     or ii[0] == "Assembly"
+#                     or ii[0] == "Metrics"
+#                     or ii[0] == "Links"
+#                 ):
+#                     pass
+#                 # elif ii[0] == "Oem":
+#                 #     idrac.inventory["MemoryInformation"][dimm_slot]["Oem"] = {}
+#                 #     idrac.inventory["MemoryInformation"][dimm_slot]["Oem"]["Dell"] = {
+#                 #     }
+#                 #     idrac.inventory["MemoryInformation"][dimm_slot]["Oem"]["Dell"][
+#                 #         "DellMemory"
+#                 #     ] = {}
+#                 #     for iii in ii[1]["Dell"]["DellMemory"].items():
+#                 #         if iii[0] == "@odata.context" or iii[0] == "@odata.type":
+#                 #             # if "@odata" in iii[0]:
+#                 #             pass
+#                 #         else:
+#                 #             idrac.inventory["MemoryInformation"][dimm_slot]["Oem"][
+#                 #                 "Dell"
+#                 #             ]["DellMemory"][iii[0]] = iii[1]
+#                 else:
+#                     idrac.inventory["MemoryInformation"][dimm_slot][ii[0]] = ii[1]
+
+
+def get_cpu_information(idrac):
+    response, cpus = get_members(
+        idrac, "/redfish/v1/Systems/System.Embedded.1/Processors"
+    )
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+
+    for i, status_code, sub_data in cpus:
+        cpu = i.split("/")[-1]
+        if status_code != 200:
+            raise RedfishError("get command failed, error is: %s" % sub_data)
+        else:
+            idrac.inventory["ProcessorInformation"][cpu] = {}
+            for ii in sub_data.items():
+                if (
+                    # "@odata" in ii[0]
+                    ii[0] == "@odata.id"
+                    or ii[0] == "@odata.context"
+                    or ii[0] == "Metrics"
+                    or ii[0] == "Links"
+                    or ii[0] == "Description"
+                    or ii[0] == "Assembly"
+                    or ii[0] == "@odata.type"
+                ):
+                    pass
+                elif ii[0] == "Oem":
+                    idrac.inventory["ProcessorInformation"][cpu]["Oem"] = {}
+                    idrac.inventory["ProcessorInformation"][cpu]["Oem"]["Dell"] = {}
+                    idrac.inventory["ProcessorInformation"][cpu]["Oem"]["Dell"][
+                        "DellProcessor"
+                    ] = {}
+                    for iii in ii[1]["Dell"]["DellProcessor"].items():
+                        # if "@odata" in iii[0]:
+                        if iii[0] == "@odata.context" or iii[0] == "@odata.type":
+                            pass
+                        else:
+                            idrac.inventory["ProcessorInformation"][cpu]["Oem"]["Dell"][
+                                "DellProcessor"
+                            ][iii[0]] = iii[1]
+                else:
+                    idrac.inventory["ProcessorInformation"][cpu][ii[0]] = ii[1]
+
+
+CHASSIS_URI = "/redfish/v1/Chassis/System.Embedded.1"
+
+
+def get_chassis_members(idrac, resource, prop, subsystem):
+    """Entries of a list in a chassis resource, e.g. the Fans of Thermal.
+
+    Falls back to the newer subsystem collection (ThermalSubsystem/Fans,
+    PowerSubsystem/PowerSupplies) where the resource is missing; returns
+    None if neither exists.
+    """
+    response = idrac.get("%s/%s" % (CHASSIS_URI, resource))
+    if response.status_code == 200:
+        return response.json().get(prop, [])
+    response, members = get_members(idrac, "%s/%s/%s" % (CHASSIS_URI, subsystem, prop))
+    if response.status_code != 200:
+        return None
+    return [body for uri, status_code, body in members if status_code == 200]
+
+
+def add_fans(idrac, fans):
+    for fan in fans:
+        fan_name = (fan.get("FanName") or fan["Name"]).replace(" ", "")
+        idrac.inventory["FanInformation"][fan_name] = dict(fan)
+
+
+def add_power_supplies(idrac, power_supplies):
+    for power_supply in power_supplies:
+        ps_name = power_supply["Name"].replace(" ", "")
+        idrac.inventory["PowerSupplyInformation"][ps_name] = dict(power_supply)
+
+
+def get_fan_information(idrac):
+    if idrac.thermal_power:
+        fans = get_chassis_members(idrac, "Thermal", "Fans", "ThermalSubsystem")
+        if fans is not None:
+            if not fans:
+                print("\n- WARNING, no fans detected for system", file=sys.stderr)
+            add_fans(idrac, fans)
+            return
+    response = idrac.get("/redfish/v1/Systems/System.Embedded.1")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+        # else:
+        # message = "\n---- Fan Information ----\n"
+        # print(message)
+    fan_list = []
+    if data["Links"]["CooledBy"] == []:
+        print("\n- WARNING, no fans detected for system", file=sys.stderr)
+    else:
+        for i in data["Links"]["CooledBy"]:
+            for ii in i.items():
+                fan_list.append(ii[1])
+        for i, response in zip(fan_list, get_many(idrac, fan_list)):
+            if response.status_code != 200:
+                print(
+                    "\n- FAIL, get command failed, error is: %s" % response.json(),
+                    file=sys.stderr,
+                )
+            else:
+                data_get = response.json()
+                try:
+                    fan_name = data_get["FanName"].replace(" ", "")
+                    idrac.inventory["FanInformation"][fan_name] = {}
+                    # message = "\n- Details for %s -\n" % data_get["FanName"]
+                    # print(message)
+                except:
+                    pass
+                if "Fans" not in data_get.keys():
+                    for ii in data_get.items():
+                        idrac.inventory["FanInformation"][fan_name][ii[0]] = ii[1]
+                    #     message = "%s: %s" % (ii[0], ii[1])
+                    #     print(message)
+                    #     message = "\n"
+                    # message = "\n"
+                    # print(message)
+                else:
+                    # The link points into the chassis Thermal resource, which
+                    # lists every fan: the other links point there too
+                    add_fans(idrac, data_get["Fans"])
+                    return
+
+
+def get_ps_information(idrac):
+    if idrac.thermal_power:
+        power_supplies = get_chassis_members(
+            idrac, "Power", "PowerSupplies", "PowerSubsystem"
+        )
+        if power_supplies is not None:
+            if not power_supplies:
+                print(
+                    "- WARNING, no power supplies detected for system", file=sys.stderr
+                )
+            add_power_supplies(idrac, power_supplies)
+            return
+    response = idrac.get("/redfish/v1/Systems/System.Embedded.1")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    # else:
+    #     message = "\n---- Power Supply Information ----\n"
+    #     print(message)
+    if data["Links"]["PoweredBy"] == []:
+        print("- WARNING, no power supplies detected for system", file=sys.stderr)
+
+    else:
+        ps_uris = [ii[1] for i in data["Links"]["PoweredBy"] for ii in i.items()]
+        ps_responses = dict(zip(ps_uris, get_many(idrac, ps_uris)))
+        for i in data["Links"]["PoweredBy"]:
+            for ii in i.items():
+                response = ps_responses[ii[1]]
+                if response.status_code != 200:
+                    raise RedfishError(
+                        "get command failed, error is: %s" % response.json()
+                    )
+                else:
+                    data_get = response.json()
+                    if "PowerSupplies" not in data_get.keys():
+                        ps_name = data_get["Name"].replace(" ", "")
+                        idrac.inventory["PowerSupplyInformation"][ps_name] = {}
+                        # message = "\n- Details for %s -\n" % data_get["Name"]
+                        # print(message)
+                        for i in data_get.items():
+                            # if i[0] == "Oem":
+                            #     try:
+                            #         idrac.inventory["PowerSupplyInformation"][ps_name][
+                            #             "Oem"
+                            #         ] = {}
+                            #         idrac.inventory["PowerSupplyInformation"][ps_name][
+                            #             "Oem"
+                            #         ]["Dell"] = {}
+                            #         idrac.inventory["PowerSupplyInformation"][ps_name][
+                            #             "Oem"
+                            #         ]["Dell"]["DellPowerSupply"] = {}
+                            #         for ii in i[1]["Dell"]["DellPowerSupply"].items():
+                            #             idrac.inventory["PowerSupplyInformation"][
+                            #                 ps_name
+                            #             ]["Oem"]["Dell"]["DellPowerSupply"][ii[0]] = ii[
+                            #                 1
+                            #             ]
+                            #     except:
+                            #         print(
+                            #             "- FAIL, unable to find Dell PowerSupply OEM information"
+                            #         )
+                            #         sys.exit()
+                            # else:
+                            idrac.inventory["PowerSupplyInformation"][ps_name][i[0]] = (
+                                i[1]
+                            )
+                    else:
+                        if len(data["Links"]["PoweredBy"]) == 1:
+                            ps_name = data_get["PowerSupplies"][0]["Name"].replace(
+                                " ", ""
+                            )
+                            idrac.inventory["PowerSupplyInformation"][ps_name] = {}
+                            # message = (
+                            #     "\n- Details for %s -\n"
+                            #     % data_get["PowerSupplies"][0]["Name"]
+                            # )
+                            # print(message)
+                            for i in data_get.items():
+                                if i[0] == "PowerSupplies":
+                                    idrac.inventory["PowerSupplyInformation"][ps_name][
+                                        "PowerSupplies"
+                                    ] = {}
+                                    for ii in i[1]:
+                                        for iii in ii.items():
+                                            # if iii[0] == "Oem":
+                                            #     idrac.inventory[
+                                            #         "PowerSupplyInformation"
+                                            #     ][ps_name]["PowerSupplies"]["Oem"] = {}
+                                            #     idrac.inventory[
+                                            #         "PowerSupplyInformation"
+                                            #     ][ps_name]["PowerSupplies"]["Oem"][
+                                            #         "Dell"
+                                            #     ] = {}
+                                            #     idrac.inventory[
+                                            #         "PowerSupplyInformation"
+                                            #     ][ps_name]["PowerSupplies"]["Oem"][
+                                            #         "Dell"
+                                            #     ][
+                                            #         "DellPowerSupply"
+                                            #     ] = {}
+                                            #     try:
+                                            #         for iiii in iii[1]["Dell"][
+                                            #             "DellPowerSupply"
+                                            #         ].items():
+                                            #             idrac.inventory[
+                                            #                 "PowerSupplyInformation"
+                                            #             ][ps_name]["PowerSupplies"][
+                                            #                 "Oem"
+                                            #             ][
+                                            #                 "Dell"
+                                            #             ][
+                                            #                 "DellPowerSupply"
+                                            #             ][
+                                            #                 iiii[0]
+                                            #             ] = iiii[
+                                            #                 1
+                                            #             ]
+                                            #     except:
+                                            #         print(
+                                            #             "- FAIL, unable to find Dell PowerSupply OEM information"
+                                            #         )
+                                            #         sys.exit()
+                                            # else:
+                                            idrac.inventory["PowerSupplyInformation"][
+                                                ps_name
+                                            ]["PowerSupplies"][iii[0]] = iii[1]
+                                elif i[0] == "Voltages":
+                                    pass
+                                elif i[0] == "PowerControl":
+                                    idrac.inventory["PowerSupplyInformation"][ps_name][
+                                        "PowerSupplies"
+                                    ]["PowerControl"] = {}
+                                    for ii in i[1]:
+                                        for iii in ii.items():
+                                            idrac.inventory["PowerSupplyInformation"][
+                                                ps_name
+                                            ]["PowerSupplies"]["PowerControl"][
+                                                iii[0]
+                                            ] = iii[
+                                                1
+                                            ]
+                                else:
+                                    idrac.inventory["PowerSupplyInformation"][ps_name][
+                                        "PowerSupplies"
+                                    ][i[0]] = i[1]
+                        else:
+                            # Every PSU of the chassis Power resource
+                            add_power_supplies(idrac, data_get["PowerSupplies"])
+                            return
+
+
+def get_storage_controller_information(idrac):
+    # message = "\n---- Controller Information ----"
+    # print(message)
+    response, controllers = get_members(
+        idrac, "/redfish/v1/Systems/System.Embedded.1/Storage"
+    )
+    idrac.controller_list = [i for i, status_code, data in controllers]
+    for i, status_code, data in controllers:
+        storage_controller = i.split("/")[-1]
+        idrac.inventory["StorageControllerInformation"][storage_controller] = {}
+        # message = "\n - Detailed controller information for %s -\n" % i.split("/")[-1]
+        # print(message)
+        for i in data.items():
+            if i[0] == "Status":
+                pass
+            elif "@" in i[0] or "odata" in i[0]:
+                pass
+            elif i[0] == "StorageControllers":
+                idrac.inventory["StorageControllerInformation"][storage_controller][
+                    "StorageControllers"
+                ] = {}
+                for ii in i[1]:
+                    for iii in ii.items():
+                        if iii[0] == "Status":
+                            for iiii in iii[1].items():
+                                idrac.inventory["StorageControllerInformation"][
+                                    storage_controller
+                                ]["StorageControllers"][iiii[0]] = iiii[1]
+                        else:
+                            idrac.inventory["StorageControllerInformation"][
+                                storage_controller
+                            ]["StorageControllers"][iii[0]] = [iii[1]]
+            # elif i[0] == "Oem":
+            #     try:
+            #         idrac.inventory["StorageControllerInformation"][storage_controller][
+            #             "Oem"
+            #         ] = {}
+            #         idrac.inventory["StorageControllerInformation"][storage_controller][
+            #             "Oem"
+            #         ]["Dell"] = {}
+            #         idrac.inventory["StorageControllerInformation"][storage_controller][
+            #             "Oem"
+            #         ]["Dell"]["DellController"] = {}
+            #         for ii in i[1]["Dell"]["DellController"].items():
+            #             idrac.inventory["StorageControllerInformation"][
+            #                 storage_controller
+            #             ]["Oem"]["Dell"]["DellController"][ii[0]] = ii[1]
+            #     except:
+            #         for ii in i[1]["Dell"].items():
+            #             idrac.inventory["StorageControllerInformation"][
+            #                 storage_controller
+            #             ]["Oem"]["Dell"][ii[0]] = ii[1]
+            else:
+                idrac.inventory["StorageControllerInformation"][storage_controller][
+                    i[0]
+                ] = i[1]
+    else:
+        pass
+
+
+def get_storage_disks_information(idrac):
+    # message = "\n---- Disk Information ----"
+    # print(message)
+    storage_uris = [
+        "/redfish/v1/Systems/System.Embedded.1/Storage/%s" % i.split("/")[-1]
+        for i in idrac.controller_list
+    ]
+    for i, response in zip(
+        idrac.controller_list, get_expanded_many(idrac, storage_uris)
+    ):
+        data = response.json()
+        if response.status_code == 200 or response.status_code == 202:
+            pass
+        else:
+            raise RedfishError(
+                "GET command failed, detailed error information: %s" % data
+            )
+        if data["Drives"] == []:
+            pass
+            # message = "\n- WARNING, no drives detected for %s" % i.split(
+            #     "/")[-1]
+            # print(message)
+        else:
+            for drive_uri, status_code, data in resolve_links(idrac, data["Drives"]):
+                storage_drive = drive_uri.split("/")[-1]
+                idrac.inventory["StorageDisksInformation"][storage_drive] = {}
+                # message = (
+                #     "\n - Detailed drive information for %s -\n"
+                #     % ii[1].split("/")[-1]
+                # )
+                # print(message)
+                for ii in data.items():
+                    # if ii[0] == "Oem":
+                    #     idrac.inventory["StorageDisksInformation"][storage_drive][
+                    #         "Oem"
+                    #     ] = {}
+                    #     idrac.inventory["StorageDisksInformation"][storage_drive][
+                    #         "Oem"
+                    #     ]["Dell"] = {}
+                    #     idrac.inventory["StorageDisksInformation"][storage_drive][
+                    #         "Oem"
+                    #     ]["Dell"]["DellPhysicalDisk"] = {}
+                    #     for iii in ii[1]["Dell"]["DellPhysicalDisk"].items():
+                    #         idrac.inventory["StorageDisksInformation"][
+                    #             storage_drive
+                    #         ]["Oem"]["Dell"]["DellPhysicalDisk"][iii[0]] = iii[1]
+                    # elif ii[0] == "Status":
+                    #     idrac.inventory["StorageDisksInformation"][storage_drive][
+                    #         "Status"
+                    #     ] = {}
+                    #     for iii in ii[1].items():
+                    #         idrac.inventory["StorageDisksInformation"][
+                    #             storage_drive
+                    #         ]["Status"][iii[0]] = iii[1]
+                    # else:
+                    idrac.inventory["StorageDisksInformation"][storage_drive][ii[0]] = (
+                        ii[1]
+                    )
+
+
+def get_backplane_information(idrac):
+    response = get_expanded(idrac, "/redfish/v1/Chassis")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    # message = "\n---- Backplane Information ----"
+    # print(message)
+    backplane_URI_list = []
+    for i in data["Members"]:
+        backplane = i["@odata.id"]
+        if "Enclosure" in backplane:
+            backplane_URI_list.append(i)
+    if backplane_URI_list == []:
+        message = "- WARNING, no backplane information detected for system\n"
+        print(message, file=sys.stderr)
+        return
+    for i, status_code, data in resolve_links(idrac, backplane_URI_list):
+        backplane_name = i.split("/")[-1]
+        idrac.inventory["BackplaneInformation"][backplane_name] = {}
+        # message = "\n- Detailed backplane information for %s -\n" % i.split("/")[-1]
+        # print(message)
+        for iii in data.items():
+            if (
+                iii[0] == "@odata.id"
+                or iii[0] == "@odata.context"
+                or iii[0] == "Metrics"
+                or iii[0] == "Links"
+                or iii[0] == "@Redfish.Settings"
+                or iii[0] == "@odata.type"
+                or iii[0] == "RelatedItem"
+                or iii[0] == "Actions"
+                or iii[0] == "PCIeDevices"
+            ):
+                pass
+            # elif iii[0] == "Oem":
+            #     try:
+            #         idrac.inventory["BackplaneInformation"][backplane_name]["Oem"] = {}
+            #         idrac.inventory["BackplaneInformation"][backplane_name]["Oem"][
+            #             "Dell"
+            #         ] = {}
+            #         idrac.inventory["BackplaneInformation"][backplane_name]["Oem"][
+            #             "Dell"
+            #         ]["DellEnclosure"] = {}
+            #         for iiii in iii[1]["Dell"]["DellEnclosure"].items():
+            #             if (
+            #                 iiii[0] == "@odata.context"
+            #                 or iiii[0] == "@odata.type"
+            #                 or iiii[0] == "@odata.id"
+            #             ):
+            #                 pass
+            #             else:
+            #                 idrac.inventory["BackplaneInformation"][backplane_name][
+            #                     "Oem"
+            #                 ]["Dell"]["DellEnclosure"][iiii[0]] = iiii[1]
+            #     except:
+            #         pass
+            else:
+                idrac.inventory["BackplaneInformation"][backplane_name][iii[0]] = iii[1]
+
+
+def get_network_information(idrac):
+    response = idrac.get("/redfish/v1/Systems/System.Embedded.1/NetworkInterfaces")
+    data = response.json()
+    if response.status_code != 200:
+        raise RedfishError("get command failed, error is: %s" % data)
+    # message = "\n---- Network Device Information ----"
+    # print(message)
+    network_URI_list = []
+    for i in data["Members"]:
+        network = i["@odata.id"]
+        network_URI_list.append(network)
+    if network_URI_list == []:
+        message = "\n- WARNING, no network information detected for system\n"
+        print(message, file=sys.stderr)
+    adapter_links = [
+        {"@odata.id": i.replace("Interfaces", "Adapters")} for i in network_URI_list
+    ]
+    if adapter_links and idrac.session.supports_expand():
+        # One expanded GET of the adapter collection instead of one per adapter
+        response = get_expanded(
+            idrac, "/redfish/v1/Systems/System.Embedded.1/NetworkAdapters"
+        )
+        if response.status_code == 200:
+            expanded = {i["@odata.id"]: i for i in response.json().get("Members", [])}
+            adapter_links = [expanded.get(i["@odata.id"], i) for i in adapter_links]
+    for i, (adapter, status_code, data) in zip(
+        network_URI_list, resolve_links(idrac, adapter_links)
+    ):
+        net_dev_name = i.split("/")[-1]
+        idrac.inventory["NetworkDeviceInformation"][net_dev_name] = {}
+        # message = "\n- Network device details for %s -\n" % i.split("/")[-1]
+        # print(message)
+        if status_code != 200:
+            raise RedfishError("get command failed, error is: %s" % data)
+        for ii in data.items():
+            if ii[0] == "NetworkPorts":
+                url_port = ii[1]["@odata.id"]
+                response, ports = get_members(idrac, url_port)
+                if response.status_code != 200:
+                    raise RedfishError(
+                        "get command failed, error is: %s" % response.json()
+                    )
+            if (
+                ii[0] == "@odata.id"
+                or ii[0] == "@odata.context"
+                or ii[0] == "Metrics"
+                or ii[0] == "Links"
+                or ii[0] == "@odata.type"
+                or ii[0] == "NetworkDeviceFunctions"
+                or ii[0] == "NetworkPorts"
+                or ii[0] == "Assembly"
+            ):
+                pass
+            elif ii[0] == "Controllers":
+                idrac.inventory["NetworkDeviceInformation"][
+                    "Controller Capabilities"
+                ] = ii[1][0]["ControllerCapabilities"]
+                idrac.inventory["NetworkDeviceInformation"][
+                    "FirmwarePackageVersion"
+                ] = ii[1][0]["FirmwarePackageVersion"]
+            else:
+                idrac.inventory["NetworkDeviceInformation"][ii[0]] = ii[1]
+
+        for z, status_code, data in ports:
+            if status_code != 200:
+                raise RedfishError("get command failed, error is: %s" % data)
+            else:
+                net_dev_port = z.split("/")[-1]
+                idrac.inventory["NetworkDeviceInformation"][net_dev_name][
+                    net_dev_port
+                ] = {}
+                # message = "\n- Network port details for %s -\n" % z.split("/")[-1]
+                # print(message)
+                for ii in data.items():
+                    if (
+                        ii[0] == "@odata.id"
+                        or ii[0] == "@odata.context"
+                        or ii[0] == "Metrics"
+                        or ii[0] == "Links"
+                        or ii[0] == "@odata.type"
+                    ):
+                        pass
+                    # elif ii[0] == "Oem":
+                    #     try:
+                    #         idrac.inventory["NetworkDeviceInformation"][net_dev_name][
+                    #             net_dev_port
+                    #         ]["Oem"] = {}
+                    #         idrac.inventory["NetworkDeviceInformation"][net_dev_name][
+                    #             net_dev_port
+                    #         ]["Oem"]["Dell"] = {}
+                    #         idrac.inventory["NetworkDeviceInformation"][net_dev_name][
+                    #             net_dev_port
+                    #         ]["Oem"]["Dell"]["DellSwitchConnection"] = {}
+                    #         for iii in ii[1]["Dell"]["DellSwitchConnection"].items():
+                    #             if (
+                    #                 iii[0] == "@odata.context"
+                    #                 or iii[0] == "@odata.type"
+                    #             ):
+                    #                 pass
+                    #             else:
+                    #                 idrac.inventory["NetworkDeviceInformation"][
+                    #                     net_dev_name
+                    #                 ][net_dev_port]["Oem"]["Dell"][
+                    #                     "DellSwitchConnection"
+                    #                 ][
+                    #                     iii[0]
+                    #                 ] = iii[
+                    #                     1
+                    #                 ]
+                    #     except:
+                    #         pass
+                    else:
+                        idrac.inventory["NetworkDeviceInformation"][net_dev_name][
+                            net_dev_port
+                        ][ii[0]] = ii[1]
+
+
+# Collectors run for each section flag of the script, in the order the script
+# has always run them
+SECTION_FLAGS = ("s", "i", "fw", "m", "c", "f", "ps", "S", "n", "a")
+
+COLLECTORS = {
+    "s": [get_system_information],
+    "i": [get_idrac_information],
+    "fw": [get_firmware_information],
+    "m": [get_memory_information],
+    "c": [get_cpu_information],
+    "f": [get_fan_information],
+    "ps": [get_ps_information],
+    "S": [
+        get_storage_controller_information,
+        get_storage_disks_information,
+        get_backplane_information,
+    ],
+    "n": [get_network_information],
+    "a": [
+        get_system_information,
+        get_idrac_information,
+        get_firmware_information,
+        get_memory_information,
+        get_cpu_information,
+        # get_fan_information,
+        get_ps_information,
+        get_storage_controller_information,
+        get_storage_disks_information,
+        get_backplane_information,
+        get_network_information,
+    ],
+}
+
+
+# Inventory sections each section flag's collectors fill in. SystemInformation
+# is shared by "s", "i" and "fw"
+FLAG_SECTIONS = {
+    "s": ("SystemInformation",),
+    "i": ("SystemInformation",),
+    "fw": ("SystemInformation",),
+    "m": ("MemoryInformation",),
+    "c": ("ProcessorInformation",),
+    "f": ("FanInformation",),
+    "ps": ("PowerSupplyInformation",),
+    "S": (
+        "StorageControllerInformation",
+        "StorageDisksInformation",
+        "BackplaneInformation",
+    ),
+    "n": ("NetworkDeviceInformation",),
+}
+
+
+# Collectors of chassis-level resources, the same on every sled of a modular
+# chassis, and the section each fills in
+CHASSIS_COLLECTORS = {
+    get_fan_information: "FanInformation",
+    get_ps_information: "PowerSupplyInformation",
+    get_backplane_information: "BackplaneInformation",
+}
+
+
+# Collectors that need what another collector left on the Idrac, and the
+# attribute it is in: the drives are read from the storage controllers that
+# get_storage_controller_information lists. The dependent collector runs once
+# per controller, as soon as the list is known, next to everything else.
+COLLECTOR_DEPENDENCIES = {
+    get_storage_disks_information: (
+        get_storage_controller_information,
+        "controller_list",
+    ),
+}
+
+
+def section_flags(flags):
+    """The flags in flags other than "a", plus those "a" stands for, in run order."""
+    if "a" in flags:
+        flags = set(flags).union(
+            flag
+            for flag in FLAG_SECTIONS
+            if all(collector in COLLECTORS["a"] for collector in COLLECTORS[flag])
+        )
+    return [flag for flag in FLAG_SECTIONS if flag in flags]
+
+
+def collect_inventory(idrac, flags, on_collected=None):
+    """Run the collectors selected by the section flags and return the inventory.
+
+    A collector that fails does not stop the others: whatever it collected
+    is kept and its error is recorded under inventory["Errors"], keyed by
+    collector name. Only a failed version check (the iDRAC cannot be reached
+    or has no usable Redfish API) is raised. on_collected(idrac), if given, is
+    called after each collector finishes. With a shared_chassis, the
+    CHASSIS_COLLECTORS of a sled take what another sled of its chassis found.
+    """
+    run_collector(idrac, check_supported_idrac_version, raise_errors=True)
+    if idrac.tracer:
+        # Lets the trace be broken down by server model (and so generation)
+        system = idrac.get("/redfish/v1/Systems/System.Embedded.1").json()
+        idrac.tracer.model(idrac.ip, system.get("Model"))
+    selected = [
+        collector
+        for flag in SECTION_FLAGS
+        if flag in flags
+        for collector in COLLECTORS[flag]
+    ]
+    run_collectors(idrac, selected, on_collected, idrac.shared_chassis)
+    return idrac.inventory
+
+
+def run_section_collector(idrac, collector, shared_chassis=None):
+    if shared_chassis and collector in CHASSIS_COLLECTORS:
+        shared_chassis.run(idrac, collector)
+    else:
+        run_collector(idrac, collector)
+
+
+def collector_views(idrac, collector):
+    """Idracs for collector to run on side by side with the others.
+
+    A view shares idrac's session, cache and settings but collects into an
+    inventory of its own, merged into idrac's once the collector is done, so
+    idrac.inventory is only ever changed (and streamed) from one thread.
+    """
+    views = []
+    attribute = COLLECTOR_DEPENDENCIES.get(collector, (None, None))[1]
+    for item in getattr(idrac, attribute) if attribute else [None]:
+        view = copy.copy(idrac)
+        view.inventory = new_inventory()
+        if attribute:
+            setattr(view, attribute, [item])
+        views.append(view)
+    return views
+
+
+def merge_view(idrac, view, collector):
+    for section, components in view.inventory.items():
+        idrac.inventory.setdefault(section, {}).update(components)
+    for provider, attribute in COLLECTOR_DEPENDENCIES.values():
+        if collector is provider:
+            setattr(idrac, attribute, getattr(view, attribute))
+
+
+def run_collectors(idrac, collectors, on_collected=None, shared_chassis=None):
+    """Run collectors on idrac, each once, as far side by side as they allow.
+
+    Only COLLECTOR_DEPENDENCIES hold a collector back; the number of requests
+    in flight stays capped by the iDRAC's session however many run, so the
+    inventory takes about as long as its slowest chain of collectors rather
+    than all of them. on_collected(idrac) is called from this thread after
+    each one finishes.
+    """
+    collectors = list(dict.fromkeys(collectors))
+    if idrac.sequential:
+        for collector in collectors:
+            run_section_collector(idrac, collector, shared_chassis)
+            if on_collected:
+                on_collected(idrac)
+        return
+    # collector -> the collectors it still waits for
+    waiting = {}
+    for collector in collectors:
+        provider = COLLECTOR_DEPENDENCIES.get(collector, (None, None))[0]
+        waiting[collector] = set([provider]) if provider in collectors else set()
+    workers = max(1, min(idrac.session.max_in_flight, len(collectors)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # future -> collector, in the order they were started
+        running = {}
+        views = {}
+        while waiting or running:
+            for collector in [c for c in waiting if not waiting[c]]:
+                del waiting[collector]
+                views[collector] = collector_views(idrac, collector)
+                for view in views[collector]:
+                    future = executor.submit(
+                        run_section_collector, view, collector, shared_chassis
+                    )
+                    running[future] = collector
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in [f for f in running if f in done]:
+                collector = running.pop(future)
+                future.result()
+                if collector in running.values():
+                    continue
+                # Views are merged in order, so drives keep their controllers' order
+                for view in views.pop(collector):
+                    merge_view(idrac, view, collector)
+                for providers in waiting.values():
+                    providers.discard(collector)
+                if on_collected:
+                    on_collected(idrac)
+
+
+def run_collector(idrac, collector, raise_errors=False):
+    """Run one collector, timing it and recording its error in the inventory."""
+    start = time.perf_counter()
+    error = None
+    try:
+        collector(idrac)
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+        if raise_errors:
+            raise
+        print("\n- FAIL, %s: %s" % (collector.__name__, error), file=sys.stderr)
+        idrac.inventory.setdefault("Errors", {})[collector.__name__] = error
+    finally:
+        if idrac.tracer:
+            idrac.tracer.collector(
+                idrac.ip, collector.__name__, time.perf_counter() - start, error
+            )
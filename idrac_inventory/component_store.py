@@ -0,0 +1,331 @@
+#
+# Local component index. Answering fleet questions such as "which nodes have
+# DIMM part HMA84GR7CJR4N-XN" or "which drives run firmware HE5A" from
+# componentInventory means loading every server's whole data document and
+# walking its nested sections. A ComponentStore keeps a normalized SQLite
+# copy instead, one row per DIMM, drive, CPU, network adapter and port:
+#
+#   components(service_tag, section, key, parent, model, part_number,
+#              serial_number, firmware_version, manufacturer, health, data)
+#
+# indexed on model, part number, serial, firmware version and health, next to
+# a systems table (service tag, host name, model, BIOS and iDRAC versions).
+# Servers are keyed on their service tag (SystemInformation.SKU), as in
+# MongoDB, so a node whose iDRAC gets a new address is updated in place.
+#
+# query() looks components up by any of those columns ("*" matches anything)
+# and group() counts them by one, e.g. the firmware versions of every drive
+# model, in milliseconds however many hosts are stored.
+#
+
+
+import datetime
+import json
+import sqlite3
+import threading
+
+from .collectors import COLLECTORS, FLAG_SECTIONS
+
+COMPONENT_SECTIONS = (
+    "MemoryInformation",
+    "ProcessorInformation",
+    "StorageDisksInformation",
+    "NetworkDeviceInformation",
+)
+
+# Column -> component properties it is read from, the first one present wins
+COLUMN_PROPERTIES = {
+    "model": ("Model",),
+    "part_number": ("PartNumber",),
+    "serial_number": ("SerialNumber",),
+    # Drives report their firmware as Revision
+    "firmware_version": (
+        "FirmwareVersion",
+        "Revision",
+        "FirmwareRevision",
+        "FirmwarePackageVersion",
+    ),
+    "manufacturer": ("Manufacturer",),
+}
+INDEXED_COLUMNS = (
+    "model",
+    "part_number",
+    "serial_number",
+    "firmware_version",
+    "health",
+)
+QUERY_COLUMNS = (
+    "service_tag",
+    "host_name",
+    "section",
+    "key",
+    "parent",
+    "model",
+    "part_number",
+    "serial_number",
+    "firmware_version",
+    "manufacturer",
+    "health",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS systems (
+    service_tag TEXT PRIMARY KEY,
+    host_name TEXT,
+    system_model TEXT,
+    bios_version TEXT,
+    idrac_firmware TEXT,
+    updated TEXT
+);
+CREATE TABLE IF NOT EXISTS components (
+    service_tag TEXT NOT NULL,
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    parent TEXT,
+    model TEXT,
+    part_number TEXT,
+    serial_number TEXT,
+    firmware_version TEXT,
+    manufacturer TEXT,
+    health TEXT,
+    data TEXT,
+    PRIMARY KEY (service_tag, section, key)
+);
+"""
+
+
+def column_values(component):
+    """The indexed columns of a component dict, None where it has no value."""
+    values = {}
+    for column, properties in COLUMN_PROPERTIES.items():
+        values[column] = next(
+            (component[prop] for prop in properties if component.get(prop)), None
+        )
+    status = component.get("Status")
+    values["health"] = status.get("Health") if isinstance(status, dict) else None
+    return values
+
+
+def is_network_adapter(value):
+    # Adapters map their port FQDDs to port dicts; the adapter properties the
+    # collector copies next to them (Status, Controller Capabilities...) do not
+    return (
+        isinstance(value, dict)
+        and value
+        and all(isinstance(port, dict) and "Id" in port for port in value.values())
+    )
+
+
+def component_rows(section, components):
+    """(key, parent, component, columns) of every component of a section."""
+    if section != "NetworkDeviceInformation":
+        for key, component in components.items():
+            # Skips counts such as MemoryInformation["DimmCount"]
+            if isinstance(component, dict):
+                yield key, None, component, column_values(component)
+        return
+    for adapter, ports in components.items():
+        if not is_network_adapter(ports):
+            continue
+        # The collector keeps the properties of one adapter only, the last
+        # one it read, next to the adapters' ports
+        columns = dict.fromkeys(list(COLUMN_PROPERTIES) + ["health"])
+        if components.get("Id") == adapter:
+            columns = column_values(components)
+        yield adapter, None, {"Ports": sorted(ports)}, columns
+        for port, component in ports.items():
+            yield port, adapter, component, column_values(component)
+
+
+def failed_sections(inventory):
+    """Sections whose collectors failed in the run that collected inventory."""
+    errors = inventory.get("Errors", {})
+    failed = set()
+    for flag, sections in FLAG_SECTIONS.items():
+        if any(collector.__name__ in errors for collector in COLLECTORS[flag]):
+            failed.update(sections)
+    return failed
+
+
+class ComponentStore(object):
+    """Indexed SQLite store of the components of every server inventoried.
+
+    Has the add/flush/close interface of mongo.InventoryStore, and can be
+    used from several threads.
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        # Queries can run while the inventory is written
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        for column in INDEXED_COLUMNS:
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS components_%s ON components (%s)"
+                % (column, column)
+            )
+        self.connection.commit()
+        self.pending = 0
+        self.written = 0
+
+    def add(self, inventory, sections=None):
+        """Store a server's components; returns False if it has no SKU to key it by.
+
+        Every component section is replaced, or with a list of sections only
+        those. Sections whose collectors failed, and system columns this run
+        has no value for, keep what was stored before.
+        """
+        system = inventory.get("SystemInformation", {})
+        service_tag = system.get("SKU")
+        if not service_tag:
+            return False
+        if sections is None:
+            sections = COMPONENT_SECTIONS
+        failed = failed_sections(inventory)
+        sections = [
+            section
+            for section in sections
+            if section in COMPONENT_SECTIONS and section not in failed
+        ]
+        updated = datetime.datetime.now().astimezone().isoformat(timespec="seconds")
+        with self.lock:
+            # Columns this run did not collect (no -i, no IdracFirmware) keep
+            # what was stored before
+            self.connection.execute(
+                "INSERT INTO systems VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(service_tag) DO UPDATE SET "
+                "host_name = COALESCE(excluded.host_name, systems.host_name), "
+                "system_model = COALESCE(excluded.system_model, systems.system_model), "
+                "bios_version = COALESCE(excluded.bios_version, systems.bios_version), "
+                "idrac_firmware = COALESCE(excluded.idrac_firmware, systems.idrac_firmware), "
+                "updated = excluded.updated",
+                (
+                    service_tag,
+                    system.get("HostName"),
+                    system.get("Model"),
+                    system.get("BiosVersion"),
+                    system.get("IdracFirmware"),
+                    updated,
+                ),
+            )
+            for section in sections:
+                self.connection.execute(
+                    "DELETE FROM components WHERE service_tag = ? AND section = ?",
+                    (service_tag, section),
+                )
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO components VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            service_tag,
+                            section,
+                            key,
+                            parent,
+                            columns["model"],
+                            columns["part_number"],
+                            columns["serial_number"],
+                            columns["firmware_version"],
+                            columns["manufacturer"],
+                            columns["health"],
+                            json.dumps(component, sort_keys=True),
+                        )
+                        for key, parent, component, columns in component_rows(
+                            section, inventory.get(section, {})
+                        )
+                    ],
+                )
+            self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Commit the servers added since the last flush in one transaction."""
+        with self.lock:
+            self.connection.commit()
+            self.written += self.pending
+            self.pending = 0
+
+    def where(self, filters):
+        """SQL condition and parameters matching column=value filters.
+
+        Values are compared exactly, or as a case-insensitive pattern when
+        they contain "*"; an empty value matches components without one.
+        """
+        conditions = []
+        parameters = []
+        for column, value in filters.items():
+            if column not in QUERY_COLUMNS:
+                raise ValueError(
+                    "unknown column %s, use one of %s"
+                    % (column, ", ".join(QUERY_COLUMNS))
+                )
+            if not value:
+                conditions.append("%s IS NULL" % column)
+            elif "*" in value:
+                conditions.append("%s LIKE ? ESCAPE '\\'" % column)
+                value = value.replace("\\", "\\\\").replace("%", "\\%")
+                parameters.append(value.replace("_", "\\_").replace("*", "%"))
+            else:
+                conditions.append("%s = ?" % column)
+                parameters.append(value)
+        return " AND ".join(conditions) or "1", parameters
+
+    def query(self, filters, limit=None):
+        """Components matching column=value filters, with their server."""
+        condition, parameters = self.where(filters)
+        sql = (
+            "SELECT * FROM components JOIN systems USING (service_tag) WHERE %s "
+            "ORDER BY service_tag, section, key" % condition
+        )
+        if limit:
+            sql += " LIMIT %d" % limit
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        components = []
+        for row in rows:
+            component = dict((column, row[column]) for column in QUERY_COLUMNS)
+            component["data"] = json.loads(row["data"])
+            components.append(component)
+        return components
+
+    def group(self, column, filters=None):
+        """Number of matching components and servers for each value of column."""
+        if column not in QUERY_COLUMNS:
+            raise ValueError(
+                "unknown column %s, use one of %s" % (column, ", ".join(QUERY_COLUMNS))
+            )
+        condition, parameters = self.where(filters or {})
+        sql = (
+            "SELECT %s AS value, COUNT(*) AS components, "
+            "COUNT(DISTINCT service_tag) AS systems "
+            "FROM components JOIN systems USING (service_tag) WHERE %s "
+            "GROUP BY %s ORDER BY components DESC" % (column, condition, column)
+        )
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [
+            {
+                column: row["value"],
+                "components": row["components"],
+                "systems": row["systems"],
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
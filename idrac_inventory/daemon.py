@@ -0,0 +1,311 @@
+#
+# Resident inventory service. Instead of starting a Python process (imports,
+# cold TLS handshakes, a fresh login) for every inventory request, the Node
+# backend can keep one service running and send it jobs over localhost HTTP
+# or a Unix socket:
+#
+#   python get_iDRAC_Inventory.py -srv 127.0.0.1:8765
+#   python get_iDRAC_Inventory.py -srv /tmp/idrac_inventory.sock
+#
+# The service keeps a warm RedfishSession (kept-alive connections, session
+# token, $expand support) per iDRAC between jobs, and closes those left idle.
+#
+#   POST /inventory
+#     {"hosts": ["192.168.0.120", ...] (or "host": "..."), "username": ...,
+#      "password": ..., "flags": ["a"], "stream": false, "thermal_power": false}
+#
+# answers with NDJSON as the hosts finish: one fleet-mode result record per
+# host, or with "stream": true the component/host/summary records of -nd.
+# POST /metrics takes the same job with "reports" (metric report names, see
+# telemetry.py) instead of "flags", and answers with one sensor metrics
+# record per host. GET /health reports the number of warm sessions and
+# running jobs.
+#
+# With a RefreshScheduler (-sch) the service also keeps its hosts' inventory
+# fresh in the background, and
+#
+#   POST /refresh  {"host": "192.168.0.120", "flags": ["f", "ps"]}
+#
+# refreshes those sections of a host ahead of the scheduled work and answers
+# with the refresh result and the host's whole inventory.
+#
+
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .collectors import SECTION_FLAGS
+from .fleet import DEFAULT_WORKERS, inventory_host, run_fleet
+from .ndjson import NdjsonWriter
+from .session import RedfishSession
+from .telemetry import DEFAULT_REPORTS, metrics_host
+
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+class SessionPool(object):
+    """Warm RedfishSessions kept across jobs, keyed by host and credentials."""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT, **session_options):
+        self.idle_timeout = idle_timeout
+        self.session_options = session_options
+        self.lock = threading.Lock()
+        # (host, username, password) -> [session, jobs using it, last used]
+        self.sessions = {}
+
+    def acquire(self, host, username, password):
+        key = (host, username, password)
+        with self.lock:
+            entry = self.sessions.get(key)
+            if entry is None:
+                session = RedfishSession(
+                    host, username, password, **self.session_options
+                )
+                entry = self.sessions[key] = [session, 0, 0.0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, session):
+        with self.lock:
+            for entry in self.sessions.values():
+                if entry[0] is session:
+                    entry[1] -= 1
+                    entry[2] = time.monotonic()
+
+    def close_idle(self):
+        """Close the sessions nobody used for idle_timeout seconds."""
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                key
+                for key, (session, users, last_used) in self.sessions.items()
+                if not users and now - last_used > self.idle_timeout
+            ]
+            sessions = [self.sessions.pop(key)[0] for key in idle]
+        for session in sessions:
+            session.close()
+
+    def close(self):
+        with self.lock:
+            sessions = [entry[0] for entry in self.sessions.values()]
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SocketStream(object):
+    """Text stream over the handler's socket, for NdjsonWriter."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def is_string_list(value):
+    """True for a non-empty list of non-empty strings (hosts, flags, reports)."""
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, str) and item for item in value)
+    )
+
+
+class InventoryHandler(BaseHTTPRequestHandler):
+    # The response body is streamed until the connection closes
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            return self.send_json(404, {"error": "unknown path %s" % self.path})
+        health = {"sessions": len(self.server.pool), "jobs": self.server.jobs}
+        if self.server.scheduler:
+            health["scheduler"] = self.server.scheduler.stats()
+        self.send_json(200, health)
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path == "/refresh" and self.server.scheduler:
+            return self.refresh()
+        if path not in ("/inventory", "/metrics"):
+            return self.send_json(404, {"error": "unknown path %s" % self.path})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = json.loads(self.rfile.read(length) or b"{}")
+            hosts = job["hosts"] if "hosts" in job else [job["host"]]
+            username, password = job["username"], job["password"]
+        except (ValueError, KeyError, TypeError) as e:
+            return self.send_json(
+                400, {"error": "invalid job, needs hosts, username, password: %s" % e}
+            )
+        # A string would be taken for a list of one-character hosts, each
+        # leaving a pooled session behind
+        if not is_string_list(hosts):
+            return self.send_json(
+                400, {"error": "hosts must be a list of host names or addresses"}
+            )
+        if path == "/metrics":
+            # Sensor metrics: the report names take the place of the flags
+            flags, task = job.get("reports") or list(DEFAULT_REPORTS), metrics_host
+        else:
+            flags, task = job.get("flags") or ["a"], inventory_host
+        if not is_string_list(flags):
+            return self.send_json(
+                400, {"error": "flags and reports must be lists of names"}
+            )
+        unknown = [flag for flag in flags if flag not in SECTION_FLAGS]
+        if task is inventory_host and unknown:
+            return self.send_json(400, {"error": "unknown flags %s" % unknown})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        writer = NdjsonWriter(SocketStream(self.wfile))
+        stream = False
+        options = {}
+        if task is inventory_host:
+            stream = bool(job.get("stream"))
+            options = {
+                "writer": writer if stream else None,
+                "release": stream,
+                "thermal_power": job.get("thermal_power", self.server.thermal_power),
+            }
+        with self.server.jobs_lock:
+            self.server.jobs += 1
+        try:
+            results = run_fleet(
+                hosts,
+                username,
+                password,
+                flags,
+                min(self.server.workers, len(hosts)),
+                task=task,
+                sessions=self.server.pool,
+                **options
+            )
+            for result in results:
+                if stream:
+                    writer.host_done(result)
+                else:
+                    writer.write(result)
+            if stream:
+                writer.summary()
+        except (BrokenPipeError, ConnectionResetError):
+            # The caller went away; hosts already started still finish
+            pass
+        finally:
+            with self.server.jobs_lock:
+                self.server.jobs -= 1
+
+    def refresh(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = json.loads(self.rfile.read(length) or b"{}")
+            host = job["host"]
+        except (ValueError, KeyError, TypeError) as e:
+            return self.send_json(400, {"error": "invalid refresh, needs host: %s" % e})
+        flags = job.get("flags") or None
+        if not (isinstance(host, str) and host) or (
+            flags is not None and not is_string_list(flags)
+        ):
+            return self.send_json(
+                400, {"error": "host must be a string and flags a list of names"}
+            )
+        if flags and [flag for flag in flags if flag not in SECTION_FLAGS]:
+            return self.send_json(400, {"error": "unknown flags %s" % flags})
+        result = self.server.scheduler.refresh_now(host, flags)
+        if result is None:
+            return self.send_json(503, {"error": "the scheduler is stopping"})
+        result = dict(result, inventory=self.server.scheduler.inventory(host))
+        self.send_json(200, result)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (address, port) client address
+        return request, ("local", 0)
+
+
+def make_server(
+    address, pool, workers=DEFAULT_WORKERS, scheduler=None, thermal_power=False
+):
+    """HTTP server for address: a Unix socket path, or [host:]port on TCP."""
+    if "/" in address:
+        if os.path.exists(address):
+            os.remove(address)
+        server = UnixHTTPServer(address, InventoryHandler)
+    else:
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), InventoryHandler)
+        server.daemon_threads = True
+    server.pool = pool
+    server.workers = max(1, workers)
+    server.jobs = 0
+    server.jobs_lock = threading.Lock()
+    server.scheduler = scheduler
+    server.thermal_power = thermal_power
+    return server
+
+
+def serve(
+    address,
+    workers=DEFAULT_WORKERS,
+    idle_timeout=DEFAULT_IDLE_TIMEOUT,
+    scheduler=None,
+    thermal_power=False,
+    **options
+):
+    """Run the inventory service until interrupted.
+
+    Extra keyword options configure every RedfishSession it opens. A started
+    RefreshScheduler, if given, serves POST /refresh. thermal_power is the
+    default of the jobs' "thermal_power" option (see Idrac).
+    """
+    pool = SessionPool(idle_timeout, **options)
+    server = make_server(address, pool, workers, scheduler, thermal_power)
+
+    def close_idle_sessions():
+        while True:
+            time.sleep(min(60, idle_timeout))
+            pool.close_idle()
+
+    threading.Thread(target=close_idle_sessions, daemon=True).start()
+    if threading.current_thread() is threading.main_thread():
+        # Log out of the iDRACs when the backend stops the service
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.close()
+        if server.address_family == socket.AF_UNIX:
+            os.remove(address)
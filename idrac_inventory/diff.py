@@ -0,0 +1,182 @@
+#
+# Inventory diffing. Compares a freshly collected inventory with the previous
+# one for the same iDRAC - the local snapshot written by the last run, or a
+# baseline file - and reports only what changed, component by component:
+#
+#   {"section": "MemoryInformation", "key": "DIMM.Socket.A1",
+#    "change": "changed", "fields": {"SerialNumber": {"old": ..., "new": ...}}}
+#
+# (a swapped DIMM, a new drive, a firmware bump...). Every section also gets
+# a stable content hash, so unchanged sections are skipped without looking
+# at their components and consumers can tell at a glance what moved.
+#
+# Sections whose collector failed are neither diffed nor overwritten in the
+# snapshot, so a timeout does not show up as every DIMM being removed. Live
+# sensor readings (VOLATILE_PROPERTIES: PSU input watts and voltage, fan
+# speeds...) differ on every run and are left out of both the hashes and the
+# diff, so the power supplies and fans only change when their hardware does.
+#
+
+
+import hashlib
+import json
+import time
+
+from .archive import archive_path, read_archive, write_archive
+from .collectors import COLLECTORS, FLAG_SECTIONS, section_flags
+
+# Properties holding sensor readings rather than inventory, at any depth
+VOLATILE_PROPERTIES = frozenset(
+    [
+        "Reading",
+        "ReadingRPM",
+        "SpeedPercent",
+        "PowerInputWatts",
+        "PowerOutputWatts",
+        "LastPowerOutputWatts",
+        "LineInputVoltage",
+        "PowerConsumedWatts",
+        "PowerMetrics",
+    ]
+)
+
+
+def without_readings(value):
+    """value with the VOLATILE_PROPERTIES of its dicts left out."""
+    if isinstance(value, dict):
+        return dict(
+            (key, without_readings(item))
+            for key, item in value.items()
+            if key not in VOLATILE_PROPERTIES
+        )
+    if isinstance(value, list):
+        return [without_readings(item) for item in value]
+    return value
+
+
+def section_hash(section):
+    """SHA-256 of a section's canonical JSON, sensor readings left out."""
+    data = json.dumps(without_readings(section), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def collected_sections(inventory, flags):
+    """Sections the flags collected whose collectors all succeeded."""
+    errors = inventory.get("Errors", {})
+    sections = set()
+    failed = set()
+    for flag in section_flags(flags):
+        sections.update(FLAG_SECTIONS[flag])
+        if any(collector.__name__ in errors for collector in COLLECTORS[flag]):
+            failed.update(FLAG_SECTIONS[flag])
+    return sorted(sections - failed)
+
+
+def diff_components(section, old, new):
+    """Changes between two versions of a section, one record per component.
+
+    Components are compared without their sensor readings.
+    """
+    changes = []
+    old_stable = without_readings(old)
+    new_stable = without_readings(new)
+    for key in sorted(set(old) | set(new)):
+        if key not in old:
+            changes.append(
+                {"section": section, "key": key, "change": "added", "new": new[key]}
+            )
+        elif key not in new:
+            changes.append(
+                {"section": section, "key": key, "change": "removed", "old": old[key]}
+            )
+        elif old_stable[key] != new_stable[key]:
+            change = {"section": section, "key": key, "change": "changed"}
+            if isinstance(old[key], dict) and isinstance(new[key], dict):
+                old_fields, new_fields = old_stable[key], new_stable[key]
+                change["fields"] = dict(
+                    (
+                        field,
+                        {"old": old_fields.get(field), "new": new_fields.get(field)},
+                    )
+                    for field in sorted(set(old_fields) | set(new_fields))
+                    if old_fields.get(field) != new_fields.get(field)
+                )
+            else:
+                change["old"] = old[key]
+                change["new"] = new[key]
+            changes.append(change)
+    return changes
+
+
+def diff_inventories(old, new, sections, old_hashes=None):
+    """Compare sections of two inventories.
+
+    Returns the content hash of every section compared, the sections that
+    changed and the component changes. Sections whose hash is in old_hashes
+    are only compared by hash.
+    """
+    old = old or {}
+    old_hashes = old_hashes or {}
+    hashes = {}
+    changed = []
+    changes = []
+    for section in sections:
+        hashes[section] = section_hash(new.get(section, {}))
+        if section in old and old_hashes.get(section) == hashes[section]:
+            continue
+        section_changes = diff_components(
+            section, old.get(section, {}), new.get(section, {})
+        )
+        if section_changes or section not in old:
+            changed.append(section)
+            changes.extend(section_changes)
+    return {"hashes": hashes, "changed": changed, "changes": changes}
+
+
+class InventoryDiffer(object):
+    """Diffs each host's inventory against its snapshot or a baseline.
+
+    Snapshots are kept as one gzipped JSON file per host in directory, and
+    updated after every diff with the sections that were collected. A
+    baseline inventory, if given, is compared against instead of the
+    snapshot (for a single host).
+    """
+
+    def __init__(self, directory=None, baseline=None):
+        self.directory = directory
+        self.baseline = baseline
+
+    def load(self, host):
+        """The inventory to compare a host against and its section hashes."""
+        if self.baseline is not None:
+            return self.baseline, {}
+        if not self.directory:
+            return None, {}
+        try:
+            snapshot = read_archive(archive_path(self.directory, host))
+            return snapshot["inventory"], snapshot["hashes"]
+        except (OSError, ValueError, KeyError):
+            return None, {}
+
+    def diff(self, host, inventory, flags):
+        """Diff a host's new inventory and record it as the host's snapshot."""
+        old, old_hashes = self.load(host)
+        result = diff_inventories(
+            old, inventory, collected_sections(inventory, flags), old_hashes
+        )
+        if self.directory:
+            snapshot = dict(old or {})
+            hashes = dict(old_hashes)
+            for section in result["hashes"]:
+                snapshot[section] = inventory.get(section, {})
+            hashes.update(result["hashes"])
+            write_archive(
+                archive_path(self.directory, host),
+                {
+                    "host": host,
+                    "taken": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "hashes": hashes,
+                    "inventory": snapshot,
+                },
+            )
+        return result
@@ -0,0 +1,257 @@
+#
+# iDRAC discovery. Instead of one curl per address with a 30 second timeout
+# (find-idracs-on-subnet.sh) and a list file written before the inventory
+# can start, addresses are probed by thousands of concurrent asyncio TCP
+# connects to port 443, and every address that accepts one has its Redfish
+# service root checked for a Dell iDRAC:
+#
+#   {"host": "10.0.1.17", "product": "Integrated Dell Remote Access Controller",
+#    "service_tag": "7XJ4Q2", "model": "PowerEdge R740xd",
+#    "redfish_version": "1.11.0", "rtt_ms": 0.4}
+#
+# The service root only carries a model on some firmware; otherwise, given
+# credentials, it is read from the iDRAC's System.Embedded.1 on the same
+# thread pool, and left None without them.
+#
+# iDRACs are yielded as soon as they are found, so fleet mode can inventory
+# the first ones while the rest of the range is still being scanned.
+#
+# Most addresses of a sweep are unused and never answer, so the connect
+# timeout is what a sweep costs. It starts at CONNECT_TIMEOUT_MAX and, once
+# enough hosts have answered, follows RTT_MULTIPLIER times the slowest of
+# the recent connect times (within CONNECT_TIMEOUT_MIN/MAX): the minimum on
+# a local management network, longer across routed sites. Concurrency is
+# kept below the process's open file limit, as a probe that cannot get a
+# socket would pass for an address nobody answers on.
+#
+
+
+import asyncio
+import concurrent.futures
+import ipaddress
+import queue
+import threading
+import time
+
+import requests
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_PORT = 443
+DEFAULT_CONCURRENCY = 1024
+CONNECT_TIMEOUT_MIN = 0.2
+CONNECT_TIMEOUT_MAX = 2.0
+RTT_MULTIPLIER = 4
+RTT_SAMPLES = 64
+SERVICE_ROOT_TIMEOUT = 10
+SYSTEM_URI = "/redfish/v1/Systems/System.Embedded.1"
+# Service root checks run on this many threads at most
+SERVICE_ROOT_WORKERS = 32
+# File descriptors left for everything but the probes
+RESERVED_FILES = 128
+
+
+def target_addresses(spec):
+    """Yield the addresses of a comma-separated list of targets, lazily.
+
+    A target is an address, a network (10.0.1.0/24, host addresses only), a
+    range (10.0.1.10-10.0.1.60) or a last-octet range (10.0.1.10-60).
+    """
+    for target in spec.split(","):
+        target = target.strip()
+        if not target:
+            continue
+        if "/" in target:
+            network = ipaddress.ip_network(target, strict=False)
+            addresses = network.hosts() if network.num_addresses > 2 else network
+            for address in addresses:
+                yield str(address)
+        elif "-" in target:
+            first, last = target.split("-", 1)
+            if "." not in last:
+                last = first.rsplit(".", 1)[0] + "." + last
+            first = int(ipaddress.ip_address(first))
+            last = int(ipaddress.ip_address(last))
+            for address in range(first, last + 1):
+                yield str(ipaddress.ip_address(address))
+        else:
+            yield str(ipaddress.ip_address(target))
+
+
+def max_concurrency(concurrency):
+    """concurrency, lowered to what the open file limit allows."""
+    if resource is not None:
+        limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if limit != resource.RLIM_INFINITY:
+            concurrency = min(concurrency, limit - RESERVED_FILES)
+    return max(1, concurrency)
+
+
+class AdaptiveTimeout(object):
+    """Connect timeout following the connect times of the hosts that answered."""
+
+    def __init__(self):
+        self.samples = []
+
+    def observe(self, rtt):
+        self.samples.append(rtt)
+        if len(self.samples) > RTT_SAMPLES:
+            del self.samples[0]
+
+    @property
+    def seconds(self):
+        if len(self.samples) < RTT_SAMPLES // 4:
+            return CONNECT_TIMEOUT_MAX
+        return min(
+            CONNECT_TIMEOUT_MAX,
+            max(CONNECT_TIMEOUT_MIN, RTT_MULTIPLIER * max(self.samples)),
+        )
+
+
+def system_model(host, auth, timeout=SERVICE_ROOT_TIMEOUT):
+    """Model of the server behind an iDRAC, or None if it cannot be read."""
+    try:
+        response = requests.get(
+            "https://%s%s" % (host, SYSTEM_URI),
+            auth=auth,
+            timeout=timeout,
+            verify=False,
+        )
+        system = response.json() if response.status_code == 200 else {}
+    except (requests.RequestException, ValueError):
+        return None
+    return system.get("Model") if isinstance(system, dict) else None
+
+
+def idrac_service_root(host, timeout=SERVICE_ROOT_TIMEOUT, auth=None):
+    """Discovery record of host if its Redfish service root is a Dell iDRAC.
+
+    With auth, a (username, password) tuple, the model is read from the
+    system when the service root has none.
+    """
+    try:
+        response = requests.get(
+            "https://%s/redfish/v1" % host, timeout=timeout, verify=False
+        )
+        root = response.json() if response.status_code == 200 else {}
+    except (requests.RequestException, ValueError):
+        return None
+    if not isinstance(root, dict):
+        return None
+    dell = root.get("Oem", {}).get("Dell", {})
+    product = root.get("Product") or ""
+    if not (dell or root.get("Vendor") == "Dell" or "Dell" in product):
+        return None
+    model = dell.get("Model") or dell.get("SystemModel")
+    if not model and auth:
+        model = system_model(host, auth, timeout)
+    return {
+        "host": host,
+        "product": product or None,
+        "service_tag": dell.get("ServiceTag"),
+        "model": model,
+        "redfish_version": root.get("RedfishVersion"),
+    }
+
+
+class Discovery(object):
+    """Finds the iDRACs among a set of addresses.
+
+    Iterating it runs the scan on a thread of its own and yields a record
+    per iDRAC as soon as it is found; stats holds the counters once done.
+    With a username and password the records also carry the server model.
+    """
+
+    def __init__(
+        self,
+        addresses,
+        port=DEFAULT_PORT,
+        concurrency=DEFAULT_CONCURRENCY,
+        root_timeout=SERVICE_ROOT_TIMEOUT,
+        username=None,
+        password=None,
+    ):
+        self.addresses = addresses
+        self.auth = (username, password) if username and password else None
+        self.port = port
+        self.concurrency = max_concurrency(concurrency)
+        self.root_timeout = root_timeout
+        self.timeout = AdaptiveTimeout()
+        self.stopped = threading.Event()
+        self.stats = {"scanned": 0, "open": 0, "idracs": 0, "elapsed_s": None}
+
+    def host(self, address):
+        return address if self.port == DEFAULT_PORT else "%s:%d" % (address, self.port)
+
+    async def probe(self, address):
+        """Connect time to address, or None if it did not accept in time."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, self.port), self.timeout.seconds
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+        rtt = loop.time() - start
+        writer.close()
+        return rtt
+
+    async def check(self, address, roots, found):
+        self.stats["scanned"] += 1
+        rtt = await self.probe(address)
+        if rtt is None:
+            return
+        self.timeout.observe(rtt)
+        self.stats["open"] += 1
+        record = await asyncio.get_running_loop().run_in_executor(
+            roots, idrac_service_root, self.host(address), self.root_timeout, self.auth
+        )
+        if record:
+            self.stats["idracs"] += 1
+            record["rtt_ms"] = round(rtt * 1000, 1)
+            found.put(record)
+
+    async def scan(self, found):
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        with concurrent.futures.ThreadPoolExecutor(SERVICE_ROOT_WORKERS) as roots:
+            for address in self.addresses:
+                if self.stopped.is_set():
+                    break
+                await slots.acquire()
+                task = asyncio.ensure_future(self.check(address, roots, found))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda task: slots.release())
+            if tasks:
+                await asyncio.wait(tasks)
+
+    def run(self, found):
+        start = time.perf_counter()
+        try:
+            asyncio.run(self.scan(found))
+        finally:
+            self.stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+            found.put(None)
+
+    def __iter__(self):
+        found = queue.Queue()
+        threading.Thread(target=self.run, args=(found,), daemon=True).start()
+        try:
+            while True:
+                record = found.get()
+                if record is None:
+                    return
+                yield record
+        finally:
+            # The consumer stopped early
+            self.stopped.set()
+
+
+def discover(spec, **options):
+    """Yield a discovery record per iDRAC in the targets of spec, as found."""
+    return iter(Discovery(target_addresses(spec), **options))
@@ -0,0 +1,95 @@
+#
+# Concurrent Redfish fetches for the collectors. A collector that has to walk
+# the members of a collection (DIMMs, CPUs, drives, ports...) hands the whole
+# list of URIs to get_many(), which issues the GETs concurrently on an asyncio
+# loop instead of one after another, and returns the responses in order.
+#
+# Where the iDRAC supports Redfish $expand, get_members() fetches a collection
+# together with all of its members in a single request instead.
+#
+# requests is blocking, so each GET runs on a worker thread; the number of
+# GETs in flight against one iDRAC is capped by its RedfishSession, shared by
+# every collector working on that host.
+#
+
+
+import asyncio
+import concurrent.futures
+
+
+async def fetch_all(idrac, uris):
+    loop = asyncio.get_running_loop()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, min(idrac.session.max_in_flight, len(uris)))
+    ) as executor:
+        return await asyncio.gather(
+            *[loop.run_in_executor(executor, idrac.get, uri) for uri in uris]
+        )
+
+
+def get_many(idrac, uris):
+    """GET every URI concurrently and return the responses in the same order."""
+    uris = list(uris)
+    if len(uris) < 2:
+        return [idrac.get(uri) for uri in uris]
+    return asyncio.run(fetch_all(idrac, uris))
+
+
+# Asks the iDRAC to inline every resource one level below the requested one,
+# e.g. the members of a collection or the drives of a storage controller
+EXPAND_QUERY = "$expand=.($levels=1)"
+
+
+def expand_uri(uri):
+    return "%s%s%s" % (uri, "&" if "?" in uri else "?", EXPAND_QUERY)
+
+
+def get_expanded_many(idrac, uris):
+    """GET every URI with its subordinate resources expanded, when supported.
+
+    Falls back to a plain GET for iDRACs that do not advertise $expand, and
+    for any resource whose expanded GET fails.
+    """
+    uris = list(uris)
+    if not idrac.session.supports_expand():
+        return get_many(idrac, uris)
+    responses = get_many(idrac, [expand_uri(uri) for uri in uris])
+    failed = [n for n, response in enumerate(responses) if response.status_code != 200]
+    for n, response in zip(failed, get_many(idrac, [uris[n] for n in failed])):
+        responses[n] = response
+    return responses
+
+
+def get_expanded(idrac, uri):
+    return get_expanded_many(idrac, [uri])[0]
+
+
+def resolve_links(idrac, links):
+    """Return (uri, status_code, body) for every link in a list of links.
+
+    Links that came back expanded are used as they are (and cached under
+    their own URI); the rest are fetched concurrently.
+    """
+    missing = [link["@odata.id"] for link in links if len(link) == 1]
+    fetched = dict(zip(missing, get_many(idrac, missing)))
+    resources = []
+    for link in links:
+        uri = link["@odata.id"]
+        if uri in fetched:
+            resources.append((uri, fetched[uri].status_code, fetched[uri].json()))
+        else:
+            idrac.cache.seed(uri, link)
+            resources.append((uri, 200, link))
+    return resources
+
+
+def get_members(idrac, uri, prop="Members"):
+    """Fetch a resource and every resource its `prop` list links to.
+
+    With $expand this takes a single request instead of one per member.
+    Returns the resource's response and a list of (uri, status_code, body).
+    """
+    response = get_expanded(idrac, uri)
+    if response.status_code != 200:
+        return response, []
+    return response, resolve_links(idrac, response.json().get(prop, []))
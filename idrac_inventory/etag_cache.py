@@ -0,0 +1,63 @@
+#
+# On-disk cache of Redfish responses that lets repeat inventory runs use
+# conditional GETs. Every 200 response carrying an ETag (or an @odata.etag in
+# its body) is kept with its body, one gzipped JSON file per iDRAC. On the
+# next run the request is sent with If-None-Match, and when the iDRAC answers
+# 304 Not Modified the body is taken from disk instead of being re-sent over
+# the management network.
+#
+
+
+import threading
+
+from .archive import archive_path, read_archive, write_archive
+
+
+def response_etag(response, body):
+    """The ETag header of a response, or the @odata.etag of its body."""
+    etag = response.headers.get("ETag")
+    if not etag and isinstance(body, dict):
+        etag = body.get("@odata.etag")
+    return etag
+
+
+class EtagCache(object):
+    """ETags and bodies of one iDRAC's Redfish resources, keyed by URI."""
+
+    def __init__(self, directory, host):
+        self.path = archive_path(directory, host)
+        self.lock = threading.Lock()
+        self.entries = None
+        self.dirty = False
+        self.revalidated = 0
+
+    def load(self):
+        if self.entries is None:
+            try:
+                self.entries = read_archive(self.path)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def lookup(self, uri):
+        """Return the cached {"etag", "body"} entry for uri, if any."""
+        with self.lock:
+            self.load()
+            return self.entries.get(uri)
+
+    def store(self, uri, etag, body):
+        with self.lock:
+            self.load()
+            self.entries[uri] = {"etag": etag, "body": body}
+            self.dirty = True
+
+    def hit(self):
+        with self.lock:
+            self.revalidated += 1
+
+    def save(self):
+        """Write the cache back to disk if anything changed (atomically)."""
+        with self.lock:
+            if not self.dirty:
+                return
+            write_archive(self.path, self.entries)
+            self.dirty = False
@@ -0,0 +1,219 @@
+#
+# Event-driven updates. Rather than polling every iDRAC for changes that
+# rarely happen, an EventListener follows each iDRAC's EventService
+# Server-Sent Events stream (ServerSentEventUri, /redfish/v1/SSE on iDRAC9)
+# and maps every alert to the inventory sections it is about:
+#
+#   PSU0003 "Power supply 2 is lost" .................... -> ps
+#   FAN0001 on /redfish/v1/Chassis/System.Embedded.1/Thermal -> f
+#   MEM8000, PDR1016 (drive removed), NIC100 ............ -> m, S, n
+#   SUP0516, RED063 (firmware updated) .................. -> fw, i, s
+#
+# from the Dell message registry prefix of the MessageId and the
+# OriginOfCondition URI. With a RefreshScheduler (-sch -ev) only those
+# sections are re-collected, right away, and the scheduler's TTLs become a
+# slow safety net for whatever events do not cover (EVENT_TTLS).
+#
+# A lost stream is reopened with backoff. Events sent while the iDRAC could
+# not be reached are lost, so once it answers again every scheduled section
+# of the host is refreshed.
+#
+
+
+import json
+import re
+import sys
+import threading
+
+import requests
+
+from .scheduler import DEFAULT_TTLS
+from .session import RedfishError, RedfishSession, backoff_delay
+
+EVENT_SERVICE_URI = "/redfish/v1/EventService"
+# Longest wait for the next bytes of a stream before it is reopened
+STREAM_READ_TIMEOUT = 900
+# Seconds between refreshes of each section flag when events drive updates
+SAFETY_NET_TTL = 6 * 3600
+EVENT_TTLS = dict(
+    (flag, max(ttl, SAFETY_NET_TTL)) for flag, ttl in DEFAULT_TTLS.items()
+)
+
+# Dell message registry prefixes -> section flags
+MESSAGE_FLAGS = {
+    "PSU": ["ps"],
+    "PWR": ["ps"],
+    "FAN": ["f"],
+    "MEM": ["m"],
+    "CPU": ["c"],
+    "PDR": ["S"],
+    "CTL": ["S"],
+    "ENC": ["S"],
+    "BAT": ["S"],
+    "STOR": ["S"],
+    "NIC": ["n"],
+    "SUP": ["fw", "i", "s"],
+    "RED": ["fw", "i", "s"],
+    "RAC": ["i"],
+    "BIOS": ["s"],
+}
+
+# OriginOfCondition URI fragments -> section flags
+URI_FLAGS = [
+    ("/Power", ["ps"]),
+    ("/Thermal", ["f"]),
+    ("/Fans", ["f"]),
+    ("/Memory", ["m"]),
+    ("/Processors", ["c"]),
+    ("/Storage", ["S"]),
+    ("/Drives", ["S"]),
+    ("/Chassis/Enclosure.", ["S"]),
+    ("/NetworkAdapters", ["n"]),
+    ("/NetworkInterfaces", ["n"]),
+    ("/NetworkPorts", ["n"]),
+    ("/FirmwareInventory", ["fw", "i", "s"]),
+    ("/Managers/", ["i"]),
+]
+
+
+def message_prefix(message_id):
+    """Registry prefix of a MessageId, e.g. PSU for iDRAC.2.8.PSU0003."""
+    match = re.match(r"[A-Za-z]+", (message_id or "").rsplit(".", 1)[-1])
+    return match.group(0).upper() if match else ""
+
+
+def event_flags(event):
+    """Section flags of the inventory an event record is about (may be empty)."""
+    flags = list(MESSAGE_FLAGS.get(message_prefix(event.get("MessageId")), []))
+    origin = event.get("OriginOfCondition") or ""
+    if isinstance(origin, dict):
+        origin = origin.get("@odata.id", "")
+    for fragment, fragment_flags in URI_FLAGS:
+        if fragment in origin:
+            flags.extend(fragment_flags)
+    return sorted(set(flags))
+
+
+def read_events(lines):
+    """Event records of a Server-Sent Events stream, as they arrive."""
+    data = []
+    for line in lines:
+        if line:
+            # Comments (keep-alives) start with ":"; id: and event: are unused
+            if line.startswith("data:"):
+                data.append(line[len("data:") :].lstrip())
+            continue
+        if not data:
+            continue
+        payload = json.loads("\n".join(data))
+        data = []
+        if isinstance(payload, dict) and "Events" in payload:
+            for event in payload["Events"] or []:
+                yield event
+        elif isinstance(payload, dict):
+            yield payload
+
+
+def sse_uri(session):
+    """The EventService's Server-Sent Events URI, or None if it has none."""
+    response = session.get(EVENT_SERVICE_URI)
+    if response.status_code != 200:
+        return None
+    return response.json().get("ServerSentEventUri")
+
+
+class EventListener(object):
+    """Follows the Server-Sent Events stream of a set of iDRACs.
+
+    on_event(host, flags, event) is called from the host's thread for every
+    event about inventory sections, and with flags and event None once an
+    iDRAC that could not be reached answers again. Extra keyword options
+    configure the listener's own RedfishSessions.
+    """
+
+    def __init__(self, hosts, username, password, on_event, **session_options):
+        self.hosts = list(hosts)
+        self.username = username
+        self.password = password
+        self.on_event = on_event
+        self.session_options = session_options
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.threads = []
+        self.events = 0
+
+    def follow(self, host):
+        session = RedfishSession(
+            host, self.username, self.password, **self.session_options
+        )
+        attempt = 0
+        try:
+            while not self.stopped.is_set():
+                response = None
+                try:
+                    uri = sse_uri(session)
+                    if uri is None:
+                        print(
+                            "\n- WARNING, %s has no Server-Sent Events stream, it is only polled"
+                            % host,
+                            file=sys.stderr,
+                        )
+                        return
+                    response = session.stream(uri, STREAM_READ_TIMEOUT)
+                    if response.status_code != 200:
+                        raise RedfishError(
+                            "GET %s returned %s" % (uri, response.status_code)
+                        )
+                    with self.lock:
+                        self.streams[host] = response
+                    if attempt:
+                        # Whatever happened while it was unreachable was missed
+                        self.on_event(host, None, None)
+                    attempt = 0
+                    # text/event-stream is always UTF-8
+                    response.encoding = "utf-8"
+                    for event in read_events(
+                        response.iter_lines(chunk_size=1, decode_unicode=True)
+                    ):
+                        flags = event_flags(event)
+                        if flags:
+                            with self.lock:
+                                self.events += 1
+                            self.on_event(host, flags, event)
+                except (requests.RequestException, RedfishError, ValueError) as e:
+                    if self.stopped.is_set():
+                        return
+                    print(
+                        "\n- WARNING, event stream of %s lost: %s" % (host, e),
+                        file=sys.stderr,
+                    )
+                    attempt += 1
+                finally:
+                    with self.lock:
+                        self.streams.pop(host, None)
+                    if response is not None:
+                        response.close()
+                self.stopped.wait(backoff_delay(attempt))
+        finally:
+            session.close()
+
+    def start(self):
+        for host in self.hosts:
+            thread = threading.Thread(target=self.follow, args=(host,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stats(self):
+        with self.lock:
+            return {"streams": len(self.streams), "events": self.events}
+
+    def stop(self):
+        """Close the streams and wait for the threads to log out."""
+        self.stopped.set()
+        with self.lock:
+            streams = list(self.streams.values())
+        for response in streams:
+            response.close()
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,133 @@
+#
+# Fleet mode: inventory many iDRACs from one Python process. Hosts are handed
+# to a bounded pool of worker threads, so the number of iDRACs queried at the
+# same time (and the load on the management network) stays under a cap no
+# matter how long the IP list is.
+#
+
+
+import concurrent.futures
+import queue
+import threading
+
+from .client import IdracInventoryClient
+from .ndjson import ComponentStream
+
+DEFAULT_WORKERS = 16
+
+
+def read_hosts(stream):
+    """Yield iDRAC IPs from a text stream, one per line, skipping blanks and # comments."""
+    for line in stream:
+        host = line.strip()
+        if host and not host.startswith("#"):
+            yield host
+
+
+def inventory_host(
+    ip, username, password, flags, writer=None, release=False, sessions=None, **options
+):
+    """Inventory one iDRAC and return its result record.
+
+    With an NdjsonWriter, components are streamed to it as they are collected
+    (and dropped from the inventory if release is set) and the record carries
+    their count. With a SessionPool, the iDRAC's warm session is taken from
+    it and handed back afterwards instead of being closed. Extra keyword
+    options are passed on to IdracInventoryClient (max_in_flight,
+    token_auth...).
+    """
+    if sessions is not None:
+        options["session"] = sessions.acquire(ip, username, password)
+    client = IdracInventoryClient(ip, username, password, **options)
+    stream = ComponentStream(writer, ip, release) if writer else None
+    try:
+        client.collect(flags, on_collected=stream)
+    # Collector failures are recorded in the inventory; what is left is the
+    # host being unreachable or refusing the version check
+    except Exception as e:
+        result = {
+            "host": ip,
+            "success": False,
+            "error": str(e) or e.__class__.__name__,
+        }
+    else:
+        result = {"host": ip, "success": True}
+        if not (stream and release):
+            result["inventory"] = client.inventory
+    finally:
+        if sessions is not None:
+            sessions.release(options["session"])
+        else:
+            client.close()
+    if stream:
+        result["components"] = stream.count
+    return result
+
+
+def run_fleet(
+    hosts,
+    username,
+    password,
+    flags,
+    workers=DEFAULT_WORKERS,
+    task=inventory_host,
+    **options
+):
+    """Inventory every host with at most `workers` in flight.
+
+    `hosts` may be any iterable, including a lazy one such as read_hosts() on
+    stdin or a discovery scan; hosts are pulled only when a worker is free.
+    Yields one result record per host as soon as it is done, in completion
+    order, even while the next host is still awaited. `task` is what is run
+    for each host (inventory_host, or telemetry.metrics_host to poll sensor
+    metrics).
+    """
+    workers = max(1, workers)
+    # ("result", future) per host, and ("end", (hosts submitted, exception
+    # reading them or None)) once the hosts are all handed out
+    events = queue.Queue()
+    slots = threading.BoundedSemaphore(workers)
+    stopped = threading.Event()
+
+    def done(future):
+        slots.release()
+        events.put(("result", future))
+
+    def feed(executor):
+        # Reads the hosts on a thread of its own, so results are handed on
+        # while it waits for the next one
+        submitted = 0
+        error = None
+        try:
+            for host in hosts:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                future = executor.submit(
+                    task, host, username, password, flags, **options
+                )
+                submitted += 1
+                future.add_done_callback(done)
+        except Exception as e:
+            error = e
+        events.put(("end", (submitted, error)))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        threading.Thread(target=feed, args=(executor,), daemon=True).start()
+        submitted = None
+        error = None
+        yielded = 0
+        try:
+            while submitted is None or yielded < submitted:
+                kind, value = events.get()
+                if kind == "result":
+                    yielded += 1
+                    yield value.result()
+                else:
+                    submitted, error = value
+            # The hosts already started are reported first
+            if error is not None:
+                raise error
+        finally:
+            # The consumer stopped early or reading the hosts failed
+            stopped.set()
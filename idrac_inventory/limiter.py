@@ -0,0 +1,126 @@
+#
+# Adaptive per-iDRAC concurrency. iDRAC8 and iDRAC9 web servers, busy or
+# idle, cope with very different numbers of concurrent requests, so any
+# fixed limit is either slow or runs into 503s and session exhaustion. An
+# AdaptiveLimit takes the place of a RedfishSession's fixed slots and moves
+# the host's in-flight limit AIMD style:
+#
+#   - once a whole window of requests (as many as the limit) completed
+#     without trouble, the limit goes up by one, up to the session's
+#     max_in_flight;
+#   - a 503/429, a connection error or timeout, or a latency spike (a
+#     request taking LATENCY_SPIKE times as long as usual for its kind of
+#     resource) halves it, at most once per window, since the requests
+#     already in flight were sent at the old limit.
+#
+# Latency is compared per kind of resource - the collection a member
+# belongs to, expanded or not - as a DIMM and an expanded FirmwareInventory
+# do not cost the iDRAC the same. The limit and the usual latencies are kept
+# per host on disk, so the next run starts where the last one ended.
+#
+
+
+import re
+import threading
+
+from .archive import archive_path, read_archive, write_archive
+
+INITIAL_LIMIT = 4
+LATENCY_SPIKE = 3.0
+# Requests faster than this are never taken for a spike
+SPIKE_MIN_SECONDS = 0.5
+# Weight of a new latency in the usual latency of its kind
+LATENCY_WEIGHT = 0.2
+CONGESTION_STATUS = (429, 503)
+
+
+def resource_kind(uri):
+    """Latency class of a URI: its collection, e.g. .../Memory/* for a DIMM."""
+    path, _, query = uri.partition("?")
+    if re.search(r"[.:]", path.rsplit("/", 1)[-1]):
+        # A member (DIMM.Socket.A1, Disk.Bay.0:Enclosure...), not a collection
+        path = path.rsplit("/", 1)[0] + "/*"
+    return path + ("?" if query else "")
+
+
+class AdaptiveLimit(object):
+    """In-flight limit of one iDRAC, raised additively and cut in half on trouble.
+
+    Used like a semaphore (with limit: ...); record() reports how each
+    request went. With a directory the state is loaded from and saved to
+    the host's file in it.
+    """
+
+    def __init__(self, ceiling, directory=None, host=None):
+        self.ceiling = max(1, ceiling)
+        self.path = archive_path(directory, host) if directory else None
+        self.condition = threading.Condition()
+        self.limit = min(INITIAL_LIMIT, self.ceiling)
+        self.latencies = {}
+        if self.path:
+            try:
+                state = read_archive(self.path)
+                self.limit = max(1, min(int(state["limit"]), self.ceiling))
+                self.latencies = dict(state.get("latencies", {}))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        self.in_flight = 0
+        # Requests completed since the limit last changed, and how many of
+        # them may have been sent before it was last cut
+        self.window = 0
+        self.sent_before_cut = 0
+        self.increases = 0
+        self.decreases = 0
+
+    def __enter__(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def __exit__(self, *exc):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def record(self, uri, seconds, status=None):
+        """Account for a finished request; status None means it failed to connect or read."""
+        kind = resource_kind(uri)
+        with self.condition:
+            usual = self.latencies.get(kind)
+            congested = (
+                status is None
+                or status in CONGESTION_STATUS
+                or (
+                    usual is not None
+                    and seconds > SPIKE_MIN_SECONDS
+                    and seconds > LATENCY_SPIKE * usual
+                )
+            )
+            if status is not None and status not in CONGESTION_STATUS:
+                self.latencies[kind] = (
+                    seconds
+                    if usual is None
+                    else usual + LATENCY_WEIGHT * (seconds - usual)
+                )
+            self.window += 1
+            if congested:
+                if self.window > self.sent_before_cut:
+                    self.sent_before_cut = self.limit
+                    self.limit = max(1, self.limit // 2)
+                    self.window = 0
+                    self.decreases += 1
+            elif self.window >= max(self.limit, self.sent_before_cut):
+                if self.limit < self.ceiling:
+                    self.limit += 1
+                    self.increases += 1
+                    self.condition.notify()
+                self.window = 0
+                self.sent_before_cut = 0
+
+    def save(self):
+        if not self.path:
+            return
+        with self.condition:
+            state = {"limit": self.limit, "latencies": dict(self.latencies)}
+        write_archive(self.path, state)
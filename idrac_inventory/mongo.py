@@ -0,0 +1,95 @@
+#
+# Direct MongoDB writer. Stores inventories straight into the componentInventory
+# collection the Node API reads, in the same shape writeToInventoryColl uses
+# ({_id: SystemInformation.SKU, data: inventory}), instead of passing them back
+# through stdout for Node to parse and write one server at a time.
+#
+# Servers are upserted in batches with a single unordered bulk_write, so there
+# is no findOne before each write, over the client's pooled connections. When
+# only some sections changed (see diff.py) just those are $set, and a server
+# with no changes is not written at all.
+#
+# Requires pymongo (pip install pymongo), which is only imported when used.
+#
+
+
+try:
+    import pymongo
+except ImportError:
+    pymongo = None
+
+DEFAULT_MONGO_URI = "mongodb://localhost:27017"
+DEFAULT_DB_NAME = "root"
+INVENTORY_COLLECTION = "componentInventory"
+DEFAULT_BATCH_SIZE = 50
+
+
+class InventoryStore(object):
+    """Batched upserts of iDRAC inventories into componentInventory."""
+
+    def __init__(
+        self,
+        uri=DEFAULT_MONGO_URI,
+        db_name=DEFAULT_DB_NAME,
+        batch_size=DEFAULT_BATCH_SIZE,
+    ):
+        if pymongo is None:
+            raise RuntimeError(
+                "writing to MongoDB needs pymongo, install it with: pip install pymongo"
+            )
+        self.client = pymongo.MongoClient(uri)
+        self.collection = self.client[db_name][INVENTORY_COLLECTION]
+        self.batch_size = max(1, batch_size)
+        self.pending = []
+        self.upserted = 0
+        self.modified = 0
+
+    def add(self, inventory, sections=None):
+        """Queue an inventory for upsert; returns False if it has no SKU to key it by.
+
+        With a list of sections, only those sections of the stored data are
+        replaced.
+        """
+        sku = inventory.get("SystemInformation", {}).get("SKU")
+        if not sku:
+            return False
+        if sections is None:
+            update = {"$set": {"data": inventory}}
+        elif sections:
+            update = {
+                "$set": dict(
+                    ("data.%s" % section, inventory[section]) for section in sections
+                )
+            }
+            # Errors go with the sections they are about
+            if "Errors" in inventory:
+                update["$set"]["data.Errors"] = inventory["Errors"]
+            else:
+                update["$unset"] = {"data.Errors": ""}
+        else:
+            return True
+        self.pending.append(pymongo.UpdateOne({"_id": sku}, update, upsert=True))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write every queued inventory in one bulk_write."""
+        if not self.pending:
+            return
+        operations, self.pending = self.pending, []
+        result = self.collection.bulk_write(operations, ordered=False)
+        self.upserted += result.upserted_count
+        self.modified += result.modified_count
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,93 @@
+#
+# Streaming NDJSON output. Instead of building each iDRAC's whole inventory
+# and printing it once at the end, every component (a DIMM, a drive, a NIC
+# port, a SystemInformation attribute...) is written as its own JSON line as
+# soon as the collector that found it finishes:
+#
+#   {"record": "component", "host": ..., "section": ..., "key": ..., "payload": ...}
+#
+# Each host ends with a {"record": "host", ...} line saying whether it
+# succeeded, and the run ends with a single {"record": "summary", ...} line.
+# With release set, components are dropped from memory once written, so the
+# footprint stays flat however many hosts or drives there are.
+#
+
+
+import json
+import sys
+import threading
+
+
+class NdjsonWriter(object):
+    """Thread-safe writer of one JSON record per line."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.hosts = 0
+        self.failed = 0
+        self.components = 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+    def host_done(self, result):
+        """Write the end-of-host record for a fleet result and count it."""
+        with self.lock:
+            self.hosts += 1
+            self.failed += not result["success"]
+        record = {"record": "host"}
+        record.update(
+            (key, value) for key, value in result.items() if key != "inventory"
+        )
+        self.write(record)
+
+    def summary(self):
+        self.write(
+            {
+                "record": "summary",
+                "hosts": self.hosts,
+                "succeeded": self.hosts - self.failed,
+                "failed": self.failed,
+                "components": self.components,
+            }
+        )
+
+
+class ComponentStream(object):
+    """on_collected callback that writes the components new to an inventory."""
+
+    def __init__(self, writer, host, release=False):
+        self.writer = writer
+        self.host = host
+        self.release = release
+        self.emitted = set()
+
+    def __call__(self, idrac):
+        count = 0
+        for section, components in idrac.inventory.items():
+            for key in list(components):
+                if (section, key) in self.emitted:
+                    continue
+                self.writer.write(
+                    {
+                        "record": "component",
+                        "host": self.host,
+                        "section": section,
+                        "key": key,
+                        "payload": components[key],
+                    }
+                )
+                self.emitted.add((section, key))
+                count += 1
+                if self.release:
+                    del components[key]
+        with self.writer.lock:
+            self.writer.components += count
+
+    @property
+    def count(self):
+        return len(self.emitted)
@@ -0,0 +1,149 @@
+#
+# Fleet-wide rate limits. Inventorying hundreds of iDRACs at once can fill
+# the out-of-band management switches (an expanded FirmwareInventory alone
+# is several MB) and slow every other ipmitool/racadm job sharing them. A
+# FleetLimiter is shared by the RedfishSessions of every host in a run and
+# caps, across all of them:
+#
+#   - requests per second and response bytes per second (token buckets,
+#     with up to one second's worth of burst), and
+#   - concurrent requests, in total and per subnet (e.g. one rack's
+#     management network at 8 while another gets 32).
+#
+# Response sizes are only known once the response is in, so bytes are
+# charged afterwards and the next requests wait until the bucket is out of
+# debt again.
+#
+
+
+import contextlib
+import ipaddress
+import threading
+import time
+
+# K, M and G suffixes of byte rates
+SIZE_UNITS = {"K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(value):
+    """Bytes in a size such as 500000, 512K or 20M."""
+    value = str(value).strip().upper().rstrip("B")
+    unit = SIZE_UNITS.get(value[-1:], 1)
+    if unit != 1:
+        value = value[:-1]
+    return float(value) * unit
+
+
+def parse_subnet_caps(spec):
+    """Subnet caps from "network=requests,..." (e.g. "10.1.0.0/16=8")."""
+    caps = []
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        network, _, limit = item.partition("=")
+        caps.append((ipaddress.ip_network(network.strip(), strict=False), int(limit)))
+    # The most specific network a host is in applies
+    caps.sort(key=lambda cap: cap[0].prefixlen, reverse=True)
+    return caps
+
+
+class TokenBucket(object):
+    """Tokens added at rate per second, holding at most burst."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount=1.0):
+        """Wait until amount tokens are there and take them."""
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def charge(self, amount):
+        """Take amount tokens now, going into debt if there are not enough."""
+        with self.lock:
+            self.refill()
+            self.tokens -= amount
+
+
+class FleetLimiter(object):
+    """Request, byte and concurrency limits shared by every host of a run.
+
+    Limits left as None are not enforced. subnet_caps is a list of
+    (network, concurrent requests), see parse_subnet_caps().
+    """
+
+    def __init__(
+        self,
+        requests_per_second=None,
+        bytes_per_second=None,
+        max_requests=None,
+        subnet_caps=None,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_second) if requests_per_second else None
+        )
+        self.bytes = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self.slots = threading.BoundedSemaphore(max_requests) if max_requests else None
+        self.subnet_caps = list(subnet_caps or [])
+        self.subnet_slots = dict(
+            (network, threading.BoundedSemaphore(limit))
+            for network, limit in self.subnet_caps
+        )
+
+    def subnet_slot(self, host):
+        """The concurrency cap of the subnet host is in, if it has one."""
+        if not self.subnet_caps:
+            return None
+        address = host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+        try:
+            address = ipaddress.ip_address(address.strip("[]"))
+        except ValueError:
+            # A host name, no subnet to go by
+            return None
+        for network, _ in self.subnet_caps:
+            if address in network:
+                return self.subnet_slots[network]
+        return None
+
+    @contextlib.contextmanager
+    def request(self, host):
+        """Hold a request against host within the limits.
+
+        Yields a list to append the response size to, which is charged to
+        the byte rate once the request is done.
+        """
+        subnet_slot = self.subnet_slot(host)
+        if subnet_slot is not None:
+            subnet_slot.acquire()
+        if self.slots is not None:
+            self.slots.acquire()
+        sizes = []
+        try:
+            if self.requests is not None:
+                self.requests.take()
+            if self.bytes is not None:
+                # Wait for the debt of earlier responses to be paid off
+                self.bytes.take(0)
+            yield sizes
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+            if subnet_slot is not None:
+                subnet_slot.release()
+            if self.bytes is not None and sizes:
+                self.bytes.charge(sum(sizes))
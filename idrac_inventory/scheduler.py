@@ -0,0 +1,268 @@
+#
+# Background refresh scheduler. Rather than sweeping every section of every
+# iDRAC on each run, a RefreshScheduler keeps each host's inventory (and its
+# warm session) in memory and re-collects every section on its own TTL: fan
+# and power supply health every few minutes, DIMMs, CPUs and firmware once a
+# day. Work is spread over time instead of arriving in bursts:
+#
+#   - the first collection of the hosts is spread evenly over the shortest
+#     TTL (at most MAX_RAMP), and
+#   - every later refresh comes up to TTL_JITTER of its TTL early, so hosts
+#     that started together drift apart, and
+#   - sections of a host that are due within their jitter are refreshed
+#     together.
+#
+# refresh_now() jumps the queue, for on-demand requests, and refresh_soon()
+# does so without waiting, for event-driven updates (see events.py); queued
+# requests for the same host are merged into one refresh.
+#
+
+
+import collections
+import copy
+import heapq
+import random
+import threading
+import time
+
+from .client import IdracInventoryClient
+from .collectors import section_flags
+from .fleet import DEFAULT_WORKERS
+
+# Seconds between refreshes of each section flag
+DEFAULT_TTLS = {
+    "s": 3600,
+    "i": 86400,
+    "fw": 86400,
+    "m": 86400,
+    "c": 86400,
+    "f": 300,
+    "ps": 300,
+    "S": 3600,
+    "n": 3600,
+}
+TTL_JITTER = 0.1
+# Longest the first collection of the hosts is spread over
+MAX_RAMP = 300
+
+
+def parse_ttls(spec, defaults=DEFAULT_TTLS):
+    """TTLs from "flag=seconds,..." (e.g. "f=120,m=43200") over defaults."""
+    ttls = dict(defaults)
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        flag, seconds = item.split("=", 1)
+        if flag.strip() not in ttls:
+            raise ValueError("unknown section flag %s" % flag)
+        ttls[flag.strip()] = float(seconds)
+    return ttls
+
+
+class RefreshJob(object):
+    """Sections of one host to refresh, and its result once done."""
+
+    def __init__(self, host, flags):
+        self.host = host
+        self.flags = flags
+        self.result = None
+        self.done = threading.Event()
+
+
+class RefreshScheduler(object):
+    """Keeps the inventory of a set of iDRACs fresh, each section on its TTL.
+
+    on_refreshed(result, client), if given, is called after every refresh
+    with a result record ({"host", "success", "flags", ...}) and the host's
+    IdracInventoryClient. Extra keyword options configure the clients'
+    sessions.
+    """
+
+    def __init__(
+        self,
+        hosts,
+        username,
+        password,
+        flags=("a", "f"),
+        ttls=None,
+        workers=DEFAULT_WORKERS,
+        on_refreshed=None,
+        **options
+    ):
+        self.username = username
+        self.password = password
+        self.flags = section_flags(flags)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.workers = max(1, workers)
+        self.on_refreshed = on_refreshed
+        self.options = options
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.threads = []
+        # (due, sequence, host, flag); entries whose due time no longer
+        # matches self.due were rescheduled and are skipped
+        self.heap = []
+        self.due = {}
+        self.sequence = 0
+        self.urgent = collections.deque()
+        self.clients = {}
+        self.host_locks = {}
+        self.refreshes = 0
+        self.failures = 0
+        self.add_hosts(hosts)
+
+    def add_hosts(self, hosts):
+        """Schedule hosts, their first collection spread over the shortest TTL."""
+        hosts = [host for host in hosts if host not in self.clients]
+        ramp = min([self.ttls[flag] for flag in self.flags] + [MAX_RAMP])
+        now = time.monotonic()
+        with self.condition:
+            for n, host in enumerate(hosts):
+                self.add_client(host)
+                for flag in self.flags:
+                    self.schedule(host, flag, now + ramp * n / len(hosts))
+            self.condition.notify_all()
+
+    def add_client(self, host):
+        if host not in self.clients:
+            self.clients[host] = IdracInventoryClient(
+                host, self.username, self.password, **self.options
+            )
+            self.host_locks[host] = threading.Lock()
+        return self.clients[host]
+
+    def schedule(self, host, flag, due):
+        self.sequence += 1
+        self.due[host, flag] = due
+        heapq.heappush(self.heap, (due, self.sequence, host, flag))
+
+    def is_due(self, host, flag, now):
+        due = self.due.get((host, flag))
+        return due is not None and due <= now
+
+    def refresh_soon(self, host, flags=None):
+        """Queue a refresh of sections of a host ahead of any scheduled work.
+
+        Joins the host's refresh that is already queued, if there is one.
+        Returns its RefreshJob.
+        """
+        flags = section_flags(flags) if flags else self.flags
+        with self.condition:
+            self.add_client(host)
+            for job in self.urgent:
+                if job.host == host:
+                    job.flags = section_flags(job.flags + flags)
+                    return job
+            job = RefreshJob(host, flags)
+            self.urgent.append(job)
+            self.condition.notify()
+        return job
+
+    def refresh_now(self, host, flags=None, timeout=None):
+        """Refresh sections of a host ahead of any scheduled work and wait for it.
+
+        Returns the result record, or None if it did not finish in timeout.
+        """
+        job = self.refresh_soon(host, flags)
+        job.done.wait(timeout)
+        return job.result
+
+    def inventory(self, host):
+        """A copy of everything collected so far for a host, or None if unknown."""
+        if host not in self.clients:
+            return None
+        with self.host_locks[host]:
+            return copy.deepcopy(self.clients[host].inventory)
+
+    def next_job(self):
+        """Block until work is due; returns None once stopped."""
+        with self.condition:
+            while not self.stopped:
+                if self.urgent:
+                    return self.urgent.popleft()
+                now = time.monotonic()
+                while self.heap and self.heap[0][0] <= now:
+                    due, _, host, flag = heapq.heappop(self.heap)
+                    if self.due.get((host, flag)) != due:
+                        continue
+                    # Take the host's other sections that are due as well, or
+                    # would be within their jitter
+                    flags = [
+                        other
+                        for other in self.flags
+                        if other == flag
+                        or self.is_due(host, other, now + TTL_JITTER * self.ttls[other])
+                    ]
+                    for other in flags:
+                        self.due[host, other] = None
+                    return RefreshJob(host, flags)
+                self.condition.wait(self.heap[0][0] - now if self.heap else None)
+        return None
+
+    def run_job(self, job):
+        client = self.clients[job.host]
+        start = time.perf_counter()
+        result = {"host": job.host, "flags": job.flags}
+        # A client is used by one thread at a time
+        with self.host_locks[job.host]:
+            try:
+                inventory = client.refresh(job.flags)
+            except Exception as e:
+                result["success"] = False
+                result["error"] = str(e) or e.__class__.__name__
+            else:
+                result["success"] = True
+                result["errors"] = sorted(inventory.get("Errors", {}))
+            result["elapsed_s"] = round(time.perf_counter() - start, 3)
+            job.result = result
+            if self.on_refreshed:
+                self.on_refreshed(result, client)
+        now = time.monotonic()
+        with self.condition:
+            self.refreshes += 1
+            self.failures += not result["success"]
+            # On-demand refreshes of sections that are not scheduled stay so
+            for flag in job.flags:
+                if flag in self.flags:
+                    ttl = self.ttls[flag]
+                    self.schedule(
+                        job.host, flag, now + ttl * (1 - TTL_JITTER * random.random())
+                    )
+            self.condition.notify_all()
+
+    def worker(self):
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            try:
+                self.run_job(job)
+            finally:
+                job.done.set()
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "hosts": len(self.clients),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "queued": len(self.urgent),
+            }
+
+    def stop(self):
+        """Stop the workers, let running refreshes finish and close the sessions."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+            for job in self.urgent:
+                job.done.set()
+        for thread in self.threads:
+            thread.join()
+        for client in self.clients.values():
+            client.close()
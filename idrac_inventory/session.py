@@ -0,0 +1,354 @@
+#
+# Pooled HTTPS session to one iDRAC. Every collector request goes through the
+# iDRAC's RedfishSession, so TCP connections and TLS handshakes are reused
+# (keep-alive) instead of paying a new handshake against the iDRAC's slow
+# embedded web server for each GET.
+#
+# With token_auth the session logs in once through the Redfish SessionService
+# and sends the X-Auth-Token on every request, instead of having the iDRAC
+# re-validate basic auth credentials on each call.
+#
+# With an etag_dir the session also keeps an on-disk EtagCache for the iDRAC
+# and revalidates what it already has with conditional GETs (If-None-Match),
+# so resources that did not change since the last run come back as a bodiless
+# 304 Not Modified.
+#
+# Every request has connect and read timeouts, so a hung iDRAC cannot stall a
+# run forever. Connection failures and 5xx responses (503 is how the iDRAC
+# throttles) are retried a bounded number of times with jittered exponential
+# backoff, honouring Retry-After.
+#
+# With a record_dir every response is also saved to a per-host archive, and
+# with a replay_dir the session answers from such an archive without opening
+# any connection (see archive.py).
+#
+# With adaptive set, the number of requests in flight moves between 1 and
+# max_in_flight with how the iDRAC copes (see limiter.py), remembered across
+# runs in limit_dir.
+#
+# A FleetLimiter shared by the sessions of a whole run caps their requests
+# and bytes per second and concurrent requests together (see ratelimit.py).
+#
+# stream() opens a long-lived GET, such as the EventService Server-Sent
+# Events stream, on a connection of its own outside the pool and its slots.
+#
+
+
+import contextlib
+import random
+import sys
+import threading
+import time
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from .archive import ResponseRecorder, ResponseReplay
+from .cache import CachedResponse
+from .etag_cache import EtagCache, response_etag
+from .limiter import AdaptiveLimit
+from .trace import connect_time, time_connections
+
+DEFAULT_IN_FLIGHT = 8
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+
+RETRY_STATUS = (500, 502, 503, 504)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+SESSIONS_URI = "/redfish/v1/SessionService/Sessions"
+
+
+class RedfishError(Exception):
+    """A Redfish request that did not return the resource a collector needs."""
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt + 1.
+
+    Uses the iDRAC's Retry-After when it sends one in seconds, otherwise
+    exponential backoff with full jitter so throttled hosts are not hit by
+    all retries at once. Both are capped at BACKOFF_MAX.
+    """
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0), BACKOFF_MAX)
+        except ValueError:
+            # HTTP-date form, fall back to our own backoff
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class RedfishSession(object):
+    """Keep-alive connection pool and credentials for one iDRAC."""
+
+    def __init__(
+        self,
+        host,
+        username,
+        password,
+        max_in_flight=DEFAULT_IN_FLIGHT,
+        token_auth=False,
+        use_expand=True,
+        etag_dir=None,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        tracer=None,
+        record_dir=None,
+        replay_dir=None,
+        adaptive=False,
+        limit_dir=None,
+        fleet_limiter=None,
+    ):
+        self.host = host
+        self.base_url = "https://%s" % host
+        self.username = username
+        self.password = password
+        self.token_auth = token_auth
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = max(0, retries)
+        # Cap on concurrent Redfish requests against this iDRAC; the pool
+        # keeps one connection per slot alive
+        self.max_in_flight = max(1, max_in_flight)
+        self.limit = None
+        if adaptive:
+            # Slots that follow the iDRAC's capacity, up to max_in_flight
+            self.limit = AdaptiveLimit(self.max_in_flight, limit_dir, host)
+            self.slots = self.limit
+        else:
+            self.slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.fleet_limiter = fleet_limiter
+        self.http = requests.Session()
+        self.http.auth = (username, password)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_in_flight, pool_block=True
+        )
+        self.http.mount("https://", adapter)
+        # Optional Tracer recording the timing of every request
+        self.tracer = tracer
+        if tracer is not None:
+            time_connections(adapter)
+        self.session_uri = None
+        self.login_lock = threading.Lock()
+        # None until the service root has been probed for $expand support
+        self.expand = None if use_expand else False
+        self.etags = EtagCache(etag_dir, host) if etag_dir else None
+        self.recorder = ResponseRecorder(record_dir, host) if record_dir else None
+        self.replay = ResponseReplay(replay_dir, host) if replay_dir else None
+
+    def login(self, expired_token=None):
+        """Open a SessionService session and switch to X-Auth-Token auth.
+
+        Pass the token a request was rejected with to replace a session that
+        timed out on the iDRAC. Falls back to basic auth if the iDRAC refuses
+        to create a session.
+        """
+        with self.login_lock:
+            token = self.http.headers.get("X-Auth-Token")
+            if token and token != expired_token:
+                # Already logged in, or another thread renewed the session
+                return
+            self.http.headers.pop("X-Auth-Token", None)
+            self.http.auth = (self.username, self.password)
+            self.session_uri = None
+            response = self.http.post(
+                self.base_url + SESSIONS_URI,
+                json={"UserName": self.username, "Password": self.password},
+                timeout=self.timeout,
+                verify=False,
+            )
+            token = response.headers.get("X-Auth-Token")
+            if response.status_code not in (200, 201) or not token:
+                print(
+                    "\n- WARNING, unable to create a Redfish session on %s, using basic auth"
+                    % self.host,
+                    file=sys.stderr,
+                )
+                self.token_auth = False
+                return
+            self.http.headers["X-Auth-Token"] = token
+            self.http.auth = None
+            location = response.headers.get("Location", "")
+            if location.startswith("/"):
+                location = self.base_url + location
+            self.session_uri = location or None
+
+    def request(self, uri, headers=None):
+        """Send a GET with the session's auth, retrying transient failures.
+
+        Connection errors and RETRY_STATUS responses are retried up to
+        `retries` times; the last response is returned (or the last connection
+        error raised) once they run out. A read timeout is not retried, an
+        iDRAC that stopped answering is unlikely to recover within the run.
+        An expired session is renewed once.
+        """
+        if self.token_auth and "X-Auth-Token" not in self.http.headers:
+            self.login()
+        token = self.http.headers.get("X-Auth-Token")
+        renewed = False
+        attempt = 0
+        while True:
+            try:
+                response = self.send(uri, headers)
+            except requests.ConnectionError:
+                if attempt >= self.retries:
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if response.status_code == 401 and token and not renewed:
+                    # The session timed out on the iDRAC; log in again and retry
+                    self.login(expired_token=token)
+                    renewed = True
+                    continue
+                if response.status_code not in RETRY_STATUS or attempt >= self.retries:
+                    return response
+                delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            attempt += 1
+            # Sleep without holding a slot, other requests can go ahead
+            time.sleep(delay)
+
+    def send(self, uri, headers=None):
+        """Send a single GET while holding a slot (and the fleet's), and trace it."""
+        if self.fleet_limiter is not None:
+            fleet_request = self.fleet_limiter.request(self.host)
+        else:
+            fleet_request = contextlib.nullcontext([])
+        with self.slots, fleet_request as sizes:
+            connect_time.seconds = 0.0
+            start = time.perf_counter()
+            try:
+                response = self.http.get(
+                    self.base_url + uri,
+                    headers=headers,
+                    timeout=self.timeout,
+                    verify=False,
+                )
+            except requests.RequestException as e:
+                if self.limit is not None:
+                    self.limit.record(uri, time.perf_counter() - start)
+                self.trace(uri, start, error=e.__class__.__name__)
+                raise
+            sizes.append(len(response.content))
+            if self.limit is not None:
+                self.limit.record(
+                    uri, time.perf_counter() - start, response.status_code
+                )
+        self.trace(uri, start, response)
+        return response
+
+    def trace(self, uri, start, response=None, error=None):
+        if self.tracer is None:
+            return
+        self.tracer.request(
+            self.host,
+            uri,
+            response.status_code if response is not None else None,
+            len(response.content) if response is not None else 0,
+            connect_time.seconds,
+            time.perf_counter() - start,
+            error,
+        )
+
+    def get(self, uri):
+        """GET a Redfish URI (path relative to the iDRAC) and return the response.
+
+        A replaying session answers from its archive; a recording one saves
+        every response it returns.
+        """
+        if self.replay is not None:
+            return self.replay.get(uri)
+        response = self.fetch(uri)
+        if self.recorder is not None:
+            response = self.recorder.record(uri, response)
+        return response
+
+    def fetch(self, uri):
+        """GET a Redfish URI, conditionally if it is in the ETag cache.
+
+        With an ETag cache, a resource seen on an earlier run is requested
+        conditionally and a 304 is answered from the cache as a 200.
+        """
+        if self.etags is None:
+            return self.request(uri)
+        cached = self.etags.lookup(uri)
+        headers = {"If-None-Match": cached["etag"]} if cached else None
+        response = self.request(uri, headers=headers)
+        if response.status_code == 304 and cached:
+            self.etags.hit()
+            return CachedResponse(200, cached["body"], {"ETag": cached["etag"]})
+        if response.status_code != 200:
+            return response
+        body = response.json()
+        etag = response_etag(response, body)
+        if etag:
+            self.etags.store(uri, etag, body)
+        return CachedResponse(200, body, response.headers)
+
+    def supports_expand(self):
+        """Whether the iDRAC advertises $expand with levels (probed once).
+
+        Read from ProtocolFeaturesSupported.ExpandQuery on the service root;
+        older iDRAC firmware does not report it at all.
+        """
+        if self.expand is None:
+            response = self.get("/redfish/v1")
+            expand_query = {}
+            if response.status_code == 200:
+                expand_query = response.json().get("ProtocolFeaturesSupported", {})
+                expand_query = expand_query.get("ExpandQuery", {})
+            self.expand = bool(
+                expand_query.get("Levels")
+                and (expand_query.get("NoLinks") or expand_query.get("ExpandAll"))
+            )
+        return self.expand
+
+    def stream(self, uri, read_timeout=None):
+        """Open a streaming GET of a Redfish URI and return the response.
+
+        It runs on a connection of its own, so holding it open for as long
+        as the caller reads it takes no slot from other requests; the caller
+        closes the response. read_timeout is the longest wait for the next
+        bytes, none by default.
+        """
+        if self.replay is not None:
+            raise RedfishError("%s cannot be streamed from an archive" % uri)
+        if self.token_auth and "X-Auth-Token" not in self.http.headers:
+            self.login()
+        return requests.get(
+            self.base_url + uri,
+            auth=self.http.auth,
+            headers=dict(self.http.headers, Accept="text/event-stream"),
+            stream=True,
+            timeout=(self.timeout[0], read_timeout),
+            verify=False,
+        )
+
+    def close(self):
+        """Delete the SessionService session (if any) and drop pooled connections.
+
+        Also writes the ETag cache, the adaptive limit and the recorded
+        archive to disk.
+        """
+        if self.etags is not None:
+            self.etags.save()
+        if self.limit is not None:
+            self.limit.save()
+        if self.recorder is not None:
+            self.recorder.save()
+        if self.session_uri:
+            try:
+                self.http.delete(self.session_uri, timeout=self.timeout, verify=False)
+            except requests.RequestException:
+                pass
+            self.session_uri = None
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,149 @@
+#
+# Sensor metrics. Health dashboards poll fans, PSUs and temperatures far more
+# often than the hardware inventory changes, so instead of a full collector
+# run a metrics poll reads the iDRAC9 TelemetryService metric reports - one
+# request per report:
+#
+#   /redfish/v1/TelemetryService/MetricReports/PowerMetrics
+#   /redfish/v1/TelemetryService/MetricReports/ThermalSensor
+#   /redfish/v1/TelemetryService/MetricReports/FanSensor
+#
+# and returns compact samples keyed by sensor:
+#
+#   {"host": ..., "success": true, "source": "telemetry",
+#    "samples": {"Fan.Embedded.1A": [["RPMReading", 6840.0, "2026-..."]], ...}}
+#
+# Firmware without telemetry (older than iDRAC9 4.00, or without the
+# Datacenter license, or with the reports disabled) answers from the chassis
+# Thermal and Power resources instead, with "source": "thermal_power" (or
+# "mixed" when only some reports are missing) and the Redfish property names
+# as metric IDs.
+#
+
+
+import datetime
+
+from .cache import ResponseCache
+from .collectors import CHASSIS_URI, Idrac
+from .engine import get_many
+from .session import RedfishError
+
+METRIC_REPORTS_URI = "/redfish/v1/TelemetryService/MetricReports"
+DEFAULT_REPORTS = ("PowerMetrics", "ThermalSensor", "FanSensor")
+
+
+def metric_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def sensor_id(metric_value):
+    """The sensor a metric value is about, e.g. Fan.Embedded.1A or PSU.Slot.1."""
+    dell = metric_value.get("Oem", {}).get("Dell", {})
+    sensor = dell.get("ContextID") or dell.get("FQDD")
+    if not sensor:
+        # /redfish/v1/Chassis/System.Embedded.1/Sensors/Fans/Fan.Embedded.1A#/Reading
+        sensor = metric_value.get("MetricProperty", "").split("#")[0].rsplit("/", 1)[-1]
+    return sensor or metric_value.get("MetricId")
+
+
+def report_samples(report, samples):
+    """Add the MetricValues of a metric report to samples."""
+    for metric_value in report.get("MetricValues", []):
+        samples.setdefault(sensor_id(metric_value), []).append(
+            [
+                metric_value.get("MetricId"),
+                metric_number(metric_value.get("MetricValue")),
+                metric_value.get("Timestamp"),
+            ]
+        )
+
+
+# Where the readings of each report are found when the iDRAC does not have
+# it: (chassis resource, list in it, reading properties of each entry)
+FALLBACKS = {
+    "PowerMetrics": [
+        ("Power", "PowerControl", ("PowerConsumedWatts",)),
+        (
+            "Power",
+            "PowerSupplies",
+            ("PowerInputWatts", "PowerOutputWatts", "LineInputVoltage"),
+        ),
+    ],
+    "ThermalSensor": [("Thermal", "Temperatures", ("ReadingCelsius",))],
+    "FanSensor": [("Thermal", "Fans", ("Reading",))],
+}
+
+
+def chassis_samples(idrac, reports, samples):
+    """Add the readings of reports from the chassis Thermal and Power to samples."""
+    # In the ISO 8601 form of the reports' timestamps
+    timestamp = datetime.datetime.now().astimezone().isoformat(timespec="seconds")
+    sources = [source for report in reports for source in FALLBACKS.get(report, [])]
+    resources = sorted(set(resource for resource, _, _ in sources))
+    uris = ["%s/%s" % (CHASSIS_URI, resource) for resource in resources]
+    bodies = {}
+    for resource, response in zip(resources, get_many(idrac, uris)):
+        if response.status_code == 200:
+            bodies[resource] = response.json()
+    for resource, prop, readings in sources:
+        for sensor in bodies.get(resource, {}).get(prop, []):
+            # Fan MemberIds look like 0x17||Fan.Embedded.1A
+            name = (sensor.get("MemberId") or sensor.get("Name", "")).split("||")[-1]
+            for reading in readings:
+                if sensor.get(reading) is not None:
+                    samples.setdefault(name, []).append(
+                        [reading, metric_number(sensor[reading]), timestamp]
+                    )
+
+
+def collect_metrics(idrac, reports=DEFAULT_REPORTS):
+    """Sensor samples of one iDRAC and where they came from.
+
+    Reports the iDRAC does not have are made up for from Thermal and Power,
+    each read once whichever reports are missing.
+    """
+    # Every poll reads fresh values
+    idrac.cache = ResponseCache()
+    samples = {}
+    missing = []
+    uris = ["%s/%s" % (METRIC_REPORTS_URI, report) for report in reports]
+    for report, response in zip(reports, get_many(idrac, uris)):
+        if response.status_code == 200:
+            report_samples(response.json(), samples)
+        else:
+            missing.append(report)
+    source = "telemetry"
+    if missing:
+        chassis_samples(idrac, missing, samples)
+        source = "thermal_power" if len(missing) == len(reports) else "mixed"
+    if not samples:
+        raise RedfishError("no sensor metrics found on %s" % idrac.ip)
+    return source, samples
+
+
+def metrics_host(
+    ip, username, password, reports=DEFAULT_REPORTS, sessions=None, **options
+):
+    """Poll the sensor metrics of one iDRAC and return its result record.
+
+    Takes the same arguments as fleet.inventory_host, with metric report
+    names in place of section flags, so it can be run by run_fleet.
+    """
+    if sessions is not None:
+        options["session"] = sessions.acquire(ip, username, password)
+    idrac = Idrac(ip, username, password, **options)
+    try:
+        source, samples = collect_metrics(idrac, reports or DEFAULT_REPORTS)
+    except Exception as e:
+        result = {"host": ip, "success": False, "error": str(e) or e.__class__.__name__}
+    else:
+        result = {"host": ip, "success": True, "source": source, "samples": samples}
+    finally:
+        if sessions is not None:
+            sessions.release(options["session"])
+        else:
+            idrac.close()
+    return result
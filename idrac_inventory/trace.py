@@ -0,0 +1,213 @@
+#
+# Timing instrumentation. A Tracer handed to Idrac (and through it to the
+# RedfishSession) records every HTTP GET sent to the iDRAC - URI, status,
+# bytes, time spent opening the connection (TCP + TLS handshake, zero when a
+# kept-alive connection is reused) and total latency - and the wall time of
+# every collector. One Tracer can be shared by all the hosts of a fleet run.
+#
+# The trace can be written out as JSON or CSV, or summarised as a table of
+# the slowest endpoints and collectors, grouped by iDRAC model so that
+# generations can be compared.
+#
+
+
+import csv
+import json
+import re
+import threading
+import time
+
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Seconds spent opening connections by the request running on this thread
+connect_time = threading.local()
+
+TRACE_FIELDS = (
+    "kind",
+    "host",
+    "model",
+    "name",
+    "endpoint",
+    "status",
+    "bytes",
+    "connect_s",
+    "elapsed_s",
+    "error",
+)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            connect_time.seconds = (
+                getattr(connect_time, "seconds", 0.0) + time.perf_counter() - start
+            )
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def time_connections(adapter):
+    """Make a requests HTTPAdapter time the connections it opens."""
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": HTTPConnectionPool,
+        "https": TimedHTTPSConnectionPool,
+    }
+
+
+def endpoint(uri):
+    """URI with member IDs replaced, so the same endpoint matches across hosts.
+
+    /redfish/v1/Systems/System.Embedded.1/Memory/DIMM.Socket.A1 becomes
+    /redfish/v1/Systems/System.Embedded.1/Memory/{id}.
+    """
+    path, sep, query = uri.partition("?")
+    segments = path.split("/")
+    for n in range(5, len(segments)):
+        if re.search(r"\d", segments[n]):
+            segments[n] = "{id}"
+    return "/".join(segments) + sep + query
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Tracer(object):
+    """Thread-safe collection of request and collector timings."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = []
+        self.collectors = []
+        self.models = {}
+
+    def request(self, host, uri, status, size, connect, elapsed, error=None):
+        with self.lock:
+            self.requests.append(
+                {
+                    "kind": "request",
+                    "host": host,
+                    "name": uri,
+                    "endpoint": endpoint(uri),
+                    "status": status,
+                    "bytes": size,
+                    "connect_s": round(connect, 6),
+                    "elapsed_s": round(elapsed, 6),
+                    "error": error,
+                }
+            )
+
+    def collector(self, host, name, elapsed, error=None):
+        with self.lock:
+            self.collectors.append(
+                {
+                    "kind": "collector",
+                    "host": host,
+                    "name": name,
+                    "elapsed_s": round(elapsed, 6),
+                    "error": error,
+                }
+            )
+
+    def model(self, host, model):
+        with self.lock:
+            self.models[host] = model
+
+    def records(self):
+        with self.lock:
+            records = self.requests + self.collectors
+            models = dict(self.models)
+        for record in records:
+            record = dict(record)
+            record["model"] = models.get(record["host"])
+            yield record
+
+    def write(self, path):
+        """Write the trace to path, as CSV if it ends in .csv, JSON otherwise."""
+        records = list(self.records())
+        with open(path, "w", newline="") as trace_file:
+            if path.lower().endswith(".csv"):
+                writer = csv.DictWriter(trace_file, TRACE_FIELDS, restval="")
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                json.dump(records, trace_file, indent=2)
+
+    def summary(self, top=20):
+        """Text tables of the slowest endpoints and collectors."""
+        records = list(self.records())
+        lines = []
+
+        groups = {}
+        for record in records:
+            if record["kind"] == "request":
+                groups.setdefault(record["endpoint"], []).append(record)
+        lines.append(
+            "%-78s %6s %6s %9s %8s %8s %8s %9s %9s"
+            % (
+                "Endpoint",
+                "Count",
+                "Errors",
+                "KB",
+                "Mean ms",
+                "P95 ms",
+                "Max ms",
+                "Total s",
+                "Connect s",
+            )
+        )
+        rows = sorted(
+            groups.items(), key=lambda item: -sum(r["elapsed_s"] for r in item[1])
+        )
+        for name, group in rows[:top]:
+            elapsed = [r["elapsed_s"] for r in group]
+            lines.append(
+                "%-78s %6d %6d %9.1f %8.1f %8.1f %8.1f %9.2f %9.2f"
+                % (
+                    name[-78:],
+                    len(group),
+                    sum(1 for r in group if r["status"] not in (200, 304)),
+                    sum(r["bytes"] for r in group) / 1024.0,
+                    1000 * sum(elapsed) / len(elapsed),
+                    1000 * percentile(elapsed, 0.95),
+                    1000 * max(elapsed),
+                    sum(elapsed),
+                    sum(r["connect_s"] for r in group),
+                )
+            )
+
+        groups = {}
+        for record in records:
+            if record["kind"] == "collector":
+                key = (record["name"], record["model"] or "")
+                groups.setdefault(key, []).append(record)
+        lines.append("")
+        lines.append(
+            "%-36s %-24s %6s %6s %8s %8s %9s"
+            % ("Collector", "Model", "Hosts", "Errors", "Mean s", "Max s", "Total s")
+        )
+        rows = sorted(
+            groups.items(), key=lambda item: -sum(r["elapsed_s"] for r in item[1])
+        )
+        for (name, model), group in rows:
+            elapsed = [r["elapsed_s"] for r in group]
+            lines.append(
+                "%-36s %-24s %6d %6d %8.2f %8.2f %9.2f"
+                % (
+                    name,
+                    model[:24],
+                    len(group),
+                    sum(1 for r in group if r["error"]),
+                    sum(elapsed) / len(elapsed),
+                    max(elapsed),
+                    sum(elapsed),
+                )
+            )
+        return "\n".join(lines)
@@ -0,0 +1,37 @@
+#
+# Fixtures shared by the tests: a mock iDRAC (benchmarks/mock_redfish.py)
+# served over HTTPS on a free localhost port.
+#
+
+
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import mock_redfish  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def certificate(tmp_path_factory):
+    return mock_redfish.make_certificate(str(tmp_path_factory.mktemp("certificate")))
+
+
+@pytest.fixture(scope="session")
+def mock_idrac(certificate):
+    """host:port of a mock iDRAC (user root, password calvin)."""
+    port = free_port()
+    server = mock_redfish.serve(
+        port, mock_redfish.MockIdrac(mock_redfish.build_payloads(0)), *certificate
+    )
+    yield "127.0.0.1:%d" % port
+    server.shutdown()
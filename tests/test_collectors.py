@@ -0,0 +1,106 @@
+#
+# Collectors against a mock iDRAC: the response cache, the dependency-aware
+# scheduling of the collectors and the scheduler's TTLs.
+#
+
+
+import threading
+import time
+
+import mock_redfish
+import pytest
+from conftest import free_port
+
+from idrac_inventory import IdracInventoryClient
+from idrac_inventory.cache import CachedResponse, ResponseCache
+from idrac_inventory.chassis import SharedChassis
+from idrac_inventory.scheduler import DEFAULT_TTLS, parse_ttls
+
+pytestmark = pytest.mark.filterwarnings("ignore:Unverified HTTPS request")
+
+
+def test_cache_fetches_each_uri_once():
+    cache = ResponseCache()
+    fetched = []
+
+    def fetch(uri):
+        fetched.append(uri)
+        time.sleep(0.05)
+        return CachedResponse(200, {"@odata.id": uri})
+
+    threads = [
+        threading.Thread(target=cache.get, args=("/redfish/v1/Systems", fetch))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetched == ["/redfish/v1/Systems"]
+    assert cache.hits == 7
+
+
+def test_cache_does_not_keep_failures():
+    cache = ResponseCache()
+    assert cache.get("/x", lambda uri: CachedResponse(503, {})).status_code == 503
+    assert cache.get("/x", lambda uri: CachedResponse(200, {})).status_code == 200
+
+
+def test_parse_ttls():
+    ttls = parse_ttls("f=120, m=43200")
+    assert ttls == dict(DEFAULT_TTLS, f=120.0, m=43200.0)
+    assert parse_ttls("y") == DEFAULT_TTLS
+    with pytest.raises(ValueError):
+        parse_ttls("x=5")
+
+
+def collect(host, flags, **options):
+    with IdracInventoryClient(host, "root", "calvin", **options) as client:
+        return client.collect(flags)
+
+
+def test_side_by_side_collection_matches_sequential(mock_idrac):
+    sequential = collect(mock_idrac, ["a", "f"], sequential=True)
+    side_by_side = collect(mock_idrac, ["a", "f"])
+    assert "Errors" not in side_by_side
+    assert side_by_side == sequential
+    # Drives keep their controllers' order
+    assert list(side_by_side["StorageDisksInformation"]) == list(
+        sequential["StorageDisksInformation"]
+    )
+
+
+def test_drives_wait_for_their_controllers(mock_idrac):
+    # Without the controllers there are no drives to read
+    assert collect(mock_idrac, ["S"])["StorageDisksInformation"]
+    with IdracInventoryClient(mock_idrac, "root", "calvin") as client:
+        client.collect(["m"])
+        assert client.inventory["StorageDisksInformation"] == {}
+        client.refresh(["S"])
+        assert client.inventory["StorageDisksInformation"]
+
+
+@pytest.fixture
+def sled(certificate):
+    """host:port of a mock iDRAC of a sled in chassis CH00000."""
+    port = free_port()
+    payloads = mock_redfish.build_payloads(1, chassis_tag="CH00000")
+    server = mock_redfish.serve(port, mock_redfish.MockIdrac(payloads), *certificate)
+    yield "127.0.0.1:%d" % port
+    server.shutdown()
+
+
+def test_refresh_shares_chassis_sections(sled):
+    shared_chassis = SharedChassis()
+    collect(sled, ["f"], shared_chassis=shared_chassis)
+    with IdracInventoryClient(
+        sled, "root", "calvin", shared_chassis=shared_chassis
+    ) as client:
+        client.collect(["s"])
+        client.refresh(["f"])
+        assert client.inventory["FanInformation"]
+        assert client.inventory["SharedChassis"] == {
+            "ChassisServiceTag": "CH00000",
+            "FanInformation": sled,
+        }
+    assert shared_chassis.stats() == {"collected": 1, "shared": 1}
@@ -0,0 +1,117 @@
+#
+# ComponentStore: partial runs only replace what they collected, and the
+# indexed queries find components across servers.
+#
+
+
+import copy
+
+from idrac_inventory.collectors import new_inventory
+from idrac_inventory.component_store import ComponentStore
+from get_iDRAC_Inventory import handle_result
+
+
+def full_inventory(tag="XC00000"):
+    inventory = new_inventory()
+    inventory["SystemInformation"] = {
+        "SKU": tag,
+        "HostName": "xc-node-0",
+        "Model": "XC740xd-24",
+        "BiosVersion": "2.10.2",
+        "IdracFirmware": "5.00.00.00",
+    }
+    inventory["MemoryInformation"] = {
+        "DIMM.Socket.A1": {"PartNumber": "HMA84GR7CJR4N-XN", "SerialNumber": "1"},
+        "DIMM.Socket.A2": {"PartNumber": "HMA84GR7CJR4N-XN", "SerialNumber": "2"},
+    }
+    inventory["ProcessorInformation"] = {
+        "CPU.Socket.1": {"Model": "Intel(R) Xeon(R) Gold 6230 CPU @ 2.10GHz"}
+    }
+    inventory["StorageDisksInformation"] = {
+        "Disk.Bay.0:Enclosure.Internal.0-1:RAID.Integrated.1-1": {
+            "Model": "MZ7LH960HAJR0D3",
+            "Revision": "HE5A",
+            "Status": {"Health": "OK"},
+        }
+    }
+    inventory["NetworkDeviceInformation"] = {
+        "NIC.Integrated.1": {
+            "NIC.Integrated.1-1-1": {"Id": "NIC.Integrated.1-1-1"},
+            "NIC.Integrated.1-2-1": {"Id": "NIC.Integrated.1-2-1"},
+        }
+    }
+    return inventory
+
+
+def section_counts(store):
+    return dict((row["section"], row["components"]) for row in store.group("section"))
+
+
+def store_run(store, inventory, flags):
+    # As fleet mode hands each host's result to the stores
+    result = {"host": "127.0.0.1", "success": True, "inventory": inventory}
+    handle_result(result, {"d": None, "differ": None}, [store], flags)
+    store.flush()
+    return result
+
+
+def test_memory_only_run_keeps_other_sections(tmp_path):
+    with ComponentStore(str(tmp_path / "components.db")) as store:
+        assert store_run(store, full_inventory(), ["a"])["stored"]
+        before = section_counts(store)
+        assert before == {
+            "MemoryInformation": 2,
+            "ProcessorInformation": 1,
+            "StorageDisksInformation": 1,
+            "NetworkDeviceInformation": 3,
+        }
+        # A -s -m run: one DIMM fewer, nothing else collected
+        partial = new_inventory()
+        partial["SystemInformation"] = {"SKU": "XC00000", "Model": "XC740xd-24"}
+        partial["MemoryInformation"] = {
+            "DIMM.Socket.A1": {"PartNumber": "HMA84GR7CJR4N-XN", "SerialNumber": "1"}
+        }
+        assert store_run(store, partial, ["s", "m"])["stored"]
+        assert section_counts(store) == dict(before, MemoryInformation=1)
+        # Nor are the system columns it did not collect cleared
+        system = store.query({"section": "ProcessorInformation"})[0]
+        assert system["host_name"] == "xc-node-0"
+
+
+def test_failed_section_keeps_stored_rows(tmp_path):
+    with ComponentStore(str(tmp_path / "components.db")) as store:
+        store.add(full_inventory())
+        rerun = full_inventory()
+        rerun["StorageDisksInformation"] = {}
+        rerun["Errors"] = {"get_storage_disks_information": "timed out"}
+        store.add(rerun)
+        store.flush()
+        assert section_counts(store)["StorageDisksInformation"] == 1
+
+
+def test_query_and_group_across_servers(tmp_path):
+    with ComponentStore(str(tmp_path / "components.db")) as store:
+        store.add(full_inventory("XC00000"))
+        other = full_inventory("XC00001")
+        drive = other["StorageDisksInformation"][
+            "Disk.Bay.0:Enclosure.Internal.0-1:RAID.Integrated.1-1"
+        ]
+        drive["Revision"] = "HE5B"
+        store.add(copy.deepcopy(other))
+        store.flush()
+        dimms = store.query({"part_number": "HMA84GR7CJR4N-XN"})
+        assert sorted(set(dimm["service_tag"] for dimm in dimms)) == [
+            "XC00000",
+            "XC00001",
+        ]
+        assert [
+            d["service_tag"] for d in store.query({"firmware_version": "HE5B"})
+        ] == ["XC00001"]
+        assert len(store.query({"firmware_version": "HE5*"})) == 2
+        ports = store.query({"parent": "NIC.Integrated.1"})
+        assert len(ports) == 4
+        groups = store.group("firmware_version", {"section": "StorageDisksInformation"})
+        assert sorted((g["firmware_version"], g["systems"]) for g in groups) == [
+            ("HE5A", 1),
+            ("HE5B", 1),
+        ]
@@ -0,0 +1,89 @@
+#
+# Inventory service: job validation, and the default metric reports.
+#
+
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from idrac_inventory.daemon import SessionPool, make_server
+
+# The mock iDRAC's certificate is self-signed, as real iDRACs' are
+pytestmark = pytest.mark.filterwarnings("ignore:Unverified HTTPS request")
+
+
+@pytest.fixture
+def service():
+    pool = SessionPool()
+    server = make_server("127.0.0.1:0", pool)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d" % server.server_address[1], pool
+    server.shutdown()
+    server.server_close()
+    pool.close()
+
+
+def post(url, job):
+    request = urllib.request.Request(url, data=json.dumps(job).encode("utf-8"))
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            lines = response.read().decode("utf-8").splitlines()
+            return response.status, [json.loads(line) for line in lines]
+    except urllib.error.HTTPError as e:
+        return e.code, [json.loads(e.read())]
+
+
+CREDENTIALS = {"username": "root", "password": "calvin"}
+
+
+@pytest.mark.parametrize(
+    "job",
+    [
+        {"hosts": "10.0.0.5"},
+        {"hosts": []},
+        {"hosts": ["10.0.0.5", ""]},
+        {"hosts": [5]},
+        {"host": ["10.0.0.5"]},
+        {"hosts": ["10.0.0.5"], "flags": "s"},
+        {"hosts": ["10.0.0.5"], "flags": ["s", 1]},
+        {"hosts": ["10.0.0.5"], "flags": ["x"]},
+    ],
+)
+def test_invalid_inventory_jobs_are_rejected(service, job):
+    url, pool = service
+    status, records = post(url + "/inventory", dict(job, **CREDENTIALS))
+    assert status == 400
+    assert "error" in records[0]
+    # Nothing was started for them
+    assert len(pool) == 0
+
+
+def test_invalid_metrics_reports_are_rejected(service):
+    url, pool = service
+    job = dict(hosts=["10.0.0.5"], reports="PowerMetrics", **CREDENTIALS)
+    assert post(url + "/metrics", job)[0] == 400
+    assert len(pool) == 0
+
+
+def test_metrics_job_without_reports_polls_the_default_reports(service, mock_idrac):
+    url, pool = service
+    status, records = post(url + "/metrics", dict(hosts=[mock_idrac], **CREDENTIALS))
+    assert status == 200
+    assert [record["host"] for record in records] == [mock_idrac]
+    assert records[0]["success"], records[0]
+
+
+def test_inventory_job(service, mock_idrac):
+    url, pool = service
+    job = dict(host=mock_idrac, flags=["s", "m"], **CREDENTIALS)
+    status, records = post(url + "/inventory", job)
+    assert status == 200
+    inventory = records[0]["inventory"]
+    assert inventory["SystemInformation"]["SKU"] == "XC00000"
+    assert len(inventory["MemoryInformation"]) > 0
+    # The session stays warm for the next job
+    assert len(pool) == 1
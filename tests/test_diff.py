@@ -0,0 +1,62 @@
+#
+# Inventory diffing: sensor readings alone are not a change.
+#
+
+
+import copy
+
+from idrac_inventory.diff import diff_inventories
+
+SECTIONS = ["PowerSupplyInformation", "FanInformation"]
+
+INVENTORY = {
+    "PowerSupplyInformation": {
+        "PS1Status": {
+            "Model": "PWR SPLY,1100W,RDNT,DELTA",
+            "SerialNumber": "CNDED0000000",
+            "FirmwareVersion": "00.1B.53",
+            "PowerInputWatts": 204,
+            "LastPowerOutputWatts": 1100,
+            "LineInputVoltage": 230,
+        }
+    },
+    "FanInformation": {
+        "SystemBoardFan1A": {
+            "Name": "System Board Fan1A",
+            "Reading": 6840,
+            "ReadingUnits": "RPM",
+        }
+    },
+}
+
+
+def test_reading_change_is_not_a_change():
+    old = copy.deepcopy(INVENTORY)
+    new = copy.deepcopy(INVENTORY)
+    new["PowerSupplyInformation"]["PS1Status"]["PowerInputWatts"] = 231
+    new["PowerSupplyInformation"]["PS1Status"]["LineInputVoltage"] = 228
+    new["FanInformation"]["SystemBoardFan1A"]["Reading"] = 7200
+    first = diff_inventories(None, old, SECTIONS)
+    second = diff_inventories(old, new, SECTIONS, first["hashes"])
+    assert second["hashes"] == first["hashes"]
+    assert second["changed"] == []
+    assert second["changes"] == []
+    # Compared without the stored hashes as well
+    assert diff_inventories(old, new, SECTIONS)["changed"] == []
+
+
+def test_hardware_change_next_to_a_reading_change():
+    old = copy.deepcopy(INVENTORY)
+    new = copy.deepcopy(INVENTORY)
+    new["PowerSupplyInformation"]["PS1Status"]["PowerInputWatts"] = 231
+    new["PowerSupplyInformation"]["PS1Status"]["FirmwareVersion"] = "00.1C.02"
+    result = diff_inventories(old, new, SECTIONS)
+    assert result["changed"] == ["PowerSupplyInformation"]
+    assert result["changes"] == [
+        {
+            "section": "PowerSupplyInformation",
+            "key": "PS1Status",
+            "change": "changed",
+            "fields": {"FirmwareVersion": {"old": "00.1B.53", "new": "00.1C.02"}},
+        }
+    ]
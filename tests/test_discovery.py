@@ -0,0 +1,91 @@
+#
+# Discovery: target parsing, the adaptive connect timeout and the service
+# root check.
+#
+
+
+import pytest
+
+from idrac_inventory.discovery import (
+    CONNECT_TIMEOUT_MAX,
+    CONNECT_TIMEOUT_MIN,
+    AdaptiveTimeout,
+    Discovery,
+    idrac_service_root,
+    target_addresses,
+)
+
+pytestmark = pytest.mark.filterwarnings("ignore:Unverified HTTPS request")
+
+
+def test_single_address():
+    assert list(target_addresses("10.0.1.17")) == ["10.0.1.17"]
+
+
+def test_network_yields_host_addresses_only():
+    addresses = list(target_addresses("10.0.1.0/29"))
+    assert addresses == ["10.0.1.%d" % n for n in range(1, 7)]
+
+
+def test_small_networks_keep_every_address():
+    assert list(target_addresses("10.0.1.4/31")) == ["10.0.1.4", "10.0.1.5"]
+    assert list(target_addresses("10.0.1.4/32")) == ["10.0.1.4"]
+
+
+def test_ranges():
+    assert list(target_addresses("10.0.1.254-10.0.2.1")) == [
+        "10.0.1.254",
+        "10.0.1.255",
+        "10.0.2.0",
+        "10.0.2.1",
+    ]
+    assert list(target_addresses("192.168.0.100-102")) == [
+        "192.168.0.100",
+        "192.168.0.101",
+        "192.168.0.102",
+    ]
+
+
+def test_comma_separated_targets_and_blanks():
+    assert list(target_addresses(" 10.0.0.1, ,10.0.0.8/30 ")) == [
+        "10.0.0.1",
+        "10.0.0.9",
+        "10.0.0.10",
+    ]
+
+
+def test_targets_are_lazy():
+    addresses = target_addresses("10.0.0.0/8")
+    assert next(addresses) == "10.0.0.1"
+
+
+@pytest.mark.parametrize("spec", ["10.0.0.300", "10.0.0.0/33", "host.example", "1-2"])
+def test_invalid_targets_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        list(target_addresses(spec))
+
+
+def test_timeout_follows_the_slowest_recent_connect():
+    timeout = AdaptiveTimeout()
+    assert timeout.seconds == CONNECT_TIMEOUT_MAX
+    for _ in range(16):
+        timeout.observe(0.001)
+    assert timeout.seconds == CONNECT_TIMEOUT_MIN
+    timeout.observe(0.1)
+    assert timeout.seconds == pytest.approx(0.4)
+    timeout.observe(5)
+    assert timeout.seconds == CONNECT_TIMEOUT_MAX
+
+
+def test_service_root_of_an_idrac(mock_idrac):
+    record = idrac_service_root(mock_idrac)
+    assert record["service_tag"] == "XC00000"
+    assert record["model"] is None
+    assert idrac_service_root(mock_idrac, auth=("root", "calvin"))["model"]
+
+
+def test_discovery_finds_the_idrac(mock_idrac):
+    address, port = mock_idrac.split(":")
+    discovery = Discovery(iter([address]), int(port))
+    assert [record["host"] for record in discovery] == [mock_idrac]
+    assert discovery.stats["idracs"] == 1
@@ -0,0 +1,98 @@
+#
+# Fleet-wide rate limits and the adaptive per-iDRAC in-flight limit.
+#
+
+
+import ipaddress
+import time
+
+import pytest
+
+from idrac_inventory.limiter import AdaptiveLimit, resource_kind
+from idrac_inventory.ratelimit import (
+    FleetLimiter,
+    TokenBucket,
+    parse_size,
+    parse_subnet_caps,
+)
+
+
+@pytest.mark.parametrize(
+    "value, size",
+    [("500000", 500000), ("512K", 512 * 1024), ("20M", 20 * 1024**2), ("1gb", 1024**3)],
+)
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+def test_subnet_caps_most_specific_first():
+    caps = parse_subnet_caps("10.1.0.0/16=8, 10.1.2.0/24=4")
+    assert caps == [
+        (ipaddress.ip_network("10.1.2.0/24"), 4),
+        (ipaddress.ip_network("10.1.0.0/16"), 8),
+    ]
+    limiter = FleetLimiter(subnet_caps=caps)
+    assert limiter.subnet_slot("10.1.2.9:443") is limiter.subnet_slots[caps[0][0]]
+    assert limiter.subnet_slot("10.1.7.9") is limiter.subnet_slots[caps[1][0]]
+    assert limiter.subnet_slot("10.2.0.1") is None
+    assert limiter.subnet_slot("idrac-7.example") is None
+
+
+def test_token_bucket_paces_after_the_burst():
+    bucket = TokenBucket(50)
+    start = time.monotonic()
+    for _ in range(60):
+        bucket.take()
+    # 50 of burst, then 10 at 50 per second
+    assert 0.15 < time.monotonic() - start < 1.0
+
+
+def test_bytes_are_charged_after_the_response():
+    limiter = FleetLimiter(bytes_per_second=1000)
+    with limiter.request("10.0.0.1") as sizes:
+        sizes.append(1300)
+    assert limiter.bytes.tokens < 0
+    start = time.monotonic()
+    with limiter.request("10.0.0.1"):
+        pass
+    # Waited for the debt of the first response to be paid off
+    assert time.monotonic() - start > 0.2
+
+
+def test_resource_kind_groups_members_of_a_collection():
+    assert resource_kind(
+        "/redfish/v1/Systems/System.Embedded.1/Memory/DIMM.Socket.A1"
+    ) == ("/redfish/v1/Systems/System.Embedded.1/Memory/*")
+    assert resource_kind("/redfish/v1/Chassis?$expand=.($levels=1)") == (
+        "/redfish/v1/Chassis?"
+    )
+
+
+def test_limit_rises_per_clean_window_and_halves_on_congestion():
+    limit = AdaptiveLimit(16)
+    assert limit.limit == 4
+    for _ in range(4):
+        limit.record("/redfish/v1/Systems", 0.05, 200)
+    assert limit.limit == 5
+    limit.record("/redfish/v1/Systems", 0.05, 503)
+    assert limit.limit == 2
+    # Requests sent at the old limit do not cut it again
+    limit.record("/redfish/v1/Systems", 0.05, 503)
+    assert limit.limit == 2
+
+
+def test_latency_spike_counts_as_congestion():
+    limit = AdaptiveLimit(16)
+    limit.record("/redfish/v1/Systems", 0.2, 200)
+    limit.record("/redfish/v1/Systems", 2.0, 200)
+    assert limit.limit == 2
+
+
+def test_limit_is_kept_across_runs(tmp_path):
+    limit = AdaptiveLimit(16, str(tmp_path), "10.0.0.1")
+    for _ in range(4):
+        limit.record("/redfish/v1/Systems", 0.05, 200)
+    limit.save()
+    assert AdaptiveLimit(16, str(tmp_path), "10.0.0.1").limit == 5
+    # Never above the session's max_in_flight
+    assert AdaptiveLimit(3, str(tmp_path), "10.0.0.1").limit == 3